@@ -1,5 +1,5 @@
 import argparse
-from covid19_outbreak_simulator.cli import summarize_simulations
+from covid19_outbreak_simulator.summary import summarize_simulations
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
@@ -7,6 +7,21 @@ if __name__ == '__main__':
         description='''Analyze an existing logfile generated by covid19-outbreak-simulator and
             generate summary statistics''')
     parser.add_argument('logfile', help='''Logfile to be analyzed.''')
+    parser.add_argument(
+        '--summary-report',
+        help='''File to write summary statistics to, default to standard output.''')
+    parser.add_argument(
+        '--replicate-report',
+        help='''File to write statistics of each replicate to.''')
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        help='''Number of processes to parse the logfile, default to number of CPUs.''')
     args = parser.parse_args()
 
-    summarize_simulations(args.logfile, args.summary_report)
\ No newline at end of file
+    summarize_simulations(
+        args.logfile,
+        args.summary_report,
+        replicate_report=args.replicate_report,
+        jobs=args.jobs)
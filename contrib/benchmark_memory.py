@@ -0,0 +1,88 @@
+'''Measure memory used per individual and per pending event of the simulator.
+
+Usage:
+
+    python benchmark_memory.py [--size 10000]
+'''
+import argparse
+import os
+import tracemalloc
+
+from covid19_outbreak_simulator.event import Event, EventType
+from covid19_outbreak_simulator.model import Model, Params
+from covid19_outbreak_simulator.population import Individual
+
+
+def measure(create, size):
+    '''Return bytes allocated per object by calling ``create(i)`` for
+    ``size`` objects.'''
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [create(i) for i in range(size)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objs
+    return (after - before) / size
+
+
+def infected(id, model, logger):
+    ind = Individual(id, 1.0, model, logger)
+    ind.infect(0.0, by=None, handle_symptomatic=None)
+    return ind
+
+
+def benchmark(size):
+    model = Model(Params())
+    model.draw_prop_asym_carriers()
+    logger = open(os.devnull, 'w')
+
+    inds = [Individual(f'A_{i}', 1.0, model, logger) for i in range(size)]
+
+    res = {
+        'individual':
+            measure(lambda i: Individual(f'A_{i}', 1.0, model, logger), size),
+        # infected individuals also keep their infection parameters, which
+        # are slow to draw so fewer individuals are measured
+        'infected individual':
+            measure(lambda i: infected(f'A_{i}', model, logger),
+                    max(1, size // 20)),
+        'INFECTION event':
+            measure(
+                lambda i: Event(
+                    float(i),
+                    EventType.INFECTION,
+                    target=None,
+                    by=inds[i],
+                    handle_symptomatic=None,
+                    logger=logger), size),
+        'RECOVER event':
+            measure(
+                lambda i: Event(
+                    float(i), EventType.RECOVER, target=inds[i], logger=logger),
+                size),
+        'QUARANTINE event':
+            measure(
+                lambda i: Event(
+                    float(i),
+                    EventType.QUARANTINE,
+                    target=inds[i],
+                    till=i + 14.0,
+                    reason='symptom',
+                    logger=logger), size),
+    }
+    logger.close()
+    return res
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure memory used per individual and per pending event')
+    parser.add_argument(
+        '--size',
+        type=int,
+        default=10000,
+        help='Number of objects to create for each measurement')
+    args = parser.parse_args()
+
+    for name, nbytes in benchmark(args.size).items():
+        print(f'{name:<20}\t{nbytes:.1f} bytes')
@@ -0,0 +1,104 @@
+'''Measure throughput of sending logs of replicates from worker processes to
+the writer of the logfile.
+
+Usage:
+
+    python benchmark_transport.py [--jobs 64] [--replicates 2000] [--size 100000]
+
+Method "queue" sends the text of replicates through a multiprocessing queue,
+and method "shard" writes replicates to per-worker shards and sends their
+locations to the writer, which copies them to the logfile.
+'''
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from covid19_outbreak_simulator.logindex import LogWriter
+
+
+def records(id, size):
+    line = f'{id}\t1.00\tPLUGIN\t.\tname=stat,n_popsize=64,n_infected=10,n_recovered=3\n'
+    return line * max(1, size // len(line))
+
+
+def queue_worker(tasks, results, size, shard):
+    while True:
+        id = tasks.get()
+        if id is None:
+            break
+        results.put((id, records(id, size)))
+
+
+def shard_worker(tasks, results, size, shard):
+    with open(shard, 'wb') as out:
+        while True:
+            id = tasks.get()
+            if id is None:
+                break
+            data = records(id, size).encode()
+            position = out.tell()
+            out.write(data)
+            out.flush()
+            results.put((id, shard, position, len(data)))
+
+
+def benchmark(method, jobs, replicates, size, logfile):
+    tasks = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+    shards = [f'{logfile}.shard{i}' for i in range(jobs)]
+    workers = [
+        multiprocessing.Process(
+            target=queue_worker if method == 'queue' else shard_worker,
+            args=(tasks, results, size, shard)) for shard in shards
+    ]
+    start = time.time()
+    for worker in workers:
+        worker.start()
+    for id in range(1, replicates + 1):
+        tasks.put(id)
+    for worker in workers:
+        tasks.put(None)
+    opened = {}
+    with LogWriter(logfile) as writer:
+        for i in range(replicates):
+            result = results.get()
+            if method == 'queue':
+                writer.write(result[0], result[1], 'END')
+            else:
+                id, shard, position, length = result
+                if shard not in opened:
+                    opened[shard] = open(shard, 'rb')
+                writer.copy(id, opened[shard].fileno(), position, length,
+                            length, 'END')
+    elapsed = time.time() - start
+    for worker in workers:
+        worker.join()
+    for shard in opened.values():
+        shard.close()
+    for shard in shards:
+        if os.path.isfile(shard):
+            os.remove(shard)
+    return os.path.getsize(logfile) / elapsed / 1024**2
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure throughput of sending logs of replicates to the writer')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=64, help='Number of worker processes')
+    parser.add_argument(
+        '--replicates',
+        type=int,
+        default=2000,
+        help='Number of replicates to send')
+    parser.add_argument(
+        '--size', type=int, default=100000, help='Bytes of log per replicate')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for method in ('queue', 'shard'):
+            throughput = benchmark(method, args.jobs, args.replicates,
+                                   args.size, os.path.join(tmpdir, f'{method}.log'))
+            print(f'{method:<10}\t{throughput:.1f} MB/s')
@@ -1,72 +1,175 @@
+import argparse
+import multiprocessing
+import re
 import sys
-from collections import defaultdict
-
-
-def merge_results(files, output_file):
-    all_results = []
-    keys = [
-        'logfile',
-        'popsize',
-        'handle_symptomatic',
-        'prop_asym_carriers',
-        'leadtime',
-        'interval',
-        'n_simulation',
-        'total_infection',
-        'total_infection_failed',
-        'total_infection_avoided',
-        'total_infection_ignored',
-        'total_show_symptom',
-        'total_removal',
-        'total_quarantine',
-        'total_reintegration',
-        'total_abort',
-        'total_asym_infection',
-        'total_presym_infection',
-        'total_sym_infection',
-        'n_remaining_popsize',
-        'n_no_outbreak',
-        'n_outbreak_duration',
-        'n_no_infected_by_seed',
-        'n_num_infected_by_seed',
-        'n_first_infected_by_seed_on_day',
-        'n_seed_show_no_symptom',
-        'n_seed_show_symptom_on_day',
-        'n_no_first_infection',
-        'n_first_infection_on_day',
-        'n_first_symptom',
-        'n_first_symptom_on_day',
-        'n_second_symptom',
-        'n_second_symptom_on_day',
-        'n_third_symptom',
-        'n_third_symptom_on_day',
-    ]
-    all_keys = set()
-    for file in files:
-        result = defaultdict(int)
-        with open(file) as input:
-            for line in input:
-                key, value = line.rstrip().split('\t')
-                all_keys.add(key)
-                result[key] = value
-        all_results.append(result)
-    # let us find all keys:
-    available_keys = []
-    for key in keys:
-        if key in all_keys:
-            available_keys.append(key)
+
+import numpy as np
+
+# keys that are written first, in this order, each followed by keys with
+# the key and a numeric suffix (e.g. n_remaining_popsize_64) sorted by number
+KEYS = [
+    'logfile',
+    'popsize',
+    'handle_symptomatic',
+    'prop_asym_carriers',
+    'leadtime',
+    'interval',
+    'n_simulation',
+    'total_infection',
+    'total_infection_failed',
+    'total_infection_avoided',
+    'total_infection_ignored',
+    'total_show_symptom',
+    'total_removal',
+    'total_quarantine',
+    'total_reintegration',
+    'total_abort',
+    'total_asym_infection',
+    'total_presym_infection',
+    'total_sym_infection',
+    'n_remaining_popsize',
+    'n_no_outbreak',
+    'n_outbreak_duration',
+    'n_no_infected_by_seed',
+    'n_num_infected_by_seed',
+    'n_first_infected_by_seed_on_day',
+    'n_seed_show_no_symptom',
+    'n_seed_show_symptom_on_day',
+    'n_no_first_infection',
+    'n_first_infection_on_day',
+    'n_first_symptom',
+    'n_first_symptom_on_day',
+    'n_second_symptom',
+    'n_second_symptom_on_day',
+    'n_third_symptom',
+    'n_third_symptom_on_day',
+]
+
+_NUMBERED_KEY = re.compile(r'^(.*)_(\d+)$')
+
+
+def read_summary(filename):
+    '''Return keys and values of summary report ``filename`` as
+    newline-separated strings, which are faster to send between processes
+    than lists and are the same for reports with the same keys.'''
+    with open(filename) as summary:
+        content = summary.read().rstrip('\n')
+    if not content:
+        return '', ''
+    lines = content.split('\n')
+    fields = content.replace('\t', '\n').split('\n')
+    if len(fields) != 2 * len(lines):
+        # lines without or with more than one tab
+        fields = []
+        for line in lines:
+            key, sep, value = line.partition('\t')
+            if sep:
+                fields.extend([key, value])
+    return '\n'.join(fields[0::2]), '\n'.join(fields[1::2])
+
+
+def order_keys(keys):
+    '''Return indexes of ``keys`` in the order of output, namely keys in
+    ``KEYS`` followed by their numbered keys, and other keys in the order
+    they appear.'''
+    rank = {x: i for i, x in enumerate(KEYS)}
+
+    def sort_key(item):
+        idx, key = item
+        if key in rank:
+            return (rank[key], 0, 0)
+        matched = _NUMBERED_KEY.match(key)
+        if matched and matched.group(1) in rank:
+            return (rank[matched.group(1)], 1, int(matched.group(2)))
+        return (len(KEYS), 0, idx)
+
+    return [x[0] for x in sorted(enumerate(keys), key=sort_key)]
+
+
+def merge_results(files, output=None, by_file=False, jobs=None):
+    '''Merge summary reports ``files`` into a table with a row for each key
+    and a column for each report, or with a row for each report and a column
+    for each key if ``by_file`` is True. Reports are read in parallel by
+    ``jobs`` processes, and keys missing from a report have value 0. The
+    table is written to ``output`` (standard output if None) as tab-separated
+    values, or in Parquet format if ``output`` has extension ``.parquet``.'''
+    key_index = {}
+    # rows of keys of reports, which usually have the same keys
+    key_rows = {}
+    columns = []
+    with multiprocessing.Pool(jobs) as pool:
+        for keys, values in pool.imap(read_summary, files, chunksize=64):
+            # union of keys is built as reports are read
+            if keys not in key_rows:
+                key_rows[keys] = np.array([
+                    key_index.setdefault(x, len(key_index))
+                    for x in keys.split('\n')
+                ] if keys else [],
+                                          dtype=int)
+            columns.append(
+                (key_rows[keys], values.split('\n') if keys else []))
+    all_keys = list(key_index)
+    order = np.array(order_keys(all_keys), dtype=int)
+
+    table = np.full((len(all_keys), len(files)), '0', dtype=object)
+    for col, (rows, values) in enumerate(columns):
+        table[rows, col] = values
+    table = table[order]
+    keys = [all_keys[x] for x in order]
+
+    if output is not None and output.endswith('.parquet'):
+        import pandas as pd
+        if by_file:
+            data = pd.DataFrame(table.T, columns=keys)
+            data.insert(0, 'file', files)
         else:
-            matching_keys = [x for x in all_keys if x.startswith(key)]
-            matching_keys.sort(key=lambda x: int(x.rsplit('_', 1)[-1]))
-            available_keys.extend(matching_keys)
-    # now get available keys from all results
-    for key in available_keys:
-        sys.stdout.write(key)
-        for res in all_results:
-            sys.stdout.write('\t' + str(res[key]))
-        sys.stdout.write('\n')
+            data = pd.DataFrame(table, columns=files)
+            data.insert(0, 'key', keys)
+        for column in data.columns:
+            try:
+                data[column] = pd.to_numeric(data[column])
+            except (ValueError, TypeError):
+                pass
+        data.to_parquet(output, index=False)
+        return
+
+    if by_file:
+        lines = ['file\t' + '\t'.join(keys)] + [
+            f'{name}\t' + '\t'.join(row) for name, row in zip(files, table.T)
+        ]
+    else:
+        lines = [
+            f'{key}\t' + '\t'.join(row) for key, row in zip(keys, table)
+        ]
+    out = sys.stdout if output is None else open(output, 'w')
+    try:
+        out.write('\n'.join(lines) + '\n')
+    finally:
+        if output is not None:
+            out.close()
 
 
 if __name__ == '__main__':
-    input_files = sys.argv[1:]
-    merge_results(input_files, 'merged_result.txt')
\ No newline at end of file
+    parser = argparse.ArgumentParser(
+        'merge_summary',
+        description='''Merge summary reports of multiple simulations into a table
+            with a row for each key and a column for each report.''')
+    parser.add_argument('files', nargs='+', help='''Summary reports to merge.''')
+    parser.add_argument(
+        '-o',
+        '--output',
+        help='''Output file, default to standard output. The table is written in
+            Parquet format, which requires pyarrow or fastparquet, if the file has
+            extension .parquet.''')
+    parser.add_argument(
+        '--by-file',
+        action='store_true',
+        help='''Write a row for each report and a column for each key.''')
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        help='''Number of processes to read the reports, default to number of CPUs.''')
+    args = parser.parse_args()
+
+    merge_results(args.files, args.output, by_file=args.by_file, jobs=args.jobs)
@@ -1,92 +1,93 @@
-import pandas as pd
-import re
-import sys
 import argparse
+import multiprocessing
+import os
+import sys
 
-
-def identify_timestamps(dictionary):
-    timestamps = sorted(
-        set([float(x.rsplit('_', 1)[1]) for x in dictionary.keys() if '_' in x
-            ]))
-    return timestamps
-
-
-def delete_extra(dictionary):
-    temp_dict = {
-        x[0]: x[1] for x in dictionary.items() if '.' in x[0]
-    }
-
-    name = [x.rsplit('_', 1)[0] for x in temp_dict.keys()]
-    del_list_2 = [x for x in name if name.count(x) < 3]
-
-    return {
-        x[0]: x[1]
-        for x in temp_dict.items()
-        if x[0].rsplit('_', 1)[0] not in del_list_2
-    }
-
-
-def identify_columns(dictionary, num_simulations):
-    columns = []
-    temp = [sorted(list(set(x.rsplit('_', 1)[0] for x in dictionary.keys())))
-           ][0]
-    for x in temp:
-        l_temp = [x + '_%s' % s for s in range(1, int(num_simulations) + 1)]
-        columns += l_temp
-    return columns
+import numpy as np
+import pandas as pd
 
 
-def fill_cells(dictionary, dataframe):
-    for x in dictionary.keys():
-        row = float(x.rsplit('_', 1)[1])
-        value_list = (dictionary[x].strip('\n').split(', '))
-        for y in enumerate(value_list):
-            if re.search(':', y[1]):
-                column = x.rsplit('_', 1)[0] + '_' + str(y[1].split(':')[0])
-                value = y[1].split(':')[1]
-            else:
-                column = x.rsplit('_', 1)[0] + '_' + str(y[0] + 1)
-                value = y[1]
-            dataframe.at[row, column] = value
+def parse_report(lines):
+    '''Parse time-stamped statistics such as ``n_infected_10.00`` with values
+    ``1:10, 2:14`` from lines of a report and return a data frame with columns
+    time, stat, replicate and value. Values without replicate IDs, such as
+    ``avg_n_infected_10.00``, are numbered from 1.'''
+    times, stats, replicates, values = [], [], [], []
+    for line in lines:
+        key, _, value = line.rstrip('\n').partition('\t')
+        name, _, time = key.rpartition('_')
+        # statistics with time stamps
+        if not name or '.' not in time:
+            continue
+        try:
+            time = float(time)
+        except ValueError:
+            continue
+        items = value.split(', ')
+        if ':' in items[0]:
+            pairs = np.array(value.replace(', ', ':').split(':')).reshape(-1, 2)
+            replicates.append(pairs[:, 0])
+            values.append(pairs[:, 1])
+        else:
+            replicates.append(np.arange(1, len(items) + 1).astype(str))
+            values.append(np.array(items))
+        times.append(np.full(len(items), time))
+        stats.append(np.full(len(items), name, dtype=object))
+    if not times:
+        return pd.DataFrame(columns=['time', 'stat', 'replicate', 'value'])
+    data = pd.DataFrame({
+        'time': np.concatenate(times),
+        'stat': np.concatenate(stats),
+        'replicate': np.concatenate(replicates).astype(int),
+        'value': pd.to_numeric(np.concatenate(values), errors='coerce'),
+    })
+    # statistics reported less than three times are not time series
+    counts = data.groupby('stat')['time'].nunique()
+    return data[data['stat'].isin(counts.index[counts >= 3])].reset_index(
+        drop=True)
+
+
+def to_wide(data):
+    '''Return a data frame indexed by time with a column ``stat_replicate``
+    for each statistic and replicate.'''
+    wide = data.pivot(
+        index='time', columns=['stat', 'replicate'],
+        values='value').sort_index(axis=1).dropna(
+            axis=1, how='all')
+    wide.columns = [f'{x}_{y}' for x, y in wide.columns]
+    return wide.sort_index()
+
+
+def write_table(data, ofile, fmt, **kwargs):
+    if fmt == 'parquet':
+        data.columns = data.columns.astype(str)
+        data.to_parquet(ofile)
+    else:
+        data.to_csv(
+            sys.stdout if ofile is None else ofile,
+            index=not isinstance(data.index, pd.RangeIndex),
+            **kwargs)
 
 
-def report2csv(ifile, ofile, **kwargs):
+def report2csv(ifile, ofile, layout='wide', fmt='csv', **kwargs):
+    '''Convert time-stamped statistics in report ``ifile`` (standard input if
+    None) to a table in ``layout`` (``wide`` or ``long``) and write it to
+    ``ofile`` (standard output if None) in format ``fmt`` (``csv`` or
+    ``parquet``).'''
     if not ifile:
-        pq_lines = sys.stdin.readlines()
+        data = parse_report(sys.stdin)
     else:
         with open(ifile) as f:
-            pq_lines = f.readlines()
+            data = parse_report(f)
+    if layout == 'wide':
+        data = to_wide(data)
+    write_table(data, ofile, fmt, **kwargs)
 
-    # creates dictionary
-    pq_dict = {}
-    for i in pq_lines:
-        keyvalue = i.split("\t")
-        pq_dict[keyvalue[0]] = keyvalue[1].rstrip('\n')
-    num_simulations = pq_dict['n_simulation']
 
-    # finds and deletes keys without time stamps 1. deletes anything without numbers 2.
-    # deletes anything that only occurs once
-    pq_dict = delete_extra(pq_dict)
-
-    # finds timestamp
-    time_index = (identify_timestamps(pq_dict))
-
-    # finds column name
-    column_names = identify_columns(pq_dict, num_simulations)
-
-    # create pandas dataframe
-    pq_df = pd.DataFrame(columns=column_names, index=time_index)
-    pq_df.index.name = 'time'
-    
-    # fill cells using dictionary
-    fill_cells(pq_dict, pq_df)
-
-    # drops columns with no data
-    pq_df = pq_df.astype(float)
-    pq_df = pq_df.dropna(axis=1, how='all')
-
-    # prints to csv file or to standard output
-    pq_df.to_csv(sys.stdout if ofile is None else ofile, **kwargs)
+def _convert(task):
+    ifile, ofile, layout, fmt, kwargs = task
+    report2csv(ifile, ofile, layout, fmt, **kwargs)
+    return ofile
 
 
 if __name__ == '__main__':
@@ -97,15 +98,58 @@ if __name__ == '__main__':
     )
     parser.add_argument(
         'input',
-        nargs='?',
-        help='''Report generated by outbreak_simulator file, use standard input
+        nargs='*',
+        help='''Reports generated by outbreak_simulator, use standard input
             if left unspecified.''')
     parser.add_argument(
-        '-o', '--output', help='Output file, default to standard output')
+        '-o',
+        '--output',
+        help='''Output file, default to standard output. If multiple reports are
+            specified, a directory to which a file named after each report is
+            written, default to the current directory.''')
     parser.add_argument(
         '--sep',
         default=',',
         help='''Field delimiter for the output file. Default to ",", use "\t" for tab.'''
     )
+    parser.add_argument(
+        '--layout',
+        choices=['wide', 'long'],
+        default='wide',
+        help='''Write a column for each statistic and replicate with a row for each
+            time point (wide, default), or a row for each time, statistic and replicate
+            (long).''')
+    parser.add_argument(
+        '--format',
+        choices=['csv', 'parquet'],
+        help='''Format of output, default to parquet if the output file has extension
+            .parquet and csv otherwise. Parquet output requires pyarrow or fastparquet.'''
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        help='''Number of processes to convert multiple reports, default to number
+            of CPUs.''')
     args = parser.parse_args()
-    report2csv(args.input, args.output, sep=args.sep.replace("\\t", "\t"))
+
+    fmt = args.format
+    if fmt is None:
+        fmt = 'parquet' if args.output and args.output.endswith(
+            '.parquet') else 'csv'
+    kwargs = {} if fmt == 'parquet' else {'sep': args.sep.replace("\\t", "\t")}
+
+    if len(args.input) <= 1:
+        report2csv(args.input[0] if args.input else None, args.output,
+                   args.layout, fmt, **kwargs)
+    else:
+        outdir = args.output or '.'
+        os.makedirs(outdir, exist_ok=True)
+        tasks = [(x,
+                  os.path.join(outdir,
+                               os.path.splitext(os.path.basename(x))[0] + '.' +
+                               fmt), args.layout, fmt, kwargs)
+                 for x in args.input]
+        with multiprocessing.Pool(args.jobs) as pool:
+            for ofile in pool.imap(_convert, tasks):
+                print(f'Output written to {ofile}')
@@ -0,0 +1,185 @@
+"""Content-addressed cache of simulation logs."""
+import hashlib
+import json
+import os
+import shutil
+
+from .logindex import LogIndex, LogWriter, compression, index_file
+
+# options that do not change the content of simulated replicates
+NON_SEMANTIC_OPTIONS = {
+    'repeats', 'resume', 'logfile', 'jobs', 'version', 'summarize_model',
+    'summary_report', 'profile', 'coordinator', 'worker', 'chunk_size',
+    'lease_timeout', 'authkey', 'cache_dir', 'cache_size', 'snapshot_at',
+    'checkpoint_interval', 'snapshot_file'
+}
+
+
+def parse_size(size):
+    '''Parse size such as 500M or 2G to number of bytes.'''
+    if size is None:
+        return None
+    units = {'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
+    try:
+        if size[-1].upper() in units:
+            return int(float(size[:-1]) * units[size[-1].upper()])
+        return int(size)
+    except Exception as e:
+        raise ValueError(
+            f'Invalid cache size {size}: a number with optional unit K, M, G or T expected.'
+        ) from e
+
+
+def snapshot_digest(snapshot, repeats):
+    '''Return a digest of the content of snapshot files ``snapshot`` of
+    replicates 1 to ``repeats``, or None if no snapshot is loaded.'''
+    if not snapshot:
+        return None
+    digest = hashlib.sha256()
+    filenames = [snapshot.format(id=id) for id in range(1, repeats + 1)
+                ] if '{id}' in snapshot else [snapshot]
+    for filename in filenames:
+        # replicates without a snapshot file are simulated from the beginning
+        if not os.path.isfile(filename):
+            continue
+        digest.update(filename.encode())
+        with open(filename, 'rb') as snapshot_file:
+            for block in iter(lambda: snapshot_file.read(1024 * 1024), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(args, params):
+    '''Return a key that identifies simulations performed with ``args`` and
+    model ``params``, namely normalized parameters, simulator options,
+    plugin options, content of loaded snapshots, version of the simulator
+    and random seed.'''
+    from . import __version__
+
+    options = {
+        x: y
+        for x, y in sorted(vars(args).items())
+        if x not in NON_SEMANTIC_OPTIONS and x != 'plugin'
+    }
+    content = json.dumps(
+        {
+            'params': str(params),
+            'options': options,
+            'plugin': args.plugin,
+            'snapshot': snapshot_digest(
+                getattr(args, 'load_snapshot', None), args.repeats),
+            'version': __version__,
+            'seed': getattr(args, 'seed', None),
+        },
+        sort_keys=True,
+        default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class ResultCache(object):
+    '''Logs of completed simulations stored under ``cache_dir``, one file per
+    key. Entries are evicted in the order of last access if the total size
+    exceeds ``max_size`` bytes.'''
+
+    def __init__(self, cache_dir, max_size=None):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _logfile(self, key):
+        # cached logfiles keep the compression of stored logfiles
+        filename = os.path.join(self.cache_dir, f'{key}.log')
+        for ext in ('.gz', '.zst'):
+            if os.path.isfile(filename + ext):
+                return filename + ext
+        return filename
+
+    def _metafile(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def lookup(self, key):
+        '''Return number of replicates cached for ``key``.'''
+        try:
+            with open(self._metafile(key)) as meta:
+                n_replicates = json.load(meta)['replicates']
+        except (OSError, ValueError, KeyError):
+            return 0
+        if not os.path.isfile(self._logfile(key)):
+            return 0
+        # mark as recently used
+        os.utime(self._metafile(key))
+        return n_replicates
+
+    def retrieve(self, key, logfile, repeats):
+        '''Write the first ``repeats`` cached replicates to ``logfile`` and
+        return the number of replicates written. Cached replicates are
+        recompressed if ``logfile`` has a different compression.'''
+        n_replicates = self.lookup(key)
+        if n_replicates == 0:
+            return 0
+        # index of previous content of logfile is outdated
+        if os.path.isfile(index_file(logfile)):
+            os.remove(index_file(logfile))
+        cached = self._logfile(key)
+        if n_replicates <= repeats and compression(cached) == compression(
+                logfile):
+            shutil.copyfile(cached, logfile)
+            return n_replicates
+        index = LogIndex.load(cached)
+        with LogWriter(logfile) as writer:
+            for id in index.entries['id'].tolist():
+                if id <= repeats:
+                    writer.write(id, index.read(id), 'END')
+        return min(n_replicates, repeats)
+
+    def store(self, key, logfile, replicates, cmd=None):
+        '''Save ``logfile`` with ``replicates`` completed replicates to cache
+        unless more replicates are already cached.'''
+        if replicates <= self.lookup(key):
+            return
+        # write to temporary files so that the entry is never half written
+        filename = os.path.join(self.cache_dir, f'{key}.log')
+        if compression(logfile) is not None:
+            filename += '.' + compression(logfile)
+        shutil.copyfile(logfile, filename + '.tmp')
+        if self._logfile(key) != filename and os.path.isfile(
+                self._logfile(key)):
+            os.remove(self._logfile(key))
+        os.replace(filename + '.tmp', filename)
+        with open(self._metafile(key) + '.tmp', 'w') as meta:
+            json.dump({'replicates': replicates, 'cmd': cmd}, meta)
+        os.replace(self._metafile(key) + '.tmp', self._metafile(key))
+        self.evict(keep=key)
+
+    def entries(self):
+        '''Return (last access, size, key) of cached entries.'''
+        res = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.json'):
+                continue
+            key = filename[:-5]
+            try:
+                res.append((os.path.getmtime(self._metafile(key)),
+                            os.path.getsize(self._logfile(key)) +
+                            os.path.getsize(self._metafile(key)), key))
+            except OSError:
+                continue
+        return res
+
+    def evict(self, keep=None):
+        '''Remove least recently used entries until the cache fits in
+        ``max_size``. Entry ``keep`` is removed only if it alone exceeds the
+        limit.'''
+        if self.max_size is None:
+            return
+        entries = sorted(self.entries())
+        total = sum(x[1] for x in entries)
+        for _, size, key in entries:
+            if total <= self.max_size:
+                break
+            if key == keep and total - size > 0:
+                continue
+            for filename in (self._metafile(key), self._logfile(key)):
+                if os.path.isfile(filename):
+                    os.remove(filename)
+            total -= size
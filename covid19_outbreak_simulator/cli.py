@@ -3,16 +3,21 @@ import argparse
 import cProfile
 import multiprocessing
 import os
+import random
 import subprocess
 import sys
 from datetime import datetime
 from io import StringIO
 
 import numpy as np
-from tqdm import tqdm
 
+from .logindex import LogIndex, LogWriter, compression, compressor
 from .model import Params, summarize_model
 from .simulator import Simulator, load_plugins
+from .tau_leaping import TauLeapingSimulator
+from .timeseries import (TimeSeriesSummary, group_names, series_names,
+                         time_points)
+from .utils import parse_stop_if
 
 
 def parse_args(args=None):
@@ -128,8 +133,9 @@ def parse_args(args=None):
         '--resume',
         action='store_true',
         help='''If true, resume from last interrupted simulations. Existing logfile will not
-            be erased if exists. Note that this option does not check if the previous simulations
-            use the same options, or if they have corrected completed.''')
+            be erased if exists, and replicates that are not completed according to the index
+            of the logfile (logfile.idx) will be simulated. Note that this option does not check
+            if the previous simulations use the same options.''')
     parser.add_argument(
         '--handle-symptomatic',
         nargs='*',
@@ -166,7 +172,11 @@ def parse_args(args=None):
         '--interval',
         default=1 / 24,
         help='Interval of simulation, default to 1/24, by hour')
-    parser.add_argument('--logfile', default='simulation.log', help='logfile')
+    parser.add_argument(
+        '--logfile',
+        default='simulation.log',
+        help='''Logfile to which events are written. Logfiles with extension .gz or .zst
+            are compressed by gzip or zstd (requires package zstandard).''')
 
     parser.add_argument(
         '--prop-asym-carriers',
@@ -178,10 +188,17 @@ def parse_args(args=None):
     parser.add_argument(
         '--stop-if',
         nargs='*',
-        help='''Condition at which the simulation will end. By default the simulation
+        help='''Conditions at which the simulation will end. By default the simulation
             stops when all individuals are affected or all infected individuals
-            are removed. Current you can specify a time after which the simulation
-            will stop in the format of `--stop-if "t>10"' (for 10 days).''')
+            are removed. You can specify a time after which the simulation
+            will stop in the format of `--stop-if "t>10"' (for 10 days), conditions
+            on counters n_popsize, n_infected (cumulative number of infections),
+            n_active (infected individuals who have not recovered), n_infectors
+            (individuals who can still infect others) and n_quarantined, such as
+            "n_active==0" or "n_infected>500", which are checked after each time
+            step, and "extinct" to stop when there is no active or pending infection
+            and no pending plugin (init, insert, community_infection) that seeds
+            infections. The simulation stops if any of the conditions is met.''')
     parser.add_argument(
         '--leadtime',
         help='''With "leadtime" infections are assumed to happen before the simulation.
@@ -225,11 +242,173 @@ def parse_args(args=None):
             supports this feature.''')
     parser.add_argument(
         '--summary-report',
-        help=argparse.SUPPRESS)
+        help='''Summarize replicates in the logfile and write summary statistics to
+            the specified file after the simulation.''')
+    parser.add_argument(
+        '--time-series',
+        help='''Record numbers of active infections, cumulative infections,
+            individuals in quarantine and cumulative removals of the population
+            and of each named group at time points 0, --time-series-interval, ...
+            till --time-series-end of each replicate, and write the mean, minimum,
+            --time-series-quantiles and maximum of each series at each time point
+            across replicates to the specified file. Quantiles are estimated with
+            t-digests that are updated as replicates are completed, so time series
+            of individual replicates are not stored.''')
+    parser.add_argument(
+        '--time-series-interval',
+        type=float,
+        default=1,
+        help='''Interval between time points of --time-series, default to 1 (day).''')
+    parser.add_argument(
+        '--time-series-end',
+        type=float,
+        help='''Last time point of --time-series, default to the time of --stop-if.
+            Replicates that end earlier keep their last state till this time.''')
+    parser.add_argument(
+        '--time-series-quantiles',
+        nargs='+',
+        type=float,
+        default=[0.025, 0.25, 0.5, 0.75, 0.975],
+        help='''Quantiles of --time-series across replicates, default to 0.025, 0.25,
+            0.5, 0.75 and 0.975, which are the median with 50%% and 95%% bands.''')
     parser.add_argument(
         '--profile',
         help='''Profile worker and write profile result to specified file'''
     )
+    parser.add_argument(
+        '--coordinator',
+        metavar='ADDRESS',
+        help='''Instead of simulating locally, serve replicates to any number of
+            worker hosts (started with --worker ADDRESS) at ADDRESS, which can be
+            HOST:PORT for a TCP socket or the path to a Unix socket. Replicates are
+            handed out in chunks, idle workers steal work from slow ones, and chunks
+            of lost workers are reassigned after --lease-timeout. Results are written
+            to --logfile in replicate order.''')
+    parser.add_argument(
+        '--worker',
+        metavar='ADDRESS',
+        help='''Run as a worker host of a coordinator at ADDRESS with -j processes.
+            Simulation options are received from the coordinator so all other options
+            are ignored. Plugins loaded from external modules should be importable
+            on all worker hosts.''')
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        help='''Maximum number of replicates handed to a worker in one request with
+            --coordinator. Default to a guided size that decreases as fewer replicates
+            remain.''')
+    parser.add_argument(
+        '--lease-timeout',
+        type=float,
+        default=600,
+        help='''Seconds after which replicates assigned to a worker that has not
+            reported any result are reassigned to other workers, default to 600.''')
+    parser.add_argument(
+        '--authkey',
+        help='''Authentication key shared by the coordinator and its workers, which
+            can also be specified with environment variable
+            OUTBREAK_SIMULATOR_AUTHKEY. Anyone with the key can run code on the
+            coordinator and workers so it should be kept secret. A random key is
+            generated and printed by the coordinator if no key is specified, and
+            workers require a key.''')
+    parser.add_argument(
+        '--seed',
+        type=int,
+        help='''Seed of random number generators. Each replicate is simulated with
+            its own seed derived from SEED and the ID of the replicate so results
+            do not depend on the number of jobs. Default to a random seed.''')
+    parser.add_argument(
+        '--common-random-numbers',
+        action='store_true',
+        help='''Draw random numbers of the infection process, namely susceptibility,
+            asymptomatic status, production number, incubation period, transmission
+            and selection of infectees, from random streams that are specific to each
+            individual and replicate. Replicates with the same ID and --seed are then
+            aligned across scenarios, which reduces the variance of paired comparisons.
+            This option requires --seed.''')
+    parser.add_argument(
+        '--splitting-levels',
+        nargs='+',
+        type=int,
+        help='''Estimate the probability that the cumulative number of infections
+            reaches the last of the specified increasing levels with multilevel
+            splitting. Each time a replicate reaches one of the other levels,
+            --splitting-factor - 1 clones are simulated from its state, and the
+            number of paths that reach the last level is recorded as n_reached in
+            the END record. The estimated probability and its standard error are
+            printed after all replicates are simulated.''')
+    parser.add_argument(
+        '--splitting-factor',
+        type=int,
+        default=4,
+        help='''Number of paths into which a replicate is split at each intermediate
+            level of --splitting-levels, default to 4.''')
+    parser.add_argument(
+        '--engine',
+        choices=['event', 'branching', 'tau-leaping'],
+        default='event',
+        help='''Simulation engine. The default "event" engine simulates each
+            infection, symptom, removal and recovery as an event. The "branching"
+            engine simulates the same events but creates individuals only when they
+            are infected or selected for infection, until the cumulative number of
+            infections exceeds --branching-threshold of the population, after
+            which the rest of the population is created. It is much faster for the
+            early phase of outbreaks in large populations but does not support
+            --vicinity and --common-random-numbers, and plugins that examine the
+            population create the entire population. The "tau-leaping"
+            engine advances the population in steps of --interval days and draws
+            the number of infections of each step from the transmissibility curves
+            of infectors, which is much faster for large populations. It writes
+            only START, END and records of plugins stat, init, community_infection
+            and vaccinate, which are the only plugins it supports, and supports
+            only "remove", "keep", and "quarantine" for --handle-symptomatic.''')
+    parser.add_argument(
+        '--branching-threshold',
+        type=float,
+        default=0.05,
+        help='''Proportion of cumulative infections in the population after which
+            the "branching" engine creates the rest of the population, default to
+            0.05.''')
+    parser.add_argument(
+        '--cache-dir',
+        help='''Directory to cache simulation logs. Logs are identified by model
+            parameters, simulation and plugin options, version of the simulator and
+            --seed so a run with identical options reuses cached replicates and only
+            simulates replicates that are not cached.''')
+    parser.add_argument(
+        '--cache-size',
+        help='''Maximum size of --cache-dir such as 500M or 10G. Least recently used
+            logs are removed if the cache grows beyond this size. Default to
+            unlimited.''')
+    parser.add_argument(
+        '--snapshot-at',
+        type=float,
+        help='''Save the state of the simulation, including population, pending
+            events, plugins and random number generators, at specified time to
+            --snapshot-file. Simulations can be continued from the snapshot with
+            different plugins using option --load-snapshot. Replicates that end
+            before the specified time are saved at their end and are written
+            unchanged by --load-snapshot.''')
+    parser.add_argument(
+        '--checkpoint-interval',
+        type=float,
+        help='''Save the state of the simulation to --snapshot-file every specified
+            seconds so that long simulations can be continued with option
+            --load-snapshot after they are interrupted. Checkpoints are removed after
+            the replicates are completed.''')
+    parser.add_argument(
+        '--snapshot-file',
+        default='snapshot_{id}.pkl',
+        help='''File to save snapshots, where {id} will be replaced by the ID of the
+            replicate. Default to "snapshot_{id}.pkl".''')
+    parser.add_argument(
+        '--load-snapshot',
+        help='''Continue simulations from a snapshot saved with --snapshot-at or
+            --checkpoint-interval, with {id} replaced by the ID of the replicate. All
+            replicates continue from the same snapshot if {id} is not used. Plugins
+            specified with --plugin replace plugins saved in the snapshot. Replicates
+            without a snapshot file are simulated from the beginning if {id} is
+            used.''')
     return parser.parse_args(args)
 
 
@@ -256,15 +435,80 @@ class FilteredStringIO(StringIO):
             super().write(text)
 
 
+def simulate_replicate(params, simu_args, cmd, id):
+    '''Simulate replicate ``id`` and return its log, the exception (or None)
+    that terminated the simulation, and values of its time series (or None if
+    --time-series is unspecified or the simulation failed).'''
+    if getattr(simu_args, 'seed', None) is not None:
+        np.random.seed([simu_args.seed, id])
+        random.seed(simu_args.seed * 1000003 + id)
+    simulator = TauLeapingSimulator if getattr(
+        simu_args, 'engine', 'event') == 'tau-leaping' else Simulator
+    with FilteredStringIO(track_events=simu_args.track_events) as logger:
+        simu = simulator(
+            params=params, logger=logger, simu_args=simu_args, cmd=cmd)
+        try:
+            simu.simulate(id)
+        except (SystemExit, Exception) as e:
+            msg = repr(e).replace('\n', ' ').replace('\t',
+                                                     ' ').replace(',', ' ')
+            logger.write(f'0.00\tERROR\t.\texception={msg}\n')
+            return logger.getvalue(), e, None
+        series = None if simu.time_series is None else simu.time_series.values
+        return logger.getvalue(), None, series
+
+
+def format_result(id, result):
+    '''Return records of log ``result`` of replicate ``id`` with the ID of the
+    replicate, and fields of its last record.'''
+    lines = result.splitlines()
+    first_fields = lines[0].split('\t')
+    if len(first_fields) != 4 or first_fields[1] != 'START':
+        raise ValueError(f'Wrong starting record reported: {lines[0]}')
+    last_fields = lines[-1].split('\t')
+    if len(last_fields) != 4 or last_fields[1] not in ('END', 'ERROR'):
+        raise ValueError(f'Wrong last record reported: {lines[-1]} ')
+    return ''.join(f'{id}\t{line}\n' for line in lines), last_fields
+
+
+def write_result(logger, id, result):
+    '''Write log of replicate ``id`` to logfile with a ``LogWriter`` and return
+    its last event.'''
+    records, last_fields = format_result(id, result)
+    logger.write(id, records, last_fields[1])
+    if last_fields[1] == 'ERROR':
+        raise RuntimeError(last_fields[2])
+    return last_fields[1]
+
+
+def append_result(logger, shards, result):
+    '''Append replicate that is written by a worker to its shard to logfile
+    with a ``LogWriter``, and return its last event. ``result`` consists of ID,
+    last event and its target, and shard, position, size and uncompressed
+    length of the replicate, and its time series, or ID, None and message of
+    the error if the worker failed to write the replicate. Shards are opened
+    to dictionary ``shards``.'''
+    id, event, target, shard, position, size, length, _ = result
+    if event is None:
+        raise ValueError(target)
+    if shard not in shards:
+        shards[shard] = open(shard, 'rb')
+    logger.copy(id, shards[shard].fileno(), position, size, length, event)
+    if event == 'ERROR':
+        raise RuntimeError(target)
+    return event
+
+
 class Worker(multiprocessing.Process):
 
-    def __init__(self, task_queue, result_queue, args, cmd):
+    def __init__(self, task_queue, result_queue, args, cmd, shard):
         multiprocessing.Process.__init__(self)
         self.task_queue = task_queue
         self.result_queue = result_queue
         self.params = Params(args)
         self.simu_args = args
         self.cmd = cmd
+        self.shard = shard
 
     def run(self):
         # set random seed to a random number
@@ -273,43 +517,76 @@ class Worker(multiprocessing.Process):
             pr = cProfile.Profile()
             pr.enable()
 
-        while True:
-            id = self.task_queue.get()
-            if id is None:
-                self.task_queue.task_done()
-                break
-            with FilteredStringIO(
-                    track_events=self.simu_args.track_events) as logger:
-                simu = Simulator(
-                    params=self.params,
-                    logger=logger,
-                    simu_args=self.simu_args,
-                    cmd=self.cmd)
+        # replicates are written to the shard of the worker, compressed as
+        # separate blocks for compressed logfiles, and only their locations
+        # are sent to the main process
+        compress = None if compression(
+            self.simu_args.logfile) is None else compressor(
+                self.simu_args.logfile)
+        with open(self.shard, 'wb') as shard:
+            while True:
+                id = self.task_queue.get()
+                if id is None:
+                    self.task_queue.task_done()
+                    break
+                result, error, series = simulate_replicate(
+                    self.params, self.simu_args, self.cmd, id)
                 try:
-                    simu.simulate(id)
-                except (SystemExit, Exception) as e:
-                    msg = repr(e).replace('\n',
-                                          ' ').replace('\t',
-                                                       ' ').replace(',', ' ')
-                    logger.write(f'0.00\tERROR\t.\texception={msg}\n')
+                    records, last_fields = format_result(id, result)
+                except ValueError as e:
+                    # invalid logs are reported to the main process
                     self.task_queue.task_done()
-                    self.result_queue.put(logger.getvalue())
-                    raise e
+                    self.result_queue.put(
+                        (id, None, str(e), None, None, None, None, None))
+                    raise
+                data = records.encode()
+                block = data if compress is None else compress(data)
+                position = shard.tell()
+                shard.write(block)
+                shard.flush()
                 self.task_queue.task_done()
-                self.result_queue.put(logger.getvalue())
+                self.result_queue.put(
+                    (id, last_fields[1], last_fields[2], self.shard, position,
+                     len(block), len(data), series))
+                if error is not None:
+                    raise error
 
         if self.simu_args.profile:
             pr.disable()
             pr.dump_stats(self.simu_args.profile)
 
+def strip_authkey(argv):
+    '''Remove option --authkey and its value from command line ``argv`` so
+    that the key is not written to logs or sent to workers.'''
+    res = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        name = arg.split('=', 1)[0]
+        # argparse accepts unique prefixes of long options
+        if len(name) > 2 and '--authkey'.startswith(name):
+            skip = '=' not in arg
+            continue
+        res.append(arg)
+    return res
+
+
 def main(argv=None):
     """Console script for covid19_outbreak_simulator."""
     args = parse_args(argv)
+    # command line that is logged, cached and served to workers
+    cmd = strip_authkey(argv if argv else sys.argv[1:])
     if args.version:
         from . import __version__
         print(f'COVID10 Outbreak Simulator version {__version__}')
         sys.exit(0)
 
+    if args.worker:
+        from .coordinator import run_worker
+        return run_worker(args.worker, args.jobs, args.authkey)
+
     if args.logfile and '/' in args.logfile:
         dirname = os.path.dirname(args.logfile)
         os.makedirs(dirname, exist_ok=True)
@@ -332,18 +609,72 @@ def main(argv=None):
         raise ValueError(f'Please use a single worker (-j 1) when profiling is enabled with --profile.')
 
     if args.stop_if is not None:
-        if args.stop_if[0].startswith('t>'):
-            #
-            try:
-                float(args.stop_if[0][2:])
-            except Exception as e:
+        try:
+            parse_stop_if(args.stop_if)
+        except ValueError as e:
+            raise ValueError(f'Invalid value for option --stop-if: {e}') from e
+
+    if args.common_random_numbers and args.seed is None:
+        raise ValueError('Option --common-random-numbers requires --seed.')
+
+    if args.splitting_levels:
+        if any(x <= 0 for x in args.splitting_levels) or any(
+                x >= y for x, y in zip(args.splitting_levels[:-1],
+                                       args.splitting_levels[1:])):
+            raise ValueError(
+                f'Option --splitting-levels should be increasing positive numbers: {" ".join(str(x) for x in args.splitting_levels)} provided.'
+            )
+        if args.splitting_factor < 1:
+            raise ValueError(
+                f'Option --splitting-factor should be a positive integer: {args.splitting_factor} provided.'
+            )
+        if args.common_random_numbers:
+            raise ValueError(
+                'Option --splitting-levels cannot be used with --common-random-numbers because clones of a replicate would not diverge.'
+            )
+
+    if args.engine == 'branching':
+        for option in ('vicinity', 'common_random_numbers'):
+            if getattr(args, option):
                 raise ValueError(
-                    f'Invalid value for option --stop-if "{args.stop_if[0]}": {e}'
-                ) from e
-        else:
+                    f'Option --{option.replace("_", "-")} is not supported by the branching engine.'
+                )
+
+    if args.engine == 'tau-leaping':
+        for option in ('handle_infection', 'splitting_levels', 'snapshot_at',
+                       'checkpoint_interval', 'load_snapshot',
+                       'common_random_numbers'):
+            if getattr(args, option):
+                raise ValueError(
+                    f'Option --{option.replace("_", "-")} is not supported by the tau-leaping engine.'
+                )
+
+    if args.time_series:
+        for option in ('coordinator', 'load_snapshot', 'resume', 'cache_dir'):
+            if getattr(args, option):
+                raise ValueError(
+                    f'Option --{option.replace("_", "-")} cannot be used with --time-series, which summarizes only replicates simulated locally in one run.'
+                )
+        if args.time_series_interval <= 0:
             raise ValueError(
-                'Option --stop-if currently only supports t>TIME to stop after certain time point.'
+                f'Option --time-series-interval should be a positive number: {args.time_series_interval} provided.'
             )
+        if args.time_series_end is None:
+            args.time_series_end = parse_stop_if(args.stop_if)[0]
+            if args.time_series_end is None:
+                raise ValueError(
+                    'Option --time-series requires --time-series-end or a time limit in --stop-if such as "t>100".'
+                )
+        if any(x < 0 or x > 1 for x in args.time_series_quantiles):
+            raise ValueError(
+                f'Option --time-series-quantiles should be between 0 and 1: {" ".join(str(x) for x in args.time_series_quantiles)} provided.'
+            )
+
+    if (args.snapshot_at is not None or args.checkpoint_interval
+            is not None) and args.repeats > 1 and '{id}' not in args.snapshot_file:
+        raise ValueError(
+            f'Option --snapshot-file should contain {{id}} to save snapshots of {args.repeats} replicates.'
+        )
 
     if args.summarize_model:
         summarize_model(args)
@@ -353,103 +684,141 @@ def main(argv=None):
 
     tasks = multiprocessing.JoinableQueue()
     results = multiprocessing.Queue()
-    completed_ids = 0
+    index = None
+    completed = set()
 
-    # check the last line
-    if os.path.isfile(args.logfile):
-        last_line = ''
-        try:
-            with open(args.logfile, 'rb') as f:
-                f.seek(-2, os.SEEK_END)
-                while f.read(1) != b'\n':
-                    f.seek(-2, os.SEEK_CUR)
-                last_line = f.readline().decode()
-        except:
-            pass
-        if not last_line:
-            completed_ids = 0
-        else:
-            fields = last_line.split('\t')
-            if len(fields) != 5:
-                raise ValueError(
-                    f'Existing file is corrupeted. Please fix before continue: "{last_line.strip()}" does not have five fields.'
-                )
-            if fields[2] != 'END':
-                raise ValueError(
-                    f'Last record of replicate ends with line "{last_line.strip()}" is not an "END" event. Please fix before continue.'
-                )
-            completed_ids = int(fields[0])
+    # completed replicates are identified from the index of the logfile
+    if os.path.isfile(args.logfile) and os.path.getsize(args.logfile) > 0:
+        index = LogIndex.load(args.logfile)
+        completed = index.completed()
 
     if args.resume:
-        if completed_ids == args.repeats:
+        if completed and max(completed) > args.repeats:
             print(
-                f'All simulations have been performed. Remove {args.logfile} if you would like to rerun.'
+                f'More than requested {args.repeats} replicates exists in {args.logfile}. Remove the logfile if you would like to rerun.'
             )
             return 0
-        if completed_ids > args.repeats:
+        if len(completed) == args.repeats:
             print(
-                f'More than requested {args.repeats} replicates exists in {args.logfile}. Remove the logfile if you would like to rerun.'
+                f'All simulations have been performed. Remove {args.logfile} if you would like to rerun.'
             )
             return 0
-        if completed_ids != 0:
+        if completed:
             print(
-                f'Resuming from {completed_ids} completed records in {args.logfile}'
+                f'Resuming from {len(completed)} completed records in {args.logfile}'
             )
-    elif completed_ids != 0:
+    elif completed:
         print(
-            f'Overwriting {completed_ids} completed records in {args.logfile}')
-        completed_ids = 0
+            f'Overwriting {len(completed)} completed records in {args.logfile}')
+        index = None
+        completed = set()
 
     if os.path.isfile(args.logfile + '.lock'):
         raise RuntimeError(
             f'The output logfile {args.logfile} is locked. Please remove {args.logfile}.lock manually if you are certain that no other process is writing to the logfile'
         )
 
+    time_series = None
+    if args.time_series:
+        time_series = TimeSeriesSummary(
+            series_names(group_names(args.popsize)),
+            time_points(args.time_series_interval, args.time_series_end))
+
     submitted = 0
+    workers = []
+    shards = []
+    opened_shards = {}
     try:
         with open(args.logfile + '.lock', 'w') as lock:
             lock.write(
                 f'START: {datetime.now().strftime("%m/%d/%Y-%H:%M:%S")}\n')
-            lock.write(f'CMD: {subprocess.list2cmdline(sys.argv)}')
-
-        workers = [
-            Worker(tasks, results, args, cmd=argv if argv else sys.argv[1:])
-            for i in range(min(args.jobs, args.repeats))
-        ]
-        for worker in workers:
-            worker.start()
-
-        with open(args.logfile, 'a' if completed_ids > 0 else 'w') as logger:
-            if completed_ids == 0:
-                logger.write('id\ttime\tevent\ttarget\tparams\n')
-            for i in range(args.repeats):
-                if i + 1 > completed_ids:
+            lock.write(
+                f'CMD: {subprocess.list2cmdline(sys.argv[:1] + cmd)}')
+
+        cache = None
+        if args.cache_dir:
+            from .cache import ResultCache, cache_key, parse_size
+            cache = ResultCache(args.cache_dir, parse_size(args.cache_size))
+            key = cache_key(args, Params(args))
+            if not completed:
+                n_retrieved = cache.retrieve(key, args.logfile, args.repeats)
+                if n_retrieved == args.repeats:
+                    print(f'Retrieved {n_retrieved} replicates from cache')
+                elif n_retrieved != 0:
+                    print(
+                        f'Retrieved {n_retrieved} replicates from cache, simulating the rest'
+                    )
+                if n_retrieved != 0:
+                    index = LogIndex.load(args.logfile)
+                    completed = index.completed()
+
+        # replicates that are missing, including those in between completed
+        # replicates of interrupted simulations
+        ids = [x for x in range(1, args.repeats + 1) if x not in completed]
+
+        if not ids:
+            # all replicates are retrieved from cache
+            pass
+        elif args.coordinator:
+            from .coordinator import serve
+            serve(args, cmd=cmd, ids=ids, index=index)
+        else:
+            from tqdm import tqdm
+
+            shards = [
+                f'{args.logfile}.shard{i}'
+                for i in range(min(args.jobs, args.repeats))
+            ]
+            workers = [
+                Worker(
+                    tasks,
+                    results,
+                    args,
+                    cmd=cmd,
+                    shard=shard) for shard in shards
+            ]
+            for worker in workers:
+                worker.start()
+
+            with LogWriter(args.logfile, index) as logger:
+                for id in ids:
                     submitted += 1
-                    tasks.put(i + 1)
-            for i in range(args.jobs):
-                tasks.put(None)
-            #
-            for i in tqdm(
-                    range(completed_ids, args.repeats),
-                    total=args.repeats,
-                    initial=completed_ids):
-                result = results.get()
-                lines = result.splitlines()
-                first_fields = lines[0].split('\t')
-                if len(first_fields) != 4 or first_fields[1] != 'START':
-                    raise ValueError(
-                        f'Wrong starting record reported: {lines[0]}')
-                last_fields = lines[-1].split('\t')
-                if len(last_fields) != 4 or last_fields[1] not in ('END',
-                                                                   'ERROR'):
-                    raise ValueError(
-                        f'Wrong last record reported: {lines[-1]} ')
-                logger.write(''.join(f'{i+1}\t{line}\n' for line in lines))
-                if last_fields[1] == 'ERROR':
-                    raise RuntimeError(last_fields[2])
-                if i % 1000 == 999:
-                    logger.flush()
+                    tasks.put(id)
+                for i in range(args.jobs):
+                    tasks.put(None)
+                #
+                # results are written in the order of IDs so that replicates
+                # simulated with --seed are reproducible
+                next_idx = 0
+                buffered = {}
+                for i in tqdm(
+                        range(len(ids)),
+                        total=args.repeats,
+                        initial=args.repeats - len(ids)):
+                    result = results.get()
+                    if result[1] != 'END':
+                        # report error right away
+                        append_result(logger, opened_shards, result)
+                    buffered[result[0]] = result
+                    while next_idx < len(ids) and ids[next_idx] in buffered:
+                        result = buffered.pop(ids[next_idx])
+                        append_result(logger, opened_shards, result)
+                        # replicates are summarized in the order of IDs so
+                        # that the summary is reproducible
+                        if time_series is not None:
+                            time_series.add(result[7])
+                        next_idx += 1
+                    if i % 1000 == 999:
+                        logger.flush()
+
+        if cache is not None:
+            cache.store(key, args.logfile, args.repeats, cmd=cmd)
     finally:
+        for shard in opened_shards.values():
+            shard.close()
+        for shard in shards:
+            if os.path.isfile(shard):
+                os.remove(shard)
         os.remove(args.logfile + '.lock')
 
     for worker in workers:
@@ -457,6 +826,21 @@ def main(argv=None):
         worker.join()
 
     print(f'Event logs written to {args.logfile}')
+    if time_series is not None:
+        time_series.write(args.time_series, args.time_series_quantiles)
+        print(f'Time series written to {args.time_series}')
+    if args.splitting_levels:
+        from .splitting import splitting_estimate
+        p, se, n = splitting_estimate(args.logfile, args.splitting_levels,
+                                      args.splitting_factor)
+        print(
+            f'Estimated probability of reaching {args.splitting_levels[-1]} infections: {p:.4g} (standard error {se:.2g}, {n} replicates)'
+        )
+    if args.summary_report:
+        from .summary import summarize_simulations
+        summarize_simulations(
+            args.logfile, args.summary_report, jobs=args.jobs)
+        print(f'Summary report written to {args.summary_report}')
     return 0
 
 
@@ -0,0 +1,339 @@
+"""Distribution of replicates to worker hosts through a coordinator process."""
+import math
+import multiprocessing
+import os
+import queue
+import secrets
+import socket
+import stat
+import threading
+import time
+from collections import deque
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+
+from .model import Params
+
+# seconds a worker host keeps trying to reach a coordinator that is not up yet
+CONNECT_TIMEOUT = 60
+
+# environment variable from which the authentication key is read if option
+# --authkey is not specified
+AUTHKEY_ENV = 'OUTBREAK_SIMULATOR_AUTHKEY'
+
+
+class CoordinatorManager(BaseManager):
+    pass
+
+
+def parse_address(address):
+    '''Return a (host, port) tuple for HOST:PORT and a path for Unix sockets.'''
+    if os.sep not in address and ':' in address:
+        host, port = address.rsplit(':', 1)
+        try:
+            return (host if host else socket.gethostname(), int(port))
+        except ValueError as e:
+            raise ValueError(
+                f'Invalid coordinator address {address}: HOST:PORT or path to a Unix socket expected.'
+            ) from e
+    return address
+
+
+def get_authkey(authkey, generate=False):
+    '''Return authentication key ``authkey``, or the value of environment
+    variable ``AUTHKEY_ENV`` if ``authkey`` is not specified. If neither is
+    specified, a random key is generated and printed if ``generate`` is True,
+    and a ValueError is raised otherwise.'''
+    if not authkey:
+        authkey = os.environ.get(AUTHKEY_ENV, '')
+    if authkey:
+        return authkey
+    if not generate:
+        raise ValueError(
+            f'Please specify the authentication key of the coordinator with option --authkey or environment variable {AUTHKEY_ENV}.'
+        )
+    authkey = secrets.token_hex(16)
+    print(f'Start workers with option --authkey {authkey}')
+    return authkey
+
+
+class Lease(object):
+
+    def __init__(self, id, worker, ids, timeout):
+        self.id = id
+        self.worker = worker
+        # the first ID is being simulated, the rest can be stolen
+        self.ids = ids
+        self.timeout = timeout
+        self.renew()
+
+    def renew(self):
+        self.deadline = time.time() + self.timeout
+
+
+class Coordinator(object):
+    '''Hands out chunks of replicate IDs to workers and collects their results.
+
+    A chunk is leased to a worker and the lease is renewed each time the worker
+    submits a result. Leases that are not renewed before ``lease_timeout`` are
+    returned to the pool of pending IDs. If no pending IDs remain, idle workers
+    take over the second half of the unstarted IDs of the largest lease.
+    '''
+
+    def __init__(self, ids, cmd, chunk_size=None, lease_timeout=600):
+        self.cmd = cmd
+        self.pending = deque(ids)
+        self.n_total = len(ids)
+        self.chunk_size = chunk_size
+        self.lease_timeout = lease_timeout
+        self.leases = {}
+        self.completed = set()
+        self.workers = set()
+        self.results = queue.Queue()
+        self.stopped = False
+        self._next_lease = 0
+        self._lock = threading.Lock()
+
+    def get_cmd(self):
+        return self.cmd
+
+    def register(self, worker):
+        with self._lock:
+            self.workers.add(worker)
+
+    def unregister(self, worker):
+        with self._lock:
+            self.workers.discard(worker)
+
+    def n_workers(self):
+        with self._lock:
+            return len(self.workers)
+
+    def stop(self):
+        with self._lock:
+            self.stopped = True
+
+    def _reclaim_expired(self):
+        now = time.time()
+        for lease_id in [
+                x for x, y in self.leases.items() if y.deadline < now
+        ]:
+            lease = self.leases.pop(lease_id)
+            self.pending.extendleft(reversed(lease.ids))
+
+    def _chunk_size(self):
+        # guided scheduling: large chunks first, smaller ones towards the end
+        size = math.ceil(len(self.pending) / (2 * max(1, len(self.workers))))
+        if self.chunk_size is not None:
+            size = min(size, self.chunk_size)
+        return max(1, size)
+
+    def _steal(self):
+        victim = max(
+            self.leases.values(), key=lambda x: len(x.ids), default=None)
+        if victim is None or len(victim.ids) < 2:
+            return []
+        # half of the unstarted IDs, rounded up, namely all but the first ID,
+        # which is being simulated by the victim
+        n_stolen = len(victim.ids) // 2
+        stolen = victim.ids[-n_stolen:]
+        del victim.ids[-n_stolen:]
+        return stolen
+
+    def get_chunk(self, worker):
+        '''Return a lease ID and a list of replicate IDs to simulate. An empty
+        list means that all IDs are being simulated by other workers so the
+        worker should ask again later, and None means all work is done.'''
+        with self._lock:
+            self._reclaim_expired()
+            if self.stopped or len(self.completed) == self.n_total:
+                return None, None
+            ids = []
+            size = self._chunk_size()
+            while self.pending and len(ids) < size:
+                id = self.pending.popleft()
+                if id not in self.completed:
+                    ids.append(id)
+            if not ids:
+                ids = self._steal()
+            if not ids:
+                return None, []
+            self._next_lease += 1
+            self.leases[self._next_lease] = Lease(self._next_lease, worker,
+                                                  ids, self.lease_timeout)
+            return self._next_lease, list(ids)
+
+    def submit(self, lease_id, id, result, status):
+        '''Record result of replicate ``id`` and return the IDs that remain
+        assigned to the lease, which might have been shortened by other workers.'''
+        with self._lock:
+            if id not in self.completed:
+                self.completed.add(id)
+                self.results.put((id, result))
+                if status == 'ERROR':
+                    self.stopped = True
+            lease = self.leases.get(lease_id, None)
+            if lease is None or self.stopped:
+                return []
+            if id in lease.ids:
+                lease.ids.remove(id)
+            lease.renew()
+            if not lease.ids:
+                self.leases.pop(lease_id)
+            return list(lease.ids)
+
+
+def _serve_forever(server):
+    try:
+        server.serve_forever()
+    except SystemExit:
+        # the server calls sys.exit() after it is stopped
+        pass
+
+
+def start_server(coordinator, address, authkey):
+    '''Serve ``coordinator`` at ``address`` to clients with ``authkey`` from
+    a background thread and return the server.'''
+    CoordinatorManager.register('get_coordinator', callable=lambda: coordinator)
+    manager = CoordinatorManager(
+        address=parse_address(address), authkey=authkey.encode())
+    server = manager.get_server()
+    threading.Thread(target=_serve_forever, args=(server,), daemon=True).start()
+    return server
+
+
+def serve(args, cmd, ids=None, index=None):
+    '''Serve replicates ``ids`` (default to all replicates) to worker hosts and
+    write their results to ``args.logfile`` in the order of replicate IDs,
+    after existing replicates of ``index`` if specified.'''
+    from tqdm import tqdm
+
+    from .cli import write_result
+    from .logindex import LogWriter
+
+    if ids is None:
+        ids = list(range(1, args.repeats + 1))
+
+    address = parse_address(args.coordinator)
+    if isinstance(address, str) and os.path.exists(address):
+        if not stat.S_ISSOCK(os.stat(address).st_mode):
+            raise ValueError(
+                f'Coordinator address {address} exists and is not a socket.')
+        os.remove(address)
+
+    coordinator = Coordinator(
+        list(ids),
+        cmd=cmd,
+        chunk_size=args.chunk_size,
+        lease_timeout=args.lease_timeout)
+    server = start_server(coordinator, args.coordinator,
+                          get_authkey(args.authkey, generate=True))
+
+    print(f'Waiting for workers at {args.coordinator}')
+    try:
+        with LogWriter(args.logfile, index) as logger:
+            # results are written in the order of IDs
+            next_idx = 0
+            buffered = {}
+            for i in tqdm(
+                    range(len(ids)),
+                    total=args.repeats,
+                    initial=args.repeats - len(ids)):
+                id, result = coordinator.results.get()
+                if result.splitlines()[-1].split('\t')[1] == 'ERROR':
+                    # report error right away
+                    write_result(logger, id, result)
+                buffered[id] = result
+                while next_idx < len(ids) and ids[next_idx] in buffered:
+                    write_result(logger, ids[next_idx],
+                                 buffered.pop(ids[next_idx]))
+                    next_idx += 1
+                if i % 1000 == 999:
+                    logger.flush()
+    finally:
+        coordinator.stop()
+        # give workers a chance to learn that there is no more work
+        wait_till = time.time() + 10
+        while coordinator.n_workers() > 0 and time.time() < wait_till:
+            time.sleep(0.1)
+        server.stop_event.set()
+
+
+def connect(address, authkey):
+    manager = CoordinatorManager(
+        address=parse_address(address), authkey=authkey.encode())
+    wait_till = time.time() + CONNECT_TIMEOUT
+    while True:
+        try:
+            manager.connect()
+            return manager
+        except (ConnectionRefusedError, FileNotFoundError):
+            if time.time() > wait_till:
+                raise
+            time.sleep(0.5)
+
+
+CoordinatorManager.register('get_coordinator')
+
+
+class RemoteWorker(multiprocessing.Process):
+
+    def __init__(self, address, authkey, args, cmd):
+        multiprocessing.Process.__init__(self)
+        # Process.authkey is reserved by multiprocessing
+        self.coordinator_address = address
+        self.coordinator_authkey = authkey
+        self.params = Params(args)
+        self.simu_args = args
+        self.cmd = cmd
+
+    def run(self):
+        from .cli import simulate_replicate
+
+        # set random seed to a random number
+        np.random.seed()
+        coordinator = connect(self.coordinator_address,
+                              self.coordinator_authkey).get_coordinator()
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        coordinator.register(worker)
+        try:
+            while True:
+                lease_id, ids = coordinator.get_chunk(worker)
+                if ids is None:
+                    break
+                if not ids:
+                    time.sleep(1)
+                    continue
+                while ids:
+                    result, error, _ = simulate_replicate(
+                        self.params, self.simu_args, self.cmd, ids[0])
+                    ids = coordinator.submit(lease_id, ids[0], result,
+                                             'ERROR' if error else 'END')
+                    if error is not None:
+                        raise error
+        finally:
+            coordinator.unregister(worker)
+
+
+def run_worker(address, jobs, authkey):
+    '''Simulate replicates served by the coordinator at ``address`` with
+    ``jobs`` processes, authenticated with ``authkey`` or the key in
+    environment variable ``AUTHKEY_ENV``.'''
+    from .cli import parse_args
+
+    authkey = get_authkey(authkey)
+    cmd = connect(address, authkey).get_coordinator().get_cmd()
+    args = parse_args(cmd)
+    args.coordinator = None
+    args.profile = None
+
+    workers = [
+        RemoteWorker(address, authkey, args, cmd)
+        for i in range(jobs if jobs else multiprocessing.cpu_count())
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return 0
@@ -43,11 +43,32 @@ class EventType(Enum):
     MONITOR = 20
 
 
+
+# marker of required options that can be None
+_REQUIRED = object()
+
+
 class Event(object):
     """
-    Events that happen during the simulation.
+    Events that happen during the simulation. ``Event(time, action, ...)``
+    creates an instance of the handler class registered for ``action`` with
+    ``register_event`` so that events are applied without comparing ``action``
+    against all event types.
     """
 
+    __slots__ = ("time", "action", "target", "logger", "priority", "_kwargs")
+
+    handlers = {}
+    # events that only change their target are cancelled, namely skipped,
+    # once the target is removed from the population
+    cancel_with_target = False
+
+    def __new__(cls, *args, **kwargs):
+        if cls is Event:
+            action = args[1] if len(args) > 1 else kwargs.get("action", None)
+            cls = Event.handlers.get(action, Event)
+        return object.__new__(cls)
+
     def __init__(
         self, time, action, target=None, logger=None, priority=False, **kwargs
     ):
@@ -60,427 +81,681 @@ class Event(object):
                 f"Target of events should be None or an individual: {target} of type {target.__class__.__name__} provided"
             )
         self.logger = logger
-        self.kwargs = kwargs
+        # most events have no options other than their fields
+        self._kwargs = kwargs if kwargs else None
         self.priority = priority
 
+    @property
+    def kwargs(self):
+        """Options that are not fields of the event."""
+        return {} if self._kwargs is None else self._kwargs
+
+    @property
+    def cancelled(self):
+        """Whether the event has been cancelled by removal of its target."""
+        return self.cancel_with_target and self.target.removed
+
     def apply(self, population):
-        if self.action == EventType.INFECTION:
-            if "by" not in self.kwargs:
-                raise ValueError("Parameter by is required for INECTION event.")
+        raise RuntimeError(f"Unrecognized action {self.action}")
 
-            if self.kwargs["by"] is not None:
-                # if infector is removed or quarantined
-                if self.kwargs["by"].id not in population:
-                    self.logger.write(
-                        f'{self.time:.2f}\t{EventType.INFECTION_AVOIDED.name}\t.\tby={self.kwargs["by"]},reason=REMOVED\n'
-                    )
-                    return []
-                #
-                by_ind = self.kwargs["by"]
-                if by_ind.quarantined and by_ind.quarantined >= self.time:
-                    self.logger.write(
-                        f"{self.time:.2f}\t{EventType.INFECTION_AVOIDED.name}\t.\tby={by_ind},reason=QUARANTINED\n"
-                    )
-                    return []
-                #
-                if self.kwargs.get("handle_infection", None) is not None:
-                    if self.kwargs["handle_infection"] != "ignore=t/7<2":
-                        raise ValueError(
-                            f"Currently handle-infection only support option ignore=t/7<2"
-                        )
-                    if self.time % 7 < 2:
-                        self.logger.write(
-                            f'{self.time:.2f}\t{EventType.INFECTION_IGNORED.name}\t.\tby={self.kwargs["by"]},reason=t/7<2\n'
-                        )
-                        return []
+    def __str__(self):
+        return f'{self.action.name}_{self.target if self.target is not None else ""}_at_{self.time:.2f}'
 
-            # determin einfectee
-            if self.target is not None:
-                # if the target is preselected (e.g. through init plugin or infector)
-                if self.target.id not in population:
-                    self.logger.write(
-                        f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=INFECTION target no longer exists\n"
-                    )
-                    return []
-                infectee = self.target
-            else:
-                # select infectee from the population, subject to vicinity of infector
-                infectee = population.select(infector=self.kwargs["by"].id)
 
-                if not infectee:
-                    self.logger.write(
-                        f'{self.time:.2f}\t{EventType.INFECTION_FAILED.name}\t{self.target}\tby={self.kwargs["by"]},reason=no_infectee\n'
-                    )
-                    return []
-            #
-            return infectee.infect(self.time, **self.kwargs)
-        elif self.action == EventType.QUARANTINE:
-            if self.target.id not in population:
+def register_event(action):
+    """Register the decorated subclass of Event as the handler of events of
+    type ``action``, which can be a member of an Enum defined by a plugin."""
+
+    def register(cls):
+        if action in Event.handlers and Event.handlers[action] is not cls:
+            raise ValueError(f"Event type {action} is already registered")
+        Event.handlers[action] = cls
+        return cls
+
+    return register
+
+
+@register_event(EventType.INFECTION)
+class InfectionEvent(Event):
+    __slots__ = ("by", "handle_infection", "handle_symptomatic", "leadtime")
+
+    def __init__(
+        self,
+        time,
+        action=EventType.INFECTION,
+        target=None,
+        logger=None,
+        priority=False,
+        by=_REQUIRED,
+        handle_infection=None,
+        handle_symptomatic=None,
+        leadtime=None,
+        **kwargs,
+    ):
+        # by=None means the infection is not caused by an individual
+        if by is _REQUIRED:
+            raise ValueError("Parameter by is required for INFECTION event.")
+        Event.__init__(self, time, action, target, logger, priority, **kwargs)
+        self.by = by
+        self.handle_infection = handle_infection
+        self.handle_symptomatic = handle_symptomatic
+        self.leadtime = leadtime
+
+    def apply(self, population):
+        time = self.time
+        by_ind = self.by
+        if by_ind is not None:
+            # if infector is removed or quarantined
+            if by_ind.id not in population:
                 self.logger.write(
-                    f'{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\treason={self.kwargs["reason"]},msg=QUARANTINE target no longer exists.\n'
+                    f"{time:.2f}\t{EventType.INFECTION_AVOIDED.name}\t.\tby={by_ind},reason=REMOVED\n"
                 )
                 return []
-            if isinstance(self.target.quarantined, float):
+            #
+            if by_ind.quarantined and by_ind.quarantined >= time:
                 self.logger.write(
-                    f'{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\treason={self.kwargs["reason"]},msg=QUARANTINE target already quarantined\n'
+                    f"{time:.2f}\t{EventType.INFECTION_AVOIDED.name}\t.\tby={by_ind},reason=QUARANTINED\n"
                 )
                 return []
-            self.logger.write(
-                f'{self.time:.2f}\t{EventType.QUARANTINE.name}\t{self.target}\ttill={self.kwargs["till"]:.2f},reason={self.kwargs["reason"]},infected={isinstance(self.target.infected, float)},recovered={isinstance(self.target.recovered, float)}\n'
-            )
-            return self.target.quarantine(**self.kwargs)
-        elif self.action == EventType.MONITOR:
-            if self.target.id not in population:
+            #
+            if self.handle_infection is not None:
+                if self.handle_infection != "ignore=t/7<2":
+                    raise ValueError(
+                        f"Currently handle-infection only support option ignore=t/7<2"
+                    )
+                if time % 7 < 2:
+                    self.logger.write(
+                        f"{time:.2f}\t{EventType.INFECTION_IGNORED.name}\t.\tby={by_ind},reason=t/7<2\n"
+                    )
+                    return []
+
+        # determin einfectee
+        infectee = self.target
+        if infectee is not None:
+            # if the target is preselected (e.g. through init plugin or infector)
+            if infectee.id not in population:
                 self.logger.write(
-                    f'{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\treason={self.kwargs["reason"]},msg=MONITOR target no longer exists.\n'
+                    f"{time:.2f}\t{EventType.WARNING.name}\t{infectee}\tmsg=INFECTION target no longer exists\n"
                 )
                 return []
-            if hasattr(self.target, "monitored") and isinstance(
-                self.target.monitored, float
-            ):
+        else:
+            # select infectee from the population, subject to vicinity of infector
+            infectee = population.select(infector=by_ind.id)
+
+            if not infectee:
                 self.logger.write(
-                    f'{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\treason={self.kwargs["reason"]},msg=MONITOR target already quarantined\n'
+                    f"{time:.2f}\t{EventType.INFECTION_FAILED.name}\t{self.target}\tby={by_ind},reason=no_infectee\n"
                 )
                 return []
+        #
+        quarantined = isinstance(infectee.quarantined, float)
+        res = infectee.infect(
+            time,
+            by=by_ind,
+            handle_infection=self.handle_infection,
+            handle_symptomatic=self.handle_symptomatic,
+            leadtime=self.leadtime,
+            **self.kwargs,
+        )
+        if res:
+            population.n_infections += 1
+            population.group_infections[infectee.group] += 1
+        if not quarantined and isinstance(infectee.quarantined, float):
+            # quarantined right away if symptoms appeared before the infection
+            # is introduced with leadtime
+            population.n_quarantined += 1
+        return res
+
+
+@register_event(EventType.QUARANTINE)
+class QuarantineEvent(Event):
+    __slots__ = ("till", "reason", "test_before_release")
+    cancel_with_target = True
+
+    def __init__(
+        self,
+        time,
+        action=EventType.QUARANTINE,
+        target=None,
+        logger=None,
+        priority=False,
+        till=None,
+        reason=None,
+        test_before_release=None,
+        **kwargs,
+    ):
+        Event.__init__(self, time, action, target, logger, priority, **kwargs)
+        self.till = till
+        self.reason = reason
+        self.test_before_release = test_before_release
+
+    def apply(self, population):
+        if self.target.id not in population:
             self.logger.write(
-                f'{self.time:.2f}\t{EventType.MONITOR.name}\t{self.target}\ttill={self.kwargs["till"]:.2f},reason={self.kwargs["reason"]},infected={isinstance(self.target.infected, float)},recovered={isinstance(self.target.recovered, float)}\n'
+                f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\treason={self.reason},msg=QUARANTINE target no longer exists.\n"
             )
-            return self.target.monitor(**self.kwargs)
-        elif self.action == EventType.REINTEGRATION:
-            # reintegrate from REPLACEMENT
-            if hasattr(self.target, "replaced_by"):
-                restore_to = self.target.replaced_by
-                while True:
-                    if restore_to.id in population:
-                        break
-                    try:
-                        restore_to = restore_to.replaced_by
-                        #
-                        # case:
-                        # A replaced by  B [B in, A out]
-                        # B replaced by  C [C in, A, B out]
-                        #
-                        # A reintegrate with B, B restore to C,, C is in
-                    except Exception as e:
-                        self.logger.write(
-                            f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tfailed to restore {restore_to}.\n"
-                        )
-                        # case:
-                        # A replaced by  B [B in, A out]
-                        # B replaced by  C [C in, A, B out]
-                        #
-                        # A reintegrate with C [A in, B out, C out]
-                        #
-                        # try to reintegrate B
-                        # B replaced by C, C is not in population, and there is no replaced by
-                        return []
-
-                population.individuals.pop(restore_to.id)
-                population.individuals[self.target.id] = self.target
-                self.target.reintegrate(time=self.time, **self.kwargs)
-                self.logger.write(
-                    f"{self.time:.2f}\t{EventType.REINTEGRATION.name}\t{self.target}\treason=replacement,with={restore_to}\n"
-                )
-                return []
+            return []
+        if isinstance(self.target.quarantined, float):
+            self.logger.write(
+                f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\treason={self.reason},msg=QUARANTINE target already quarantined\n"
+            )
+            return []
+        self.logger.write(
+            f"{self.time:.2f}\t{EventType.QUARANTINE.name}\t{self.target}\ttill={self.till:.2f},reason={self.reason},infected={isinstance(self.target.infected, float)},recovered={isinstance(self.target.recovered, float)}\n"
+        )
+        population.n_quarantined += 1
+        return self.target.quarantine(
+            till=self.till, test_before_release=self.test_before_release
+        )
 
-            # reintegrate from quarantine
-            if self.target.id not in population:
-                self.logger.write(
-                    f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=REINTEGRATION target no longer exists\n"
-                )
-                return []
-            elif not isinstance(self.target.quarantined, float):
-                self.logger.write(
-                    f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=REINTEGRATION target is not in quarantine\n"
-                )
-                return []
-            #
-            elif self.kwargs.get("test_before_release", None) and (
-                isinstance(self.target.infected, float)
-                and not isinstance(self.target.recovered, float)
-            ):
-                assert isinstance(self.target.quarantined, float)
-                self.logger.write(
-                    f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=REINTEGRATION target is still infected\n"
+
+@register_event(EventType.MONITOR)
+class MonitorEvent(Event):
+    __slots__ = ("till", "reason")
+    cancel_with_target = True
+
+    def __init__(
+        self,
+        time,
+        action=EventType.MONITOR,
+        target=None,
+        logger=None,
+        priority=False,
+        till=None,
+        reason=None,
+        **kwargs,
+    ):
+        Event.__init__(self, time, action, target, logger, priority, **kwargs)
+        self.till = till
+        self.reason = reason
+
+    def apply(self, population):
+        if self.target.id not in population:
+            self.logger.write(
+                f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\treason={self.reason},msg=MONITOR target no longer exists.\n"
+            )
+            return []
+        if hasattr(self.target, "monitored") and isinstance(
+            self.target.monitored, float
+        ):
+            self.logger.write(
+                f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\treason={self.reason},msg=MONITOR target already quarantined\n"
+            )
+            return []
+        self.logger.write(
+            f"{self.time:.2f}\t{EventType.MONITOR.name}\t{self.target}\ttill={self.till:.2f},reason={self.reason},infected={isinstance(self.target.infected, float)},recovered={isinstance(self.target.recovered, float)}\n"
+        )
+        return self.target.monitor(till=self.till)
+
+
+@register_event(EventType.REINTEGRATION)
+class ReintegrationEvent(Event):
+    __slots__ = ("test_before_release",)
+    cancel_with_target = True
+
+    def __init__(
+        self,
+        time,
+        action=EventType.REINTEGRATION,
+        target=None,
+        logger=None,
+        priority=False,
+        test_before_release=None,
+        **kwargs,
+    ):
+        Event.__init__(self, time, action, target, logger, priority, **kwargs)
+        self.test_before_release = test_before_release
+
+    def apply(self, population):
+        # reintegrate from REPLACEMENT
+        if hasattr(self.target, "replaced_by"):
+            restore_to = self.target.replaced_by
+            while True:
+                if restore_to.id in population:
+                    break
+                try:
+                    restore_to = restore_to.replaced_by
+                    #
+                    # case:
+                    # A replaced by  B [B in, A out]
+                    # B replaced by  C [C in, A, B out]
+                    #
+                    # A reintegrate with B, B restore to C,, C is in
+                except Exception as e:
+                    self.logger.write(
+                        f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tfailed to restore {restore_to}.\n"
+                    )
+                    # case:
+                    # A replaced by  B [B in, A out]
+                    # B replaced by  C [C in, A, B out]
+                    #
+                    # A reintegrate with C [A in, B out, C out]
+                    #
+                    # try to reintegrate B
+                    # B replaced by C, C is not in population, and there is no replaced by
+                    return []
+
+            population.individuals.pop(restore_to.id)
+            if isinstance(restore_to.quarantined, float):
+                population.n_quarantined -= 1
+            population.individuals[self.target.id] = self.target
+            self.target.reintegrate(time=self.time)
+            self.logger.write(
+                f"{self.time:.2f}\t{EventType.REINTEGRATION.name}\t{self.target}\treason=replacement,with={restore_to}\n"
+            )
+            return []
+
+        # reintegrate from quarantine
+        if self.target.id not in population:
+            self.logger.write(
+                f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=REINTEGRATION target no longer exists\n"
+            )
+            return []
+        elif not isinstance(self.target.quarantined, float):
+            self.logger.write(
+                f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=REINTEGRATION target is not in quarantine\n"
+            )
+            return []
+        #
+        elif self.test_before_release and (
+            isinstance(self.target.infected, float)
+            and not isinstance(self.target.recovered, float)
+        ):
+            assert isinstance(self.target.quarantined, float)
+            self.logger.write(
+                f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=REINTEGRATION target is still infected\n"
+            )
+            self.target.quarantined += 1
+            return [
+                Event(
+                    self.time + 1,
+                    EventType.REINTEGRATION,
+                    target=self.target,
+                    test_before_release=True,
+                    logger=self.logger,
                 )
-                self.target.quarantined += 1
+            ]
+        elif hasattr(self.target, "monitored"):
+            self.logger.write(
+                f"{self.time:.2f}\t{EventType.REINTEGRATION.name}\t{self.target}\treason=monitored\n"
+            )
+            population.n_quarantined -= 1
+            return self.target.reintegrate(time=self.time)
+        else:
+            self.logger.write(
+                f"{self.time:.2f}\t{EventType.REINTEGRATION.name}\t{self.target}\treason=quarantine\n"
+            )
+            population.n_quarantined -= 1
+            return self.target.reintegrate(time=self.time)
+
+
+@register_event(EventType.INFECTION_AVOIDED)
+class InfectionAvoidedEvent(Event):
+    __slots__ = ("by", "count", "till")
+
+    def __init__(
+        self,
+        time,
+        action=EventType.INFECTION_AVOIDED,
+        target=None,
+        logger=None,
+        priority=False,
+        by=None,
+        count=1,
+        till=None,
+        **kwargs,
+    ):
+        Event.__init__(self, time, action, target, logger, priority, **kwargs)
+        self.by = by
+        # infections avoided from time till till
+        self.count = count
+        self.till = time if till is None else till
+
+    def apply(self, population):
+        self.logger.write(
+            f"{self.time:.2f}\t{EventType.INFECTION_AVOIDED.name}\t.\tby={self.by},n_avoided={self.count},till={self.till:.2f}\n"
+        )
+        return []
+
+
+@register_event(EventType.SHOW_SYMPTOM)
+class ShowSymptomEvent(Event):
+    __slots__ = ("handle_symptomatic",)
+    cancel_with_target = True
+
+    def __init__(
+        self,
+        time,
+        action=EventType.SHOW_SYMPTOM,
+        target=None,
+        logger=None,
+        priority=False,
+        handle_symptomatic=None,
+        **kwargs,
+    ):
+        Event.__init__(self, time, action, target, logger, priority, **kwargs)
+        self.handle_symptomatic = handle_symptomatic
+
+    def apply(self, population):
+        target = self.target
+        if target.id in population:
+            time = self.time
+            target.show_symptom = time
+            tracing = parse_handle_symptomatic_options(
+                self.handle_symptomatic,
+                target.group,
+                isinstance(target.vaccinated, float),
+            ).get("tracing", None)
+            self.logger.write(
+                f"{time:.2f}\t{EventType.SHOW_SYMPTOM.name}\t{target}\thandle_symptomatic={self.handle_symptomatic}\n"
+            )
+            if tracing is not None and tracing > 0.0:
                 return [
                     Event(
-                        self.time + 1,
-                        EventType.REINTEGRATION,
-                        target=self.target,
-                        test_before_release=True,
+                        time,
+                        EventType.CONTACT_TRACING,
+                        target=target,
+                        reason="symptoms",
+                        handle_traced=self.handle_symptomatic,
                         logger=self.logger,
                     )
                 ]
-            elif hasattr(self.target, "monitored"):
-                self.logger.write(
-                    f"{self.time:.2f}\t{EventType.REINTEGRATION.name}\t{self.target}\treason=monitored\n"
-                )
-                return self.target.reintegrate(time=self.time, **self.kwargs)
-            else:
-                self.logger.write(
-                    f"{self.time:.2f}\t{EventType.REINTEGRATION.name}\t{self.target}\treason=quarantine\n"
-                )
-                return self.target.reintegrate(time=self.time, **self.kwargs)
-
-        elif self.action == EventType.INFECTION_AVOIDED:
+        else:
             self.logger.write(
-                f'{self.time:.2f}\t{EventType.INFECTION_AVOIDED.name}\t.\tby={self.kwargs["by"]}\n'
+                f"{self.time:.2f}\t{EventType.WARNING.name}\t{target}\tmsg=SHOW_SYMPTOM target no longer exists\n"
             )
-            return []
+        return []
 
-        elif self.action == EventType.SHOW_SYMPTOM:
-            if self.target.id in population:
-                self.target.show_symptom = self.time
-                handle_symptomatic = parse_handle_symptomatic_options(
-                    self.kwargs.get("handle_symptomatic", None),
-                    self.target.group,
-                    isinstance(self.target.vaccinated, float),
-                )
-                tracing = handle_symptomatic.get("tracing", None)
-                self.logger.write(
-                    f"{self.time:.2f}\t{EventType.SHOW_SYMPTOM.name}\t{self.target}\thandle_symptomatic={self.kwargs.get('handle_symptomatic', None)}\n"
-                )
-                if tracing is not None and tracing > 0.0:
-                    return [
-                        Event(
-                            self.time,
-                            EventType.CONTACT_TRACING,
-                            target=self.target,
-                            reason="symptoms",
-                            handle_traced=self.kwargs.get("handle_symptomatic", None),
-                            logger=self.logger,
-                        )
-                    ]
-            else:
-                self.logger.write(
-                    f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=SHOW_SYMPTOM target no longer exists\n"
-                )
-            return []
 
-        elif self.action == EventType.CONTACT_TRACING:
+@register_event(EventType.CONTACT_TRACING)
+class ContactTracingEvent(Event):
+    __slots__ = ("handle_traced", "reason")
+
+    def __init__(
+        self,
+        time,
+        action=EventType.CONTACT_TRACING,
+        target=None,
+        logger=None,
+        priority=False,
+        handle_traced=None,
+        reason=None,
+        **kwargs,
+    ):
+        Event.__init__(self, time, action, target, logger, priority, **kwargs)
+        self.handle_traced = handle_traced
+        self.reason = reason
+
+    def apply(self, population):
+        handle_traced_infection = parse_handle_symptomatic_options(
+            self.handle_traced,
+            self.target.group,
+            isinstance(self.target.vaccinated, float),
+        )
+        succ_rate = handle_traced_infection.get("tracing", None)
+        IDs = []
+        missed_IDs = []
+        events = []
+        for ind in population.values():
+            if getattr(ind, "infected_by", None) != self.target:
+                continue
+            if random.random() > succ_rate:
+                missed_IDs.append(ind.id)
+                continue
+            # vaccinated and unvaccinated are handled differently
             handle_traced_infection = parse_handle_symptomatic_options(
-                self.kwargs["handle_traced"],
+                self.handle_traced,
                 self.target.group,
-                isinstance(self.target.vaccinated, float),
+                isinstance(ind.vaccinated, float),
             )
-            succ_rate = handle_traced_infection.get("tracing", None)
-            IDs = []
-            missed_IDs = []
-            events = []
-            for ind in population.values():
-                if getattr(ind, "infected_by", None) != self.target:
-                    continue
-                if random.random() > succ_rate:
-                    missed_IDs.append(ind.id)
-                    continue
-                # vaccinated and unvaccinated are handled differently
-                handle_traced_infection = parse_handle_symptomatic_options(
-                    self.kwargs["handle_traced"],
-                    self.target.group,
-                    isinstance(ind.vaccinated, float),
-                )
-                ct_groups = handle_traced_infection.get("ct_groups", None)
-                if ct_groups is not None and ind.group not in ct_groups:
-                    continue
-                IDs.append(ind.id)
-                if (
-                    handle_traced_infection.get("ct_monitor", None) is not None
-                    or handle_traced_infection.get("ct_replace", None) is not None
-                    or handle_traced_infection.get("ct_quarantine", None) is not None
-                ):
-                    #
-                    ct_q = 0
-                    if handle_traced_infection.get("ct_quarantine", None) is not None:
-                        ct_q = handle_traced_infection.get("ct_quarantine", None)
-                        test_before_release = handle_traced_infection.get(
-                            "test_before_release", None
-                        )
-                        if ct_q > 0:
-                            events.append(
-                                Event(
-                                    self.time,
-                                    EventType.QUARANTINE,
-                                    target=ind,
-                                    logger=self.logger,
-                                    till=self.time + ct_q,
-                                    test_before_release=test_before_release,
-                                    reason=f"contact tracing ({ind.infected} by {self.target})",
-                                )
+            ct_groups = handle_traced_infection.get("ct_groups", None)
+            if ct_groups is not None and ind.group not in ct_groups:
+                continue
+            IDs.append(ind.id)
+            if (
+                handle_traced_infection.get("ct_monitor", None) is not None
+                or handle_traced_infection.get("ct_replace", None) is not None
+                or handle_traced_infection.get("ct_quarantine", None) is not None
+            ):
+                #
+                ct_q = 0
+                if handle_traced_infection.get("ct_quarantine", None) is not None:
+                    ct_q = handle_traced_infection.get("ct_quarantine", None)
+                    test_before_release = handle_traced_infection.get(
+                        "test_before_release", None
+                    )
+                    if ct_q > 0:
+                        events.append(
+                            Event(
+                                self.time,
+                                EventType.QUARANTINE,
+                                target=ind,
+                                logger=self.logger,
+                                till=self.time + ct_q,
+                                test_before_release=test_before_release,
+                                reason=f"contact tracing ({ind.infected} by {self.target})",
                             )
+                        )
 
-                    if handle_traced_infection.get("ct_replace", None) is not None:
-                        ct_q = handle_traced_infection.get("ct_replace", None)
-                        if ct_q > 0:
-                            events.append(
-                                Event(
-                                    self.time,
-                                    EventType.REPLACEMENT,
-                                    reason=f"contact tracing (by {self.target})",
-                                    till=self.time + ct_q - 0.1,
-                                    force=["unaffected", "vaccinated"],
-                                    target=ind,
-                                    logger=self.logger,
-                                )
-                            )
-                    if handle_traced_infection.get("ct_monitor") > 0:
+                if handle_traced_infection.get("ct_replace", None) is not None:
+                    ct_q = handle_traced_infection.get("ct_replace", None)
+                    if ct_q > 0:
                         events.append(
                             Event(
-                                self.time + ct_q,
-                                EventType.MONITOR,
-                                till=self.time
-                                + ct_q
-                                + handle_traced_infection.get("ct_monitor"),
-                                reason="contact trace",
+                                self.time,
+                                EventType.REPLACEMENT,
+                                reason=f"contact tracing (by {self.target})",
+                                till=self.time + ct_q - 0.1,
+                                force=["unaffected", "vaccinated"],
                                 target=ind,
                                 logger=self.logger,
                             )
                         )
-                elif handle_traced_infection["reaction"] == "remove":
+                if handle_traced_infection.get("ct_monitor") > 0:
                     events.append(
                         Event(
-                            self.time,
-                            EventType.REMOVAL,
-                            reason=f"contact tracing (by {self.target})",
+                            self.time + ct_q,
+                            EventType.MONITOR,
+                            till=self.time
+                            + ct_q
+                            + handle_traced_infection.get("ct_monitor"),
+                            reason="contact trace",
                             target=ind,
                             logger=self.logger,
                         )
                     )
-                elif handle_traced_infection["reaction"] == "quarantine":
-                    duration = handle_traced_infection.get("duration", 14)
-                    events.append(
-                        Event(
-                            self.time,
-                            EventType.QUARANTINE,
-                            target=ind,
-                            logger=self.logger,
-                            till=self.time + duration,
-                            reason=f"contact tracing ({ind.infected} by {self.target})",
-                        )
+            elif handle_traced_infection["reaction"] == "remove":
+                events.append(
+                    Event(
+                        self.time,
+                        EventType.REMOVAL,
+                        reason=f"contact tracing (by {self.target})",
+                        target=ind,
+                        logger=self.logger,
                     )
-                elif handle_traced_infection["reaction"] == "replace":
-                    duration = handle_traced_infection.get("duration", 14)
-                    events.append(
-                        Event(
-                            self.time,
-                            EventType.REPLACEMENT,
-                            reason=f"contact tracing (by {self.target})",
-                            till=self.time + duration,
-                            force=["unaffected", "vaccinated"],
-                            target=ind,
-                            logger=self.logger,
-                        )
+                )
+            elif handle_traced_infection["reaction"] == "quarantine":
+                duration = handle_traced_infection.get("duration", 14)
+                events.append(
+                    Event(
+                        self.time,
+                        EventType.QUARANTINE,
+                        target=ind,
+                        logger=self.logger,
+                        till=self.time + duration,
+                        reason=f"contact tracing ({ind.infected} by {self.target})",
                     )
-                elif handle_traced_infection["reaction"] == "reintegrate":
-                    events.append(
-                        Event(
-                            self.time,
-                            EventType.REINTEGRATION,
-                            target=ind,
-                            logger=self.logger,
-                        )
+                )
+            elif handle_traced_infection["reaction"] == "replace":
+                duration = handle_traced_infection.get("duration", 14)
+                events.append(
+                    Event(
+                        self.time,
+                        EventType.REPLACEMENT,
+                        reason=f"contact tracing (by {self.target})",
+                        till=self.time + duration,
+                        force=["unaffected", "vaccinated"],
+                        target=ind,
+                        logger=self.logger,
                     )
-                elif handle_traced_infection["reaction"] != "keep":
-                    raise ValueError(
-                        f"Unsupported action for patients who test positive: {handle_traced_infection}"
+                )
+            elif handle_traced_infection["reaction"] == "reintegrate":
+                events.append(
+                    Event(
+                        self.time,
+                        EventType.REINTEGRATION,
+                        target=ind,
+                        logger=self.logger,
                     )
-            self.logger.write(
-                f"{self.time:.2f}\t{EventType.CONTACT_TRACING.name}\t{self.target}\tsucc_rate={succ_rate},reason={self.kwargs['reason']},n_traced={len(IDs)},n_missed={len(missed_IDs)},handle_traced_infection={handle_traced_infection}\n"
-            )
-            return events
-        elif self.action == EventType.REMOVAL:
-            if self.target.id in population:
-                population.remove(self.target)
-                self.logger.write(
-                    f"{self.time:.2f}\t{EventType.REMOVAL.name}\t{self.target}\tpopsize={len(population)},reason={self.kwargs.get('reason', 'unspecified')}\n"
                 )
-            else:
-                self.logger.write(
-                    f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=REMOVAL target no longer exists\n"
+            elif handle_traced_infection["reaction"] != "keep":
+                raise ValueError(
+                    f"Unsupported action for patients who test positive: {handle_traced_infection}"
                 )
-            return []
+        self.logger.write(
+            f"{self.time:.2f}\t{EventType.CONTACT_TRACING.name}\t{self.target}\tsucc_rate={succ_rate},reason={self.reason},n_traced={len(IDs)},n_missed={len(missed_IDs)},handle_traced_infection={handle_traced_infection}\n"
+        )
+        return events
 
-        elif self.action == EventType.VACCINATION:
-            if self.target.id in population:
-                self.target.vaccinate(self.time, **self.kwargs)
-                self.logger.write(
-                    f'{self.time:.2f}\t{EventType.VACCINATION.name}\t{self.target}\timmunity={self.kwargs["immunity"]},infectivity={self.kwargs["infectivity"]}\n'
-                )
-            else:
-                self.logger.write(
-                    f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=VACCINATION target no longer exists\n"
-                )
-            return []
 
-        elif self.action == EventType.REPLACEMENT:
-            if self.target.id not in population:
-                self.logger.write(
-                    f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=REPLACEMENT target no longer exists\n"
-                )
-                return []
+@register_event(EventType.REMOVAL)
+class RemovalEvent(Event):
+    __slots__ = ("reason",)
+    cancel_with_target = True
 
-            by_ind = population.replace(self.target, time=self.time, **self.kwargs)
+    def __init__(
+        self,
+        time,
+        action=EventType.REMOVAL,
+        target=None,
+        logger=None,
+        priority=False,
+        reason="unspecified",
+        **kwargs,
+    ):
+        Event.__init__(self, time, action, target, logger, priority, **kwargs)
+        self.reason = reason
 
+    def apply(self, population):
+        if self.target.id in population:
+            population.remove(self.target)
             self.logger.write(
-                f'{self.time:.2f}\t{EventType.REPLACEMENT.name}\t{self.target}\treason={self.kwargs["reason"]},infected={"False" if self.target.infected is False else "True"},by={by_ind}\n'
+                f"{self.time:.2f}\t{EventType.REMOVAL.name}\t{self.target}\tpopsize={len(population)},reason={self.reason}\n"
             )
-            if "till" in self.kwargs:
-                till = self.kwargs["till"]
-                if till is None:
-                    return []
-                return [
-                    Event(
-                        till,
-                        EventType.REINTEGRATION,
-                        target=self.target,
-                        logger=self.logger,
-                    )
-                ]
-            else:
-                return []
+        else:
+            self.logger.write(
+                f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=REMOVAL target no longer exists\n"
+            )
+        return []
 
-        elif self.action == EventType.RECOVER:
-            removed = self.target.id not in population
 
-            if not removed:
-                self.target.recovered = self.time
-                self.target.immunity = population.model.params.immunity_of_recovered
-                self.target.infectivity = (
-                    population.model.params.infectivity_of_recovered
-                )
-            else:
-                self.logger.write(
-                    f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=RECOVER target no longer exists\n"
-                )
-                return []
+@register_event(EventType.VACCINATION)
+class VaccinationEvent(Event):
+    __slots__ = ("immunity", "infectivity")
+    cancel_with_target = True
 
-            n_recovered = len(
-                [
-                    x
-                    for x, ind in population.items()
-                    if ind.recovered not in (False, None)
-                ]
+    def __init__(
+        self,
+        time,
+        action=EventType.VACCINATION,
+        target=None,
+        logger=None,
+        priority=False,
+        immunity=None,
+        infectivity=None,
+        **kwargs,
+    ):
+        Event.__init__(self, time, action, target, logger, priority, **kwargs)
+        self.immunity = immunity
+        self.infectivity = infectivity
+
+    def apply(self, population):
+        if self.target.id in population:
+            self.target.vaccinate(self.time, self.immunity, self.infectivity)
+            self.logger.write(
+                f"{self.time:.2f}\t{EventType.VACCINATION.name}\t{self.target}\timmunity={self.immunity},infectivity={self.infectivity}\n"
             )
-            n_infected = len(
-                [
-                    x
-                    for x, ind in population.items()
-                    if ind.infected not in (False, None)
-                ]
+        else:
+            self.logger.write(
+                f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=VACCINATION target no longer exists\n"
+            )
+        return []
+
+
+@register_event(EventType.REPLACEMENT)
+class ReplacementEvent(Event):
+    __slots__ = ("reason", "till", "keep", "force")
+    cancel_with_target = True
+
+    def __init__(
+        self,
+        time,
+        action=EventType.REPLACEMENT,
+        target=None,
+        logger=None,
+        priority=False,
+        reason=None,
+        till=None,
+        keep=None,
+        force=None,
+        **kwargs,
+    ):
+        Event.__init__(self, time, action, target, logger, priority, **kwargs)
+        self.reason = reason
+        self.till = till
+        self.keep = keep
+        self.force = force
+
+    def apply(self, population):
+        if self.target.id not in population:
+            self.logger.write(
+                f"{self.time:.2f}\t{EventType.WARNING.name}\t{self.target}\tmsg=REPLACEMENT target no longer exists\n"
             )
-            params = dict(
-                recovered=n_recovered, infected=n_infected, popsize=len(population)
+            return []
+
+        by_ind = population.replace(
+            self.target,
+            time=self.time,
+            keep=[] if self.keep is None else self.keep,
+            force=[] if self.force is None else self.force,
+            till=self.till,
+        )
+
+        self.logger.write(
+            f'{self.time:.2f}\t{EventType.REPLACEMENT.name}\t{self.target}\treason={self.reason},infected={"False" if self.target.infected is False else "True"},by={by_ind}\n'
+        )
+        if self.till is None:
+            return []
+        return [
+            Event(
+                self.till,
+                EventType.REINTEGRATION,
+                target=self.target,
+                logger=self.logger,
             )
-            if removed:
-                params[removed] = True
-            param = ",".join(f"{x}={y}" for x, y in params.items())
+        ]
+
+
+@register_event(EventType.RECOVER)
+class RecoverEvent(Event):
+    __slots__ = ()
+    cancel_with_target = True
+
+    def apply(self, population):
+        target = self.target
+        if target.id not in population:
             self.logger.write(
-                f"{self.time:.2f}\t{EventType.RECOVER.name}\t{self.target}\t{param}\n"
+                f"{self.time:.2f}\t{EventType.WARNING.name}\t{target}\tmsg=RECOVER target no longer exists\n"
             )
             return []
-        else:
-            raise RuntimeError(f"Unrecognized action {self.action}")
 
-    def __str__(self):
-        return f'{self.action.name}_{self.target if self.target is not None else ""}_at_{self.time:.2f}'
+        params = population.model.params
+        target.recovered = self.time
+        target.immunity = params.immunity_of_recovered
+        target.infectivity = params.infectivity_of_recovered
+
+        n_infected, n_recovered = population.count_infected()
+        self.logger.write(
+            f"{self.time:.2f}\t{EventType.RECOVER.name}\t{target}\trecovered={n_recovered},infected={n_infected},popsize={len(population)}\n"
+        )
+        return []
@@ -0,0 +1,524 @@
+"""Logfiles of the simulator and their sidecar indexes.
+
+Replicates are written to a logfile as consecutive records that end with an
+``END`` or ``ERROR`` event. Logfiles with extension ``.gz`` or ``.zst`` are
+compressed in blocks of whole replicates, each block being an independent
+gzip member or zstd frame so that compressed logfiles can be appended to.
+An uncompressed logfile is a single block.
+
+The writer appends to ``<logfile>.idx`` one fixed size record of (replicate
+id, byte offset of block, offset in block, length, status) for each replicate
+so that completed replicates can be identified, and any replicate can be read,
+without scanning the logfile.
+"""
+import gzip
+import io
+import mmap
+import os
+import queue
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+LOG_HEADER = b'id\ttime\tevent\ttarget\tparams\n'
+
+INDEX_MAGIC = b'COSIDX2\n'
+
+# replicates are compressed together in blocks of at least this many bytes
+BLOCK_SIZE = 1024 * 1024
+
+# status of replicates
+END = 0
+ERROR = 1
+STATUS = {'END': END, 'ERROR': ERROR}
+
+INDEX_RECORD = struct.Struct('<QQQQB')
+INDEX_DTYPE = np.dtype([('id', '<u8'), ('block', '<u8'), ('offset', '<u8'),
+                        ('length', '<u8'), ('status', 'u1')])
+
+
+def index_file(logfile):
+    '''Return name of the index of ``logfile``.'''
+    return str(logfile) + '.idx'
+
+
+def compression(logfile):
+    '''Return compression of ``logfile`` (``gz`` or ``zst``) according to its
+    extension, or None if it is not compressed.'''
+    for ext in ('gz', 'zst'):
+        if str(logfile).endswith('.' + ext):
+            return ext
+    return None
+
+
+def _zstandard(logfile):
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError(
+            f'Package zstandard is required for compressed logfile {logfile}'
+        ) from None
+    return zstandard
+
+
+def compressor(logfile):
+    '''Return a function that compresses data into an independent block.'''
+    if compression(logfile) == 'gz':
+
+        def compress(data):
+            compressobj = zlib.compressobj(6, zlib.DEFLATED, 31)
+            return compressobj.compress(data) + compressobj.flush()
+
+        return compress
+    return _zstandard(logfile).ZstdCompressor(level=3).compress
+
+
+def _decompressobj(logfile):
+    if compression(logfile) == 'gz':
+        return zlib.decompressobj(31)
+    return _zstandard(logfile).ZstdDecompressor().decompressobj()
+
+
+def decompress(logfile, data):
+    '''Return content of complete blocks ``data`` of compressed ``logfile``.'''
+    res = []
+    while data:
+        decompressobj = _decompressobj(logfile)
+        res.append(decompressobj.decompress(data))
+        if not decompressobj.eof:
+            raise ValueError(f'Incomplete compressed block in {logfile}')
+        data = decompressobj.unused_data
+    return b''.join(res)
+
+
+def _blocks(logfile, start=0):
+    '''Yield offset, length and content of complete blocks of compressed
+    ``logfile`` from byte ``start``.'''
+    with open(logfile, 'rb') as log:
+        log.seek(start)
+        decompressobj = _decompressobj(logfile)
+        content = []
+        pos = start
+        data = b''
+        while True:
+            if not data:
+                data = log.read(BLOCK_SIZE)
+                if not data:
+                    # the last block is incomplete if there is content
+                    return
+            content.append(decompressobj.decompress(data))
+            if decompressobj.eof:
+                end = pos + len(data) - len(decompressobj.unused_data)
+                yield start, end - start, b''.join(content)
+                data = decompressobj.unused_data
+                start = pos = end
+                decompressobj = _decompressobj(logfile)
+                content = []
+            else:
+                pos += len(data)
+                data = b''
+
+
+def open_log(logfile):
+    '''Open ``logfile`` for reading as text, decompressing it if needed.'''
+    kind = compression(logfile)
+    if kind == 'gz':
+        return gzip.open(logfile, 'rt')
+    if kind == 'zst':
+        return io.TextIOWrapper(
+            _zstandard(logfile).ZstdDecompressor().stream_reader(
+                open(logfile, 'rb'), read_across_frames=True, closefd=True))
+    return open(logfile)
+
+
+def _scan(lines, pos, block=0):
+    '''Return entries of complete replicates in ``lines`` that start at byte
+    ``pos`` of ``block``, and the end of the last complete replicate or
+    header.'''
+    entries = []
+    end = pos
+    cur_id = None
+    for line in lines:
+        if not line.endswith(b'\n'):
+            # partially written record
+            break
+        if line.startswith(b'id\t'):
+            # headers can appear in logfiles of resumed simulations
+            cur_id = None
+            end = pos + len(line)
+        else:
+            rep_id, _, rest = line.partition(b'\t')
+            if rep_id != cur_id:
+                cur_id = rep_id
+                cur_start = pos
+            event = rest.split(b'\t', 2)[1:2]
+            if event and event[0] in (b'END', b'ERROR'):
+                entries.append((int(rep_id), block, cur_start,
+                                pos + len(line) - cur_start,
+                                STATUS[event[0].decode()]))
+                cur_id = None
+                end = pos + len(line)
+        pos += len(line)
+    return entries, end
+
+
+def _scan_blocks(logfile, start):
+    '''Return entries of replicates in blocks of compressed ``logfile`` from
+    byte ``start``, and the end of the last complete block.'''
+    entries = []
+    end = start
+    for block, length, content in _blocks(logfile, start):
+        entries.extend(_scan(io.BytesIO(content), 0, block)[0])
+        end = block + length
+    return np.array(entries, dtype=INDEX_DTYPE), end
+
+
+def _read_entries(filename):
+    '''Return entries saved in index ``filename``, or None if the file does
+    not exist or is not an index.'''
+    try:
+        with open(filename, 'rb') as idx:
+            content = idx.read()
+    except OSError:
+        return None
+    if not content.startswith(INDEX_MAGIC):
+        return None
+    n = (len(content) - len(INDEX_MAGIC)) // INDEX_DTYPE.itemsize
+    # ignore partially written last entry
+    return np.frombuffer(
+        content, dtype=INDEX_DTYPE, count=n, offset=len(INDEX_MAGIC)).copy()
+
+
+def _valid(content, entries):
+    '''Return True if entries point to replicates in ``content`` of a block,
+    namely records that start with their IDs after a newline and end with a
+    newline.'''
+    if not len(entries):
+        return True
+    arr = np.frombuffer(content, dtype=np.uint8)
+    offset = entries['offset'].astype(np.int64)
+    stop = offset + entries['length'].astype(np.int64)
+    if stop.max() > len(arr) or np.any(stop <= offset):
+        return False
+    id_width = np.char.str_len(entries['id'].astype(str))
+    return bool(
+        np.all(arr[np.maximum(offset - 1, 0)][offset > 0] == ord('\n')) and
+        np.all(arr[stop - 1] == ord('\n')) and
+        np.all(arr[np.minimum(offset + id_width, len(arr) - 1)] == ord('\t')))
+
+
+class LogIndex(object):
+    '''Entries of (id, block, offset, length, status) of replicates in
+    ``logfile`` and the end of its last complete replicate or block.'''
+
+    def __init__(self, logfile, entries, end):
+        self.logfile = logfile
+        self.entries = entries
+        self.end = end
+        self._positions = None
+        self._block = (None, None)
+
+    @classmethod
+    def load(cls, logfile):
+        '''Load index of ``logfile``. Replicates that are written but not
+        indexed are recovered from the logfile, and the index is rebuilt if it
+        does not exist or does not match the logfile.'''
+        if compression(logfile) is None:
+            with open(logfile, 'rb') as log:
+                header = log.read(len(LOG_HEADER))
+        else:
+            header = next(_blocks(logfile), (0, 0, b''))[2][:len(LOG_HEADER)]
+        if header != LOG_HEADER:
+            raise ValueError(
+                f'{logfile} is not a logfile of the simulator: header "id\ttime\tevent\ttarget\tparams" is expected'
+            )
+        entries = _read_entries(index_file(logfile))
+        if compression(logfile) is None:
+            return cls._load_plain(logfile, entries)
+        return cls._load_compressed(logfile, entries)
+
+    @classmethod
+    def _load_plain(cls, logfile, entries):
+        if entries is not None:
+            # entries can be saved before the replicates are flushed to the
+            # logfile if the simulation is interrupted
+            entries = entries[entries['offset'] + entries['length'] <=
+                              os.path.getsize(logfile)]
+            with open(logfile, 'rb') as log, mmap.mmap(
+                    log.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if np.any(entries['block'] != 0) or not _valid(mm, entries):
+                    entries = None
+        if entries is None or not len(entries):
+            # rebuild the index from the logfile
+            with open(logfile, 'rb') as log:
+                log.seek(len(LOG_HEADER))
+                entries, end = _scan(log, len(LOG_HEADER))
+            return cls(logfile, np.array(entries, dtype=INDEX_DTYPE), end)
+        last = int(entries['offset'][-1] + entries['length'][-1])
+        with open(logfile, 'rb') as log:
+            log.seek(last)
+            recovered, end = _scan(log, last)
+        return cls(logfile,
+                   np.concatenate(
+                       [entries, np.array(recovered, dtype=INDEX_DTYPE)]), end)
+
+    @classmethod
+    def _load_compressed(cls, logfile, entries):
+        if entries is not None and len(entries):
+            entries = entries[entries['block'] < os.path.getsize(logfile)]
+        if entries is None or not len(entries):
+            entries, end = _scan_blocks(logfile, 0)
+            return cls(logfile, entries, end)
+        # the last indexed block should be complete and match the index
+        last = int(entries['block'][-1])
+        block = next(_blocks(logfile, last), None)
+        if block is None or not _valid(block[2],
+                                       entries[entries['block'] == last]):
+            entries, end = _scan_blocks(logfile, 0)
+            return cls(logfile, entries, end)
+        recovered, end = _scan_blocks(logfile, last + block[1])
+        return cls(logfile, np.concatenate([entries, recovered]), end)
+
+    def completed(self):
+        '''Return IDs of replicates that are completed without error.'''
+        return set(self.entries['id'][self.entries['status'] == END].tolist())
+
+    def lookup(self, id):
+        '''Return block, offset in block, and length of the last records of
+        replicate ``id``.'''
+        if self._positions is None:
+            self._positions = {
+                x: i for i, x in enumerate(self.entries['id'].tolist())
+            }
+        try:
+            entry = self.entries[self._positions[id]]
+        except KeyError:
+            raise ValueError(
+                f'Replicate {id} does not exist in {self.logfile}') from None
+        return int(entry['block']), int(entry['offset']), int(entry['length'])
+
+    def read(self, id):
+        '''Return records of replicate ``id``.'''
+        block, offset, length = self.lookup(id)
+        if compression(self.logfile) is None:
+            with open(self.logfile, 'rb') as log:
+                log.seek(offset)
+                return log.read(length).decode()
+        # replicates are usually read in the order of blocks
+        if self._block[0] != block:
+            self._block = (block, next(_blocks(self.logfile, block))[2])
+        return self._block[1][offset:offset + length].decode()
+
+    def save(self):
+        '''Write the index to ``<logfile>.idx``.'''
+        filename = index_file(self.logfile)
+        with open(filename + '.tmp', 'wb') as idx:
+            idx.write(INDEX_MAGIC)
+            idx.write(self.entries.tobytes())
+        os.replace(filename + '.tmp', filename)
+
+    def compact(self):
+        '''Remove replicates with errors, repeated replicates, and partially
+        written records or blocks from the logfile.'''
+        _, last = np.unique(self.entries['id'][::-1], return_index=True)
+        keep = np.zeros(len(self.entries), dtype=bool)
+        keep[len(self.entries) - 1 - last] = True
+        keep &= self.entries['status'] == END
+        if keep.all():
+            if os.path.getsize(self.logfile) > self.end:
+                os.truncate(self.logfile, self.end)
+            self.save()
+            return
+        # the temporary file has the same extension for the same compression
+        root, ext = os.path.splitext(self.logfile)
+        with LogWriter(root + '.tmp' + ext) as writer:
+            for id in self.entries['id'][keep].tolist():
+                writer.write(id, self.read(id), 'END')
+        os.replace(root + '.tmp' + ext, self.logfile)
+        os.replace(index_file(root + '.tmp' + ext), index_file(self.logfile))
+        loaded = LogIndex.load(self.logfile)
+        self.entries = loaded.entries
+        self.end = loaded.end
+        self._positions = None
+        self._block = (None, None)
+
+
+def read_replicate(logfile, id):
+    '''Return records of replicate ``id`` from ``logfile``.'''
+    return LogIndex.load(logfile).read(id)
+
+
+class LogWriter(object):
+    '''Write replicates to ``logfile`` and their locations to its index.
+    Replicates are appended to the existing replicates of ``index``, or
+    written to a new logfile if ``index`` is None. Replicates of compressed
+    logfiles are compressed in blocks of about ``block_size`` bytes by a
+    separate thread.'''
+
+    def __init__(self, logfile, index=None, block_size=BLOCK_SIZE):
+        self.logfile = logfile
+        self.block_size = block_size
+        self.compress = None if compression(
+            logfile) is None else compressor(logfile)
+        if index is None:
+            self.log = open(logfile, 'wb')
+            self.log.write(LOG_HEADER if self.compress is None else self
+                           .compress(LOG_HEADER))
+            self.idx = open(index_file(logfile), 'wb')
+            self.idx.write(INDEX_MAGIC)
+        else:
+            index.compact()
+            # not opened in append mode, to which the kernel cannot copy
+            self.log = open(logfile, 'r+b')
+            self.log.seek(0, os.SEEK_END)
+            self.idx = open(index_file(logfile), 'ab')
+        self.offset = self.log.tell()
+
+        self._block = []
+        self._records = []
+        self._block_length = 0
+        self._error = None
+        if self.compress is not None:
+            # a few blocks wait for compression while the next is collected
+            self._queue = queue.Queue(maxsize=4)
+            self._thread = threading.Thread(
+                target=self._compress_blocks, daemon=True)
+            self._thread.start()
+
+    def write(self, id, records, status):
+        '''Write ``records`` of replicate ``id`` that ends with ``status``
+        (``END`` or ``ERROR``).'''
+        data = records.encode()
+        if self.compress is None:
+            self.append(id, data, len(data), status)
+            return
+        self._block.append((id, len(data), STATUS[status]))
+        self._records.append(data)
+        self._block_length += len(data)
+        if self._block_length >= self.block_size:
+            self._submit()
+
+    def append(self, id, data, length, status):
+        '''Append replicate ``id`` with ``length`` bytes of records that are
+        written by another writer as ``data``, which should be a compressed
+        block for compressed logfiles.'''
+        self._append(id, data, length, status)
+
+    def copy(self, id, fd, position, size, length, status):
+        '''Append replicate ``id`` with ``length`` bytes of records that are
+        written by another writer as ``size`` bytes at ``position`` of file
+        descriptor ``fd``, which should be a compressed block for compressed
+        logfiles. The bytes are copied by the kernel if possible.'''
+        self._append(id, (fd, position, size), length, status)
+
+    def _append(self, id, data, length, status):
+        if self.compress is None:
+            self._write_data(data)
+            self.idx.write(
+                INDEX_RECORD.pack(id, 0, self.offset, length, STATUS[status]))
+            self.offset += length
+            return
+        if self._block:
+            self._submit()
+        self._put(([(id, length, STATUS[status])], data, False))
+
+    def _write_data(self, data):
+        '''Write bytes or bytes in (fd, position, size) of another file to the
+        logfile and return the number of bytes written.'''
+        if not isinstance(data, tuple):
+            self.log.write(data)
+            return len(data)
+        fd, position, size = data
+        self.log.flush()
+        dest = self.log.fileno()
+        remaining = size
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while remaining > 0:
+                    copied = os.copy_file_range(fd, dest, remaining, position)
+                    if copied == 0:
+                        break
+                    position += copied
+                    remaining -= copied
+            except OSError:
+                # not supported by the file systems
+                pass
+        while remaining > 0:
+            content = os.pread(fd, min(remaining, BLOCK_SIZE), position)
+            if not content:
+                raise ValueError(
+                    f'Failed to read {size} bytes of replicate from file descriptor {fd}'
+                )
+            self.log.write(content)
+            position += len(content)
+            remaining -= len(content)
+        # synchronize position of the buffered writer with the file
+        self.log.seek(0, os.SEEK_END)
+        return size
+
+    def _put(self, task):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(task)
+
+    def _submit(self, flush=False):
+        self._put((self._block, self._records, flush))
+        self._block = []
+        self._records = []
+        self._block_length = 0
+
+    def _write_block(self, replicates, data, flush):
+        if replicates:
+            if isinstance(data, list):
+                data = self.compress(b''.join(data))
+            size = self._write_data(data)
+            offset = 0
+            for id, length, status in replicates:
+                self.idx.write(
+                    INDEX_RECORD.pack(id, self.offset, offset, length, status))
+                offset += length
+            self.offset += size
+        if flush:
+            # blocks are flushed before their entries in the index
+            self.log.flush()
+            self.idx.flush()
+
+    def _compress_blocks(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            # discard blocks after an error, which is raised by the writer
+            if self._error is not None:
+                continue
+            try:
+                self._write_block(*task)
+            except Exception as e:
+                self._error = e
+
+    def flush(self):
+        if self.compress is None:
+            self.log.flush()
+            self.idx.flush()
+        else:
+            self._submit(flush=True)
+
+    def close(self):
+        if self.compress is not None:
+            if self._block:
+                self._queue.put((self._block, self._records, True))
+                self._block = []
+            self._queue.put(None)
+            self._thread.join()
+        self.log.close()
+        self.idx.close()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
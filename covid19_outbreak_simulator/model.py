@@ -1,16 +1,58 @@
+import math
 import os
 import re
+import zlib
 from fnmatch import fnmatch
+from statistics import NormalDist
 
 import numpy as np
-import pandas as pd
-import yaml
-from scipy.optimize import bisect
-from scipy.stats import norm
 from .event import EventType
 from covid19_outbreak_simulator.utils import as_float, as_int
 
 
+class GroupParams(object):
+    """Per-group parameters of ``Params`` compiled into arrays that are indexed
+    by group, with group "" at index 0, so that parameters of many individuals
+    can be retrieved by indexing with an array of group indices."""
+
+    MULTIPLIERS = (
+        "susceptibility",
+        "symptomatic_r0",
+        "asymptomatic_r0",
+        "incubation_period",
+        "prop_asym_carriers",
+    )
+
+    def __init__(self, params):
+        self.names = [""] + [x for x in params.groups if x != ""]
+        self.index = {x: i for i, x in enumerate(self.names)}
+        for param in self.MULTIPLIERS:
+            setattr(
+                self,
+                f"{param}_multiplier",
+                np.array(
+                    [
+                        getattr(params, f"{param}_multiplier_{x}", 1.0)
+                        for x in self.names
+                    ]
+                ),
+            )
+        self.susceptibility = (
+            getattr(params, "susceptibility_mean", 1) * self.susceptibility_multiplier
+        )
+        # python floats for scalar lookups, which are faster to compute with
+        self._scalars = {
+            x: y.tolist() for x, y in self.__dict__.items() if isinstance(y, np.ndarray)
+        }
+
+    def lookup(self, name, group):
+        """Return parameter ``name`` of ``group``, which can be a group name or
+        an array of group indices. Unknown groups use parameters of group ""."""
+        if isinstance(group, str):
+            return self._scalars[name][self.index.get(group, 0)]
+        return getattr(self, name)[group]
+
+
 class Params:
     def __init__(self, args=None):
         # args should be args returned from argparser
@@ -27,9 +69,12 @@ class Params:
             "infectivity_of_recovered",
         }
         self.groups = {}
+        self._group_params = None
         self.set_params(args)
 
     def __str__(self):
+        import yaml
+
         def float_representer(dumper, value):
             text = "{0:.4f}".format(value)
             return dumper.represent_scalar("tag:yaml.org,2002:float", text)
@@ -39,15 +84,23 @@ class Params:
         val = {
             x: list(y) if isinstance(y, set) else y
             for x, y in self.__dict__.items()
-            if x != "params"
+            if x != "params" and not x.startswith("_")
         }
         if "groups" in val and len(val["groups"]) == 1:
             val["groups"] = {"Unnamed": list(val["groups"].values())[0]}
         return yaml.dump(val, sort_keys=True, indent=4)
 
+    @property
+    def group_params(self):
+        """Per-group parameters, compiled again after any parameter changes."""
+        if getattr(self, "_group_params", None) is None:
+            self._group_params = GroupParams(self)
+        return self._group_params
+
     def set(self, param, prop, value):
         if param not in self.params:
             raise ValueError(f"Unrecgonzied parameter {param}")
+        self._group_params = None
         if prop is None or prop == "self":
             setattr(self, param, value)
         elif prop in ("loc", "low", "high", "mean", "sigma", "scale"):
@@ -71,9 +124,12 @@ class Params:
             if loc == value:
                 setattr(self, f"{param}_scale", 0)
             else:
-                sd = bisect(
-                    lambda x: norm.cdf(value, loc=loc, scale=x) - lq, a=0.00001, b=25
-                )
+                # normal distribution with quantile lq at value
+                sd = (value - loc) / NormalDist().inv_cdf(lq)
+                if sd <= 0:
+                    raise ValueError(
+                        f"Invalid quantile {lq} of {param} at {value} with loc {loc}"
+                    )
                 setattr(self, f"{param}_scale", sd)
         else:
             raise ValueError(f"Unrecognized property {prop}")
@@ -112,6 +168,7 @@ class Params:
             if name in self.groups:
                 raise ValueError(f'Group "{name}" has been specified before')
             self.groups[name] = size
+            self._group_params = None
 
     def set_infectors(self, val):
         if not val:
@@ -434,101 +491,156 @@ class Params:
 
 class Model(object):
 
-    sd_5 = bisect(lambda x: norm.cdf(10, loc=5, scale=x) - 0.995, a=0.001, b=5)
-    sd_6 = bisect(lambda x: norm.cdf(14, loc=6, scale=x) - 0.975, a=0.001, b=5)
+    sd_5 = (10 - 5) / NormalDist().inv_cdf(0.995)
+    sd_6 = (14 - 6) / NormalDist().inv_cdf(0.975)
+
+    # purposes of random streams with common random numbers
+    STREAMS = {"prop_asym_carriers": 0, "infection": 1, "selection": 2}
+
+    # number of standard uniform or normal numbers drawn at a time
+    BLOCK_SIZE = 4096
 
     def __init__(self, params):
         self.params = params
         self.params.prop_asym_carriers = None
+        self.common_random_numbers = None
+        self.clear_buffers()
+
+    def clear_buffers(self):
+        """Discard pre-drawn random numbers, which should be done if the
+        state of np.random is changed."""
+        self._uniform = []
+        self._normal = []
+
+    def _draw(self, rng, dist, a, b, size=None):
+        """Draw from distribution ``dist`` ("uniform", "normal" or "lognormal")
+        with parameters ``a`` and ``b``. Scalar draws from np.random are
+        transformed from blocks of pre-drawn standard uniform or normal numbers,
+        the same way numpy transforms them."""
+        if size is not None or rng is not np.random:
+            return getattr(rng, dist)(a, b, size)
+        if dist == "uniform":
+            if not self._uniform:
+                self._uniform = np.random.random_sample(self.BLOCK_SIZE).tolist()
+            return a + (b - a) * self._uniform.pop()
+        if not self._normal:
+            self._normal = np.random.standard_normal(self.BLOCK_SIZE).tolist()
+        x = a + b * self._normal.pop()
+        return math.exp(x) if dist == "lognormal" else x
+
+    def draw_uniform(self, low=0.0, high=1.0, rng=np.random):
+        return self._draw(rng, "uniform", low, high)
+
+    def set_common_random_numbers(self, seed, replicate):
+        """Draw random numbers of each individual from its own stream so that
+        replicates with the same seed and ID are aligned across scenarios."""
+        self.common_random_numbers = None if seed is None else (seed, replicate)
+
+    def get_rng(self, purpose, ID=None, count=0):
+        """Return a random number generator for the ``count``-th use of
+        individual ``ID`` for ``purpose``, or the global generator if common
+        random numbers are not used."""
+        if self.common_random_numbers is None:
+            return np.random
+        return np.random.default_rng(
+            [
+                *self.common_random_numbers,
+                self.STREAMS[purpose],
+                0 if ID is None else zlib.crc32(ID.encode()),
+                count,
+            ]
+        )
+
+    @staticmethod
+    def rank_ids(IDs, rng):
+        """Return random keys of ``IDs`` that do not depend on other IDs so that
+        the ID with the smallest key is selected regardless of the presence of
+        other IDs."""
+        x = np.array([zlib.crc32(ID.encode()) for ID in IDs], dtype=np.uint64)
+        x ^= np.uint64(rng.integers(2**63))
+        # splitmix64 finalizer
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
 
     def draw_prop_asym_carriers(self, group=""):
-        self.params.prop_asym_carriers = np.random.normal(
+        rng = self.get_rng("prop_asym_carriers")
+        self.params.prop_asym_carriers = rng.normal(
             loc=self.params.prop_asym_carriers_loc,
             scale=self.params.prop_asym_carriers_scale,
         )
         return min(
             max(
                 self.params.prop_asym_carriers
-                * getattr(self.params, f"prop_asym_carriers_multiplier_{group}", 1.0),
+                * self.params.group_params.lookup("prop_asym_carriers_multiplier", group),
                 0,
             ),
             1,
         )
 
-    def draw_is_asymptomatic(self):
-        return np.random.uniform(0, 1) < self.params.prop_asym_carriers
+    def draw_is_asymptomatic(self, rng=np.random, size=None):
+        return self._draw(rng, "uniform", 0, 1, size) < self.params.prop_asym_carriers
 
-    def draw_random_r0(self, symptomatic, group=""):
+    def draw_random_r0(self, symptomatic, group="", rng=np.random, size=None):
         """
         Reproduction number, drawn randomly between 1.4 and 2.8.
         """
         if symptomatic:
-            if self.params.symptomatic_r0_scale == 0.0:
-                return self.params.symptomatic_r0_loc
-            else:
-                return max(
-                    0,
-                    np.random.normal(
-                        self.params.symptomatic_r0_loc, self.params.symptomatic_r0_scale
-                    ),
-                )
+            loc = self.params.symptomatic_r0_loc
+            scale = self.params.symptomatic_r0_scale
         else:
-            if self.params.asymptomatic_r0_scale == 0.0:
-                return self.params.asymptomatic_r0_loc
-            else:
-                return max(
-                    0,
-                    np.random.normal(
-                        self.params.asymptomatic_r0_loc,
-                        self.params.asymptomatic_r0_scale,
-                    ),
-                )
-
-    def draw_random_incubation_period(self, group=""):
+            loc = self.params.asymptomatic_r0_loc
+            scale = self.params.asymptomatic_r0_scale
+        if scale == 0.0:
+            return loc if size is None else np.full(size, loc)
+        r0 = self._draw(rng, "normal", loc, scale, size)
+        return max(0, r0) if size is None else np.maximum(0, r0)
+
+    def draw_random_incubation_period(self, group="", rng=np.random, size=None):
         """
-        Incubation period, drawn from a lognormal distribution.
+        Incubation period, drawn from a lognormal distribution. ``group`` can
+        be an array of group indices in ``params.group_params`` if ``size`` is
+        specified.
         """
         if hasattr(self.params, "incubation_period_loc"):
             # if a normal distribution is specified
-            ip = max(
-                0,
-                np.random.normal(
-                    loc=self.params.incubation_period_loc,
-                    scale=self.params.incubation_period_scale,
-                ),
+            ip = self._draw(
+                rng,
+                "normal",
+                self.params.incubation_period_loc,
+                self.params.incubation_period_scale,
+                size,
             )
+            ip = max(0, ip) if size is None else np.maximum(0, ip)
         else:
-            ip = np.random.lognormal(
-                mean=self.params.incubation_period_mean,
-                sigma=self.params.incubation_period_sigma,
+            ip = self._draw(
+                rng,
+                "lognormal",
+                self.params.incubation_period_mean,
+                self.params.incubation_period_sigma,
+                size,
             )
-        return ip * getattr(self.params, f"incubation_period_multiplier_{group}", 1.0)
+        return ip * self.params.group_params.lookup(
+            "incubation_period_multiplier", group
+        )
 
-    def draw_infection_params(self, symptomatic, vaccinated=None):
-        if symptomatic:
-            # duration of infection is 8 days after incubation
-            return {
-                "duration": self.params.symptomatic_transmissibility_model[
-                    "duration_shift"
-                ]
-                + np.random.lognormal(
-                    self.params.symptomatic_transmissibility_model["duration_mean"],
-                    self.params.symptomatic_transmissibility_model["duration_sigma"],
-                ),
-                "vaccinated": vaccinated,
-            }
-        else:
-            # 12 day overall (with normal at 4.8)
-            return {
-                "duration": self.params.asymptomatic_transmissibility_model[
-                    "duration_shift"
-                ]
-                + np.random.lognormal(
-                    self.params.asymptomatic_transmissibility_model["duration_mean"],
-                    self.params.asymptomatic_transmissibility_model["duration_sigma"],
-                ),
-                "vaccinated": vaccinated,
-            }
+    def draw_infection_params(
+        self, symptomatic, vaccinated=None, rng=np.random, size=None
+    ):
+        model = (
+            self.params.symptomatic_transmissibility_model
+            if symptomatic
+            else self.params.asymptomatic_transmissibility_model
+        )
+        # duration of infection after incubation for symptomatic cases,
+        # and overall duration for asymptomatic cases
+        return {
+            "duration": model["duration_shift"]
+            + self._draw(
+                rng, "lognormal", model["duration_mean"], model["duration_sigma"], size
+            ),
+            "vaccinated": vaccinated,
+        }
 
     def get_symptomatic_transmission_probability(self, incu, R0, params):
         """Transmission probability.
@@ -660,16 +772,14 @@ class Model(object):
 
 
 def print_proportion(data, name):
-    series = pd.Series(data)
     print("\n" + name + ":")
-    print(f"      proportion:  {series.mean():.4f}")
+    print(f"      proportion:  {np.mean(data):.4f}")
 
 
 def print_stats(data, name):
-    series = pd.Series(data)
     print("\n" + name + ":")
-    print(f"            mean:  {series.mean():.4f}")
-    print(f"             std:  {series.std():.4f}")
+    print(f"            mean:  {np.mean(data):.4f}")
+    print(f"             std:  {np.std(data, ddof=1):.4f}")
     #for q in (0.025, 0.05, 0.5, 0.95, 0.975):
     #    print(f"  {q*100:4.1f}% quantile:  {series.quantile(q):.4f}")
 
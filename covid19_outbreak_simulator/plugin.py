@@ -5,6 +5,9 @@ from covid19_outbreak_simulator.event import EventType
 
 class PlugInEvent(object):
 
+    cancel_with_target = False
+    cancelled = False
+
     def __init__(self, time, plugin, args, priority=False, trigger_event=None):
         self.time = time
         self.plugin = plugin
@@ -32,6 +35,11 @@ class BasePlugin(object):
     #
     apply_at = 'after_core_events'
 
+    # plugins that introduce infections into the population, which prevent
+    # the simulation from stopping with --stop-if extinct while they are
+    # pending
+    seeds_infections = False
+
     def __init__(self, simulator, *args, **kwargs):
         self.simulator = simulator
         self.logger = self.simulator.logger if self.simulator else None
@@ -9,6 +9,7 @@ class community_infection(BasePlugin):
 
     # events that will trigger this plugin
     apply_at = 'before_core_events'
+    seeds_infections = True
 
     def __init__(self, *args, **kwargs):
         # this will set self.simualtor, self.logger
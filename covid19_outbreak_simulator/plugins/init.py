@@ -4,7 +4,7 @@ import numpy as np
 
 from covid19_outbreak_simulator.event import Event, EventType
 from covid19_outbreak_simulator.plugin import BasePlugin
-from covid19_outbreak_simulator.utils import parse_param_with_multiplier, parse_target_param
+from covid19_outbreak_simulator.utils import parse_param_with_multiplier, parse_target_param, status_columns
 from covid19_outbreak_simulator.population import Population
 
 
@@ -12,6 +12,7 @@ class init(BasePlugin):
 
     # events that will trigger this plugin
     apply_at = "before_core_events"
+    seeds_infections = True
 
     def __init__(self, *args, **kwargs):
         # this will set self.simualtor, self.logger
@@ -72,7 +73,10 @@ class init(BasePlugin):
 
         if args.target is not None:
             is_targeted = parse_target_param(args.target)
-            inds = {id:ind for id,ind in population.individuals.items() if is_targeted(ind)}
+            IDs = list(population.individuals.keys())
+            mask = is_targeted.mask(
+                status_columns(population, IDs, is_targeted.columns), len(IDs))
+            inds = {IDs[x]: population[IDs[x]] for x in np.flatnonzero(mask)}
             pop = Population([], population.model, [], None)
             pop.individuals = inds
             pop.group_sizes = {x:0 for x in population.group_sizes.keys()}
@@ -59,6 +59,7 @@ class move(BasePlugin):
             new_id = population.move(ID, args.to_subpop)
             if args.reintegrate and isinstance(population[new_id].quarantined,
                                                float):
+                population.n_quarantined -= 1
                 population[new_id].reintegrate()
             if isinstance(population[new_id].infected,
                           float) and not isinstance(
@@ -31,6 +31,8 @@ class reset(BasePlugin):
         n_resetted = 0
         for ind in population.individuals():
             if ind.group in sps:
+                if isinstance(ind.quarantined, float):
+                    population.n_quarantined -= 1
                 ind.immunity = None
                 ind.infectivity = None
                 ind.infected = False
@@ -1,7 +1,6 @@
 import os
 
 import numpy as np
-import pandas as pd
 
 from covid19_outbreak_simulator.event import Event, EventType
 from covid19_outbreak_simulator.model import Model, Params
@@ -152,13 +151,13 @@ class testing(BasePlugin):
                 f"\nTest sensitivity (for {model.params.prop_asym_carriers*100:.1f}% asymptomatic carriers)"
             )
             print(
-                f"    <= 7 days:     {pd.Series(sensitivities7).mean() * 100:.1f}%"
+                f"    <= 7 days:     {np.mean(sensitivities7) * 100:.1f}%"
             )
             print(
-                f"    > 7 days:      {pd.Series(sensitivities20).mean() * 100:.1f}%"
+                f"    > 7 days:      {np.mean(sensitivities20) * 100:.1f}%"
             )
             print(
-                f"    all:           {pd.Series(sensitivities7 + sensitivities20).mean() * 100:.1f}%"
+                f"    all:           {np.mean(sensitivities7 + sensitivities20) * 100:.1f}%"
             )
 
     def apply(self, time, population, args=None):
@@ -1,15 +1,114 @@
 import copy
 import re
+from collections import defaultdict
 from fnmatch import fnmatch
 
 import numpy as np
-from numpy.random import choice, rand
 
 from .event import Event, EventType
 from .utils import as_float, parse_handle_symptomatic_options
 
 
+def parse_vicinity(params, groups):
+    """Parse --vicinity into a dictionary of infector group to a dictionary
+    of the number of "neighbors" in each infectee group."""
+    if not params:
+        return {}
+
+    res = {}
+    for param in params:
+        matched = re.match(r"^(.*)-(.*)=([\.\d]+)$", param)
+        if matched:
+            infector_sp = matched.group(1)
+            infectee_sp = matched.group(2)
+            neighbor_size = float(matched.group(3))
+        else:
+            matched = re.match(r"^(.*)=([\.\d]+)$", param)
+            if matched:
+                infector_sp = ""
+                infectee_sp = matched.group(1)
+                neighbor_size = float(matched.group(2))
+            if not matched:
+                raise ValueError(
+                    f'Vicinity should be specified as "INFECTOR_SO-INFECTEE_SP=SIZE": {param} specified'
+                )
+
+        if infector_sp == "":
+            infector_sps = [""]
+        elif infector_sp.startswith("!"):
+            infector_sps = [
+                x
+                for x in groups
+                if not fnmatch(x, infector_sp[1:])
+            ]
+        else:
+            infector_sps = [
+                x for x in groups if fnmatch(x, infector_sp)
+            ]
+
+        if infector_sp != "" and not infector_sps:
+            raise ValueError(f"Unrecognized group {infector_sp}")
+
+        for infector_sp in infector_sps:
+            if infectee_sp == "&":
+                infectee_sps = [infector_sp]
+            elif infectee_sp == "!&":
+                infectee_sps = [
+                    x for x in groups if x != infector_sp
+                ]
+            elif infectee_sp.startswith("!"):
+                infectee_sps = [
+                    x
+                    for x in groups
+                    if not fnmatch(x, infectee_sp[1:])
+                ]
+            else:
+                infectee_sps = [
+                    x for x in groups if fnmatch(x, infectee_sp)
+                ]
+
+            if not infectee_sps:
+                raise ValueError(f"Unrecognized group {infectee_sp}")
+
+            for tsp in infectee_sps:
+                if infector_sp in res:
+                    res[infector_sp][tsp] = neighbor_size
+                else:
+                    res[infector_sp] = {tsp: neighbor_size}
+    return res
+
+
 class Individual(object):
+    # attributes set during the simulation, such as monitored and replaced_by,
+    # are unset until the corresponding event happens
+    __slots__ = (
+        "id",
+        "model",
+        "susceptibility",
+        "logger",
+        "immunity",
+        "infectivity",
+        "infected",
+        "show_symptom",
+        "recovered",
+        "symptomatic",
+        "vaccinated",
+        "quarantined",
+        "r0",
+        "r0_multiplier",
+        "incubation_period",
+        "infect_params",
+        "infected_by",
+        "monitored",
+        "reintegrated",
+        "replaced_by",
+        "n_exposures",
+        "n_selections",
+        "removed",
+        "pending_events",
+        "n_pending_infections",
+    )
+
     def __init__(self, id, susceptibility, model, logger):
         self.id = id
         self.model = model
@@ -30,6 +129,18 @@ class Individual(object):
         self.r0 = None
         self.incubation_period = None
 
+        # number of infection attempts and selected infectees, which index
+        # random streams of the individual with common random numbers
+        self.n_exposures = 0
+        self.n_selections = 0
+
+        # set when the individual is removed from the population, which
+        # cancels pending_events that only change the individual
+        self.removed = False
+        self.pending_events = None
+        # pending infections caused by the individual
+        self.n_pending_infections = 0
+
     @property
     def group(self):
         return self.id.rsplit("_", 1)[0] if "_" in self.id else ""
@@ -81,24 +192,48 @@ class Individual(object):
         self.reintegrated = float(time)
         return []
 
+    def _avoid_infections(self, time, x_grid, infected):
+        """Cancel infections at ``time + x_grid`` that would happen during
+        quarantine and return an INFECTION_AVOIDED event with the number
+        and time range of the avoided infections."""
+        x_grid = np.asarray(x_grid)
+        avoided = np.flatnonzero((time + x_grid < self.quarantined) & (infected != 0))
+        if len(avoided) == 0:
+            return []
+        infected[avoided] = 0
+        return [
+            Event(
+                time + x_grid[avoided[0]],
+                EventType.INFECTION_AVOIDED,
+                target=self,
+                logger=self.logger,
+                by=self,
+                count=len(avoided),
+                till=time + x_grid[avoided[-1]],
+            )
+        ]
+
     def symptomatic_infect(self, time, **kwargs):
+        rng = kwargs.pop("rng", np.random)
         self.symptomatic = True
-        self.r0 = self.model.draw_random_r0(symptomatic=True, group=self.group)
+        self.r0 = self.model.draw_random_r0(
+            symptomatic=True, group=self.group, rng=rng
+        )
 
         if self.infectivity is not None:
             assert self.infectivity[0] > 0 and self.infectivity[0] <= 1
             self.r0 *= self.infectivity[0]
 
-        self.r0_multiplier = getattr(
-            self.model.params, f"symptomatic_r0_multiplier_{self.group}", 1.0
+        self.r0_multiplier = self.model.params.group_params.lookup(
+            "symptomatic_r0_multiplier", self.group
         )
         #
         self.incubation_period = self.model.draw_random_incubation_period(
-            group=self.group
+            group=self.group, rng=rng
         )
 
         self.infect_params = self.model.draw_infection_params(
-            symptomatic=True, vaccinated=isinstance(self.vaccinated, float)
+            symptomatic=True, vaccinated=isinstance(self.vaccinated, float), rng=rng
         )
 
         #
@@ -115,9 +250,9 @@ class Individual(object):
                     "leadtime is only allowed during initialization of infection event (no by option.)"
                 )
             if kwargs["leadtime"] == "any":
-                lead_time = np.random.uniform(0, x_grid[-1])
+                lead_time = self.model.draw_uniform(0, x_grid[-1], rng=rng)
             elif kwargs["leadtime"] == "asymptomatic":
-                lead_time = np.random.uniform(0, self.incubation_period)
+                lead_time = self.model.draw_uniform(0, self.incubation_period, rng=rng)
             else:
                 lead_time = as_float(
                     kwargs["leadtime"],
@@ -156,7 +291,7 @@ class Individual(object):
             if handle_symptomatic["reaction"] == "reintegrate":
                 proportion = handle_symptomatic.get("proportion", 1)
 
-                if proportion == 1 or np.random.uniform(0, 1, 1)[0] <= proportion:
+                if proportion == 1 or self.model.draw_uniform(rng=rng) <= proportion:
                     if symp_time >= 0:
                         evts.append(
                             # scheduling reintegration
@@ -176,10 +311,10 @@ class Individual(object):
             proportion = handle_symptomatic.get("proportion", 1)
             if (
                 handle_symptomatic["reaction"] == "keep"
-                and np.random.uniform(0, 1, 1)[0] > proportion
+                and self.model.draw_uniform(rng=rng) > proportion
             ) or (
                 handle_symptomatic["reaction"] == "remove"
-                and (proportion == 1 or np.random.uniform(0, 1, 1)[0] <= proportion)
+                and (proportion == 1 or self.model.draw_uniform(rng=rng) <= proportion)
             ):
                 if symp_time >= 0:
                     evts.append(
@@ -200,7 +335,7 @@ class Individual(object):
         elif handle_symptomatic["reaction"] == "replace":
             replace_duration = handle_symptomatic.get("duration", 14)
             proportion = handle_symptomatic.get("proportion", 1)
-            if proportion == 1 or np.random.uniform(0, 1, 1)[0] <= proportion:
+            if proportion == 1 or self.model.draw_uniform(rng=rng) <= proportion:
                 if symp_time >= 0:
                     evts.append(
                         # scheduling REMOVAL
@@ -223,7 +358,7 @@ class Individual(object):
             quarantine_duration = handle_symptomatic.get("duration", 14)
             test_before_release = handle_symptomatic.get("test_before_release", None)
             proportion = handle_symptomatic.get("proportion", 1)
-            if proportion == 1 or np.random.uniform(0, 1, 1)[0] <= proportion:
+            if proportion == 1 or self.model.draw_uniform(rng=rng) <= proportion:
                 if symp_time >= 0:
                     evts.append(
                         # scheduling QUARANTINE
@@ -245,7 +380,7 @@ class Individual(object):
             )
 
         # infect only before removal or quarantine
-        infected = np.random.binomial(1, trans_prob, len(trans_prob))
+        infected = rng.binomial(1, trans_prob, len(trans_prob))
         presymptomatic_infected = [
             xx for xx, ii in zip(x_grid, infected) if ii and xx < self.incubation_period
         ]
@@ -255,18 +390,7 @@ class Individual(object):
             if ii and xx >= self.incubation_period
         ]
         if self.quarantined:
-            for idx, x in enumerate(x_grid):
-                if time + x < self.quarantined and infected[idx] != 0:
-                    evts.append(
-                        Event(
-                            time + x,
-                            EventType.INFECTION_AVOIDED,
-                            target=self,
-                            logger=self.logger,
-                            by=self,
-                        )
-                    )
-                    infected[idx] = 0
+            evts.extend(self._avoid_infections(time, x_grid, infected))
         #
         for x, infe in zip(x_grid, infected):
             if infe:
@@ -310,24 +434,25 @@ class Individual(object):
         return evts
 
     def asymptomatic_infect(self, time, **kwargs):
+        rng = kwargs.pop("rng", np.random)
         self.symptomatic = False
         if "r0" in kwargs:
             self.r0 = kwargs.pop("r0")
         else:
-            self.r0 = self.model.draw_random_r0(symptomatic=False)
+            self.r0 = self.model.draw_random_r0(symptomatic=False, rng=rng)
             if self.infectivity is not None:
                 assert self.infectivity[1] > 0 and self.infectivity[1] <= 1
                 self.r0 *= self.infectivity[1]
 
-        self.r0_multiplier = getattr(
-            self.model.params, f"asymptomatic_r0_multiplier_{self.group}", 1.0
+        self.r0_multiplier = self.model.params.group_params.lookup(
+            "asymptomatic_r0_multiplier", self.group
         )
 
         self.incubation_period = -1
 
         by_ind = kwargs.get("by")
         self.infect_params = self.model.draw_infection_params(
-            symptomatic=False, vaccinated=isinstance(self.vaccinated, float)
+            symptomatic=False, vaccinated=isinstance(self.vaccinated, float), rng=rng
         )
 
         (x_grid, trans_prob) = self.model.get_asymptomatic_transmission_probability(
@@ -343,7 +468,7 @@ class Individual(object):
             if kwargs["leadtime"] in ("any", "asymptomatic"):
                 # this is the first infection, the guy should be asymptomatic, but
                 # could be anywhere in his incubation period
-                lead_time = np.random.uniform(0, x_grid[-1])
+                lead_time = self.model.draw_uniform(0, x_grid[-1], rng=rng)
             else:
                 lead_time = min(
                     as_float(
@@ -370,21 +495,10 @@ class Individual(object):
             x_grid = x_grid - x_grid[0]
 
         # infect only before removal
-        infected = np.random.binomial(1, trans_prob, len(x_grid))
+        infected = rng.binomial(1, trans_prob, len(x_grid))
         asymptomatic_infected = sum(infected)
         if self.quarantined:
-            for idx, x in enumerate(x_grid):
-                if time + x < self.quarantined and infected[idx] != 0:
-                    evts.append(
-                        Event(
-                            time + x,
-                            EventType.INFECTION_AVOIDED,
-                            target=self,
-                            logger=self.logger,
-                            by=self,
-                        )
-                    )
-                    infected[idx] = 0
+            evts.extend(self._avoid_infections(time, x_grid, infected))
         #
         for x, infe in zip(x_grid, infected):
             if infe:
@@ -528,37 +642,40 @@ class Individual(object):
             )
             return []
 
-        if self.susceptibility < 1 and rand() > self.susceptibility:
+        rng = self.model.get_rng("infection", self.id, self.n_exposures)
+        self.n_exposures += 1
+
+        if self.susceptibility < 1 and self.model.draw_uniform(rng=rng) > self.susceptibility:
             by_id = "." if kwargs["by"] is None else kwargs["by"].id
             self.logger.write(
                 f"{time:.2f}\t{EventType.INFECTION_FAILED.name}\t{self.id}\tby={by_id},reason=susceptibility\n"
             )
             return []
 
-        if self.model.draw_is_asymptomatic():
+        if self.model.draw_is_asymptomatic(rng=rng):
             if (
                 self.immunity is not None
                 and self.immunity[1] > 0
-                and rand() < self.immunity[1]
+                and self.model.draw_uniform(rng=rng) < self.immunity[1]
             ):
                 by_id = "." if kwargs["by"] is None else kwargs["by"].id
                 self.logger.write(
                     f"{time:.2f}\t{EventType.INFECTION_FAILED.name}\t{self.id}\tby={by_id},reason=immunity\n"
                 )
                 return []
-            return self.asymptomatic_infect(time, **kwargs)
+            return self.asymptomatic_infect(time, rng=rng, **kwargs)
 
         if (
             self.immunity is not None
             and self.immunity[0] > 0
-            and rand() < self.immunity[0]
+            and self.model.draw_uniform(rng=rng) < self.immunity[0]
         ):
             by_id = "." if kwargs["by"] is None else kwargs["by"].id
             self.logger.write(
                 f"{time:.2f}\t{EventType.INFECTION_FAILED.name}\t{self.id}\tby={by_id},reason=immunity\n"
             )
             return []
-        return self.symptomatic_infect(time, **kwargs)
+        return self.symptomatic_infect(time, rng=rng, **kwargs)
 
 
 class Population(object):
@@ -568,6 +685,20 @@ class Population(object):
             (ps.split("=", 1)[0] if "=" in ps else ""): 0 for ps in popsize
         }
         self.model = model
+        # cumulative number of infections
+        self.n_infections = 0
+        # cumulative numbers of infections and removals of each group
+        self.group_infections = defaultdict(int)
+        self.group_removals = defaultdict(int)
+        # number of individuals in quarantine, which is updated by events and
+        # plugins that quarantine, reintegrate, remove and replace individuals
+        self.n_quarantined = 0
+        # number of pending events of each type and individuals with pending
+        # infections, excluding events cancelled by removal of individuals
+        self.n_pending = defaultdict(int)
+        self.n_infectors = 0
+        # individuals replaced till a later time
+        self.replaced = set()
         self.max_ids = copy.deepcopy(self.group_sizes)
         self.subpop_from_id = re.compile(r"^(.*?)[\d]+$")
         self.vicinity = self.parse_vicinity(vicinity)
@@ -588,12 +719,12 @@ class Population(object):
                     f"Named population size should be name=int: {ps} provided"
                 ) from e
 
+            susceptibility = model.params.group_params.lookup("susceptibility", name)
             self.add(
                 [
                     Individual(
                         f"{name}_{idx}" if name else str(idx),
-                        susceptibility=getattr(model.params, "susceptibility_mean", 1)
-                        * getattr(model.params, f"susceptibility_multiplier_{name}", 1),
+                        susceptibility=susceptibility,
                         model=model,
                         logger=logger,
                     )
@@ -620,70 +751,7 @@ class Population(object):
         return new_id
 
     def parse_vicinity(self, params):
-        if not params:
-            return {}
-
-        res = {}
-        for param in params:
-            matched = re.match(r"^(.*)-(.*)=([\.\d]+)$", param)
-            if matched:
-                infector_sp = matched.group(1)
-                infectee_sp = matched.group(2)
-                neighbor_size = float(matched.group(3))
-            else:
-                matched = re.match(r"^(.*)=([\.\d]+)$", param)
-                if matched:
-                    infector_sp = ""
-                    infectee_sp = matched.group(1)
-                    neighbor_size = float(matched.group(2))
-                if not matched:
-                    raise ValueError(
-                        f'Vicinity should be specified as "INFECTOR_SO-INFECTEE_SP=SIZE": {param} specified'
-                    )
-
-            if infector_sp == "":
-                infector_sps = [""]
-            elif infector_sp.startswith("!"):
-                infector_sps = [
-                    x
-                    for x in self.group_sizes.keys()
-                    if not fnmatch(x, infector_sp[1:])
-                ]
-            else:
-                infector_sps = [
-                    x for x in self.group_sizes.keys() if fnmatch(x, infector_sp)
-                ]
-
-            if infector_sp != "" and not infector_sps:
-                raise ValueError(f"Unrecognized group {infector_sp}")
-
-            for infector_sp in infector_sps:
-                if infectee_sp == "&":
-                    infectee_sps = [infector_sp]
-                elif infectee_sp == "!&":
-                    infectee_sps = [
-                        x for x in self.group_sizes.keys() if x != infector_sp
-                    ]
-                elif infectee_sp.startswith("!"):
-                    infectee_sps = [
-                        x
-                        for x in self.group_sizes.keys()
-                        if not fnmatch(x, infectee_sp[1:])
-                    ]
-                else:
-                    infectee_sps = [
-                        x for x in self.group_sizes.keys() if fnmatch(x, infectee_sp)
-                    ]
-
-                if not infectee_sps:
-                    raise ValueError(f"Unrecognized group {infectee_sp}")
-
-                for tsp in infectee_sps:
-                    if infector_sp in res:
-                        res[infector_sp][tsp] = neighbor_size
-                    else:
-                        res[infector_sp] = {tsp: neighbor_size}
-        return res
+        return parse_vicinity(params, self.group_sizes.keys())
 
     def add(self, items, subpop):
         sz = len(self.individuals)
@@ -730,9 +798,17 @@ class Population(object):
                 new_ind.show_symptom = False
                 new_ind.recovered = False
 
+        if isinstance(ind.quarantined, float):
+            self.n_quarantined -= 1
+        if isinstance(new_ind.quarantined, float):
+            self.n_quarantined += 1
+
         # remove old one, add new one
         if "till" in kwargs and kwargs["till"] is not None:
             ind.replaced_by = new_ind
+            self.replaced.add(ind)
+        else:
+            self.cancel_events(ind)
         self.individuals.pop(ind.id)
         self.individuals[new_ind.id] = new_ind
         return new_ind
@@ -744,7 +820,80 @@ class Population(object):
     def remove(self, item):
         assert isinstance(item, Individual)
         self.group_sizes[item.group] -= 1
+        self.group_removals[item.group] += 1
+        if isinstance(item.quarantined, float):
+            self.n_quarantined -= 1
         self.individuals.pop(item.id)
+        self.cancel_events(item)
+
+    def add_pending(self, evt):
+        """Count pending event ``evt`` and register it with the individual it
+        depends on."""
+        if evt.cancel_with_target:
+            target = evt.target
+            if target.removed:
+                return
+            if target.pending_events is None:
+                target.pending_events = [evt]
+            else:
+                target.pending_events.append(evt)
+        elif evt.action is EventType.INFECTION and evt.by is not None:
+            if evt.by.removed:
+                return
+            evt.by.n_pending_infections += 1
+            if evt.by.n_pending_infections == 1:
+                self.n_infectors += 1
+        self.n_pending[evt.action.name] += 1
+
+    def pop_pending(self, evt):
+        """Remove ``evt``, which is about to be processed, from pending events
+        and return False if it has been cancelled."""
+        if evt.cancel_with_target:
+            target = evt.target
+            if target.removed:
+                return False
+            target.pending_events.remove(evt)
+        elif evt.action is EventType.INFECTION and evt.by is not None:
+            # infections by removed individuals are no longer counted but
+            # are still processed to record INFECTION_AVOIDED
+            if evt.by.removed:
+                return True
+            evt.by.n_pending_infections -= 1
+            if evt.by.n_pending_infections == 0:
+                self.n_infectors -= 1
+        self.n_pending[evt.action.name] -= 1
+        return True
+
+    def remaining_events(self):
+        """Return the number of pending events of each type and the number
+        of individuals with pending infections, excluding events of
+        individuals that are not in the population."""
+        counts = {x: y for x, y in self.n_pending.items() if y > 0}
+        n_infectors = self.n_infectors
+        # individuals that are replaced can return to the population so
+        # their events are not cancelled
+        for ind in self.replaced:
+            if ind.id in self:
+                continue
+            for evt in ind.pending_events or []:
+                if evt.action.name in ("SHOW_SYMPTOM", "RECOVER", "REMOVAL"):
+                    counts[evt.action.name] -= 1
+            if ind.n_pending_infections > 0:
+                counts[EventType.INFECTION.name] -= ind.n_pending_infections
+                n_infectors -= 1
+        return {x: y for x, y in counts.items() if y > 0}, n_infectors
+
+    def cancel_events(self, ind):
+        """Cancel pending events of removed individual ``ind``. Cancelled
+        events are skipped without being processed."""
+        ind.removed = True
+        for evt in ind.pending_events or []:
+            self.n_pending[evt.action.name] -= 1
+        ind.pending_events = None
+        if ind.n_pending_infections > 0:
+            self.n_pending[EventType.INFECTION.name] -= ind.n_pending_infections
+            self.n_infectors -= 1
+            ind.n_pending_infections = 0
 
     def __len__(self):
         return len(self.individuals)
@@ -768,6 +917,33 @@ class Population(object):
     def values(self):
         return self.individuals.values()
 
+    def count_infected(self):
+        """Return numbers of infected and recovered individuals."""
+        n_infected = 0
+        n_recovered = 0
+        for ind in self.individuals.values():
+            if ind.infected not in (False, None):
+                n_infected += 1
+            if ind.recovered not in (False, None):
+                n_recovered += 1
+        return n_infected, n_recovered
+
+    def count_quarantined(self):
+        """Return the number of individuals in quarantine."""
+        return self.n_quarantined
+
+    def count_by_group(self):
+        """Return numbers of infected individuals who have not recovered and
+        of individuals in quarantine of each group."""
+        n_active = defaultdict(int)
+        n_quarantined = defaultdict(int)
+        for ind in self.individuals.values():
+            if isinstance(ind.infected, float) and not isinstance(ind.recovered, float):
+                n_active[ind.group] += 1
+            if isinstance(ind.quarantined, float):
+                n_quarantined[ind.group] += 1
+        return n_active, n_quarantined
+
     def select(self, infector=None):
         # select one non-quarantined indivudal to infect
         #
@@ -775,6 +951,13 @@ class Population(object):
             raise RuntimeError(
                 f"Can not select infectee if since infector {infector} no longer exists."
             )
+        if infector is None:
+            rng = np.random
+        else:
+            rng = self.model.get_rng(
+                "selection", infector, self.individuals[infector].n_selections
+            )
+            self.individuals[infector].n_selections += 1
 
         # if not cicinity is defines, or
         # if infection is from community and '' not in vicinity, or
@@ -812,7 +995,7 @@ class Population(object):
             freq = {x: y / total for x, y in freq.items()}
             # first determine which group ...
             # note that array(['A']) == 'A' is True
-            grp = choice(groups, 1, p=[freq[x] for x in groups])[0]
+            grp = rng.choice(groups, 1, p=[freq[x] for x in groups])[0]
 
             # then select a random individual from the group.
             ids = [
@@ -823,4 +1006,164 @@ class Population(object):
 
         if not ids:
             return None
-        return self.individuals[choice(ids)]
+        if rng is np.random:
+            return self.individuals[rng.choice(ids)]
+        # with common random numbers, removal of other individuals from the
+        # population does not change the selected individual
+        return self.individuals[ids[np.argmin(self.model.rank_ids(ids, rng))]]
+
+
+class LazyPopulation(Population):
+    """Population that creates individuals only when they are infected or
+    otherwise referenced, so that the early phase of an outbreak in a large
+    population costs time and memory proportional to the number of infections.
+    Individuals that are not created are susceptible and not quarantined.
+
+    Accessing ``individuals``, for example by plugins, creates all remaining
+    individuals, after which the population works as a regular population.
+    """
+
+    def __init__(self, popsize, model, vicinity, logger):
+        if vicinity:
+            raise ValueError("Vicinity is not supported by lazy populations.")
+        self._individuals = {}
+        self.model = model
+        self.logger = logger
+        self.n_infections = 0
+        self.group_infections = defaultdict(int)
+        self.group_removals = defaultdict(int)
+        self.n_quarantined = 0
+        self.n_pending = defaultdict(int)
+        self.n_infectors = 0
+        self.replaced = set()
+        self.subpop_from_id = re.compile(r"^(.*?)[\d]+$")
+        self.vicinity = {}
+        self.group_sizes = {}
+        for ps in popsize:
+            name, sz = ps.split("=", 1) if "=" in ps else ("", ps)
+            try:
+                self.group_sizes[name] = int(sz)
+            except Exception as e:
+                raise ValueError(
+                    f"Named population size should be name=int: {ps} provided"
+                ) from e
+        self.max_ids = copy.deepcopy(self.group_sizes)
+        # IDs of individuals that have not been created fall in these ranges
+        self.lazy_sizes = copy.deepcopy(self.group_sizes)
+        self.removed_ids = set()
+        self.lazy = True
+
+    @property
+    def individuals(self):
+        if self.lazy:
+            self.materialize()
+        return self._individuals
+
+    @individuals.setter
+    def individuals(self, value):
+        self._individuals = value
+
+    def _is_lazy_id(self, ID):
+        if not self.lazy or ID in self._individuals or ID in self.removed_ids:
+            return False
+        name, idx = ID.rsplit("_", 1) if "_" in ID else ("", ID)
+        return (
+            name in self.lazy_sizes
+            and idx.isdigit()
+            and int(idx) < self.lazy_sizes[name]
+        )
+
+    def _create(self, ID):
+        group = ID.rsplit("_", 1)[0] if "_" in ID else ""
+        ind = Individual(
+            ID,
+            susceptibility=self.model.params.group_params.lookup(
+                "susceptibility", group
+            ),
+            model=self.model,
+            logger=self.logger,
+        )
+        self._individuals[ID] = ind
+        return ind
+
+    def materialize(self):
+        """Create all individuals that have not been created."""
+        if not self.lazy:
+            return
+        for name, sz in self.lazy_sizes.items():
+            for idx in range(sz):
+                ID = f"{name}_{idx}" if name else str(idx)
+                if ID not in self._individuals and ID not in self.removed_ids:
+                    self._create(ID)
+        self.lazy = False
+
+    def remove(self, item):
+        assert isinstance(item, Individual)
+        self.group_sizes[item.group] -= 1
+        self.group_removals[item.group] += 1
+        if isinstance(item.quarantined, float):
+            self.n_quarantined -= 1
+        self._individuals.pop(item.id)
+        if self.lazy:
+            self.removed_ids.add(item.id)
+        self.cancel_events(item)
+
+    def __len__(self):
+        return sum(self.group_sizes.values())
+
+    def __contains__(self, item):
+        return item in self._individuals or self._is_lazy_id(item)
+
+    def __getitem__(self, id):
+        if self._is_lazy_id(id):
+            return self._create(id)
+        return self._individuals[id]
+
+    def count_infected(self):
+        n_infected = 0
+        n_recovered = 0
+        # individuals that have not been created are not infected
+        for ind in self._individuals.values():
+            if ind.infected not in (False, None):
+                n_infected += 1
+            if ind.recovered not in (False, None):
+                n_recovered += 1
+        return n_infected, n_recovered
+
+    def count_by_group(self):
+        # individuals that have not been created are neither infected nor
+        # quarantined
+        n_active = defaultdict(int)
+        n_quarantined = defaultdict(int)
+        for ind in self._individuals.values():
+            if isinstance(ind.infected, float) and not isinstance(ind.recovered, float):
+                n_active[ind.group] += 1
+            if isinstance(ind.quarantined, float):
+                n_quarantined[ind.group] += 1
+        return n_active, n_quarantined
+
+    def select(self, infector=None):
+        if not self.lazy:
+            return super().select(infector)
+        if infector is not None and infector not in self:
+            raise RuntimeError(
+                f"Can not select infectee if since infector {infector} no longer exists."
+            )
+        names = list(self.lazy_sizes.keys())
+        ends = np.cumsum([self.lazy_sizes[x] for x in names])
+        if not ends[-1]:
+            return None
+        # select a random individual until a non-quarantined one other than
+        # the infector is found, which takes only a few tries unless a large
+        # proportion of the population is removed or quarantined
+        for i in range(100):
+            k = np.random.randint(ends[-1])
+            grp = np.searchsorted(ends, k, side="right")
+            idx = k - (ends[grp - 1] if grp else 0)
+            ID = f"{names[grp]}_{idx}" if names[grp] else str(idx)
+            if ID == infector or ID in self.removed_ids:
+                continue
+            ind = self[ID]
+            if not ind.quarantined:
+                return ind
+        return super().select(infector)
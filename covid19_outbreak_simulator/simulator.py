@@ -1,12 +1,23 @@
+import math
+import os
+import pickle
+import random
 import subprocess
+import time as wall_time
 from collections import defaultdict
 from datetime import datetime
 from importlib import import_module
 from itertools import groupby
 
+import numpy as np
+
+from . import __version__
 from .event import Event, EventType
 from .model import Model
-from .population import Population
+from .plugin import PlugInEvent
+from .population import LazyPopulation, Population
+from .timeseries import TimeSeries
+from .utils import parse_stop_if
 
 
 def load_plugins(args, simulator=None):
@@ -47,6 +58,36 @@ def load_plugins(args, simulator=None):
     return plugins
 
 
+class SnapshotPickler(pickle.Pickler):
+    '''Pickler that saves references to the simulator and its logger so that
+    they are replaced by the simulator that loads the snapshot.'''
+
+    def __init__(self, file, simulator):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.simulator = simulator
+
+    def persistent_id(self, obj):
+        if obj is self.simulator:
+            return 'simulator'
+        if obj is self.simulator.logger:
+            return 'logger'
+        return None
+
+
+class SnapshotUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, simulator):
+        super().__init__(file)
+        self.simulator = simulator
+
+    def persistent_load(self, pid):
+        if pid == 'simulator':
+            return self.simulator
+        if pid == 'logger':
+            return self.simulator.logger
+        raise pickle.UnpicklingError(f'Unsupported persistent object {pid}')
+
+
 class Simulator(object):
 
     def __init__(self, params, logger, simu_args, cmd):
@@ -56,6 +97,12 @@ class Simulator(object):
         self.model = None
         self.cmd = cmd
         self.plugins = {}
+        # time of the snapshot from which the simulation continues
+        self.snapshot_time = None
+        # if the replicate ended before the snapshot was saved
+        self.ended = False
+        # time series of the replicate if --time-series is specified
+        self.time_series = None
 
     def get_plugin_events(self):
         if not self.simu_args.plugin:
@@ -73,30 +120,44 @@ class Simulator(object):
             trigger_events_dict[te.trigger_event].append(te)
         return initial_events, trigger_events_dict
 
-    def simulate(self, id):
+    def start(self, id):
+        '''Create population and initial events of replicate ``id``.'''
         #
         # get proportion of asymptomatic
         #
         self.model = Model(self.params)
+        if getattr(self.simu_args, 'common_random_numbers', False):
+            self.model.set_common_random_numbers(self.simu_args.seed, id)
         self.model.draw_prop_asym_carriers()
 
         # collection of individuals
-        population = Population(popsize=self.simu_args.popsize, model=self.model,
-            vicinity=self.simu_args.vicinity, logger=self.logger)
+        if getattr(self.simu_args, 'engine', 'event') == 'branching':
+            self.population = LazyPopulation(popsize=self.simu_args.popsize, model=self.model,
+                vicinity=self.simu_args.vicinity, logger=self.logger)
+        else:
+            self.population = Population(popsize=self.simu_args.popsize, model=self.model,
+                vicinity=self.simu_args.vicinity, logger=self.logger)
 
-        events = defaultdict(list)
+        self.events = defaultdict(list)
+        self.time = 0.00
+        self.ended = False
         self.logger.id = id
+        if getattr(self.simu_args, 'time_series', None):
+            self.time_series = TimeSeries(
+                list(self.population.group_sizes),
+                self.simu_args.time_series_interval,
+                self.simu_args.time_series_end)
 
         infectors = [] if self.simu_args.infectors is None else self.simu_args.infectors
         for infector in infectors:
-            if infector not in population:
+            if infector not in self.population:
                 raise ValueError(f'Invalid ID for carrier {infector}')
             # infect the first person
-            events[0].append(
+            self.events[0].append(
                 Event(
                     0,
                     EventType.INFECTION,
-                    target=population[infector],
+                    target=self.population[infector],
                     logger=self.logger,
                     by=None,
                     handle_symptomatic=self.simu_args.handle_symptomatic,
@@ -104,9 +165,12 @@ class Simulator(object):
                     leadtime=self.simu_args.leadtime))
 
         # load the plugins
-        init_events, trigger_events = self.get_plugin_events()
+        init_events, self.trigger_events = self.get_plugin_events()
         for evt in init_events:
-            events[evt.time].append(evt)
+            self.events[evt.time].append(evt)
+        for evts in self.events.values():
+            for evt in evts:
+                self.population.add_pending(evt)
 
         start_params = {
             'id': self.logger.id,
@@ -119,15 +183,199 @@ class Simulator(object):
         self.logger.write(
             f'0.00\t{EventType.START.name}\t.\t{start_params}\n'
         )
-        while True:
+
+    def dump_state(self, file):
+        '''Pickle population, pending events, plugins and states of random
+        number generators to ``file``. Events at or before ``self.time`` have
+        been processed, or all events have been processed if the replicate
+        has ended.'''
+        SnapshotPickler(file, self).dump({
+            'version': __version__,
+            'id': self.logger.id,
+            'time': self.time,
+            'ended': self.ended,
+            'log': self.logger.getvalue() if hasattr(self.logger, 'getvalue') else '',
+            'model': self.model,
+            'population': self.population,
+            'events': self.events,
+            'trigger_events': self.trigger_events,
+            'np_random_state': np.random.get_state(),
+            'random_state': random.getstate(),
+        })
+
+    def restore_state(self, file, id, write_log=True, restore_rng=None):
+        '''Continue replicate ``id`` from a state pickled by ``dump_state``.
+        States of random number generators are restored if ``restore_rng`` is
+        True, or by default only if the state was saved from the same replicate
+        so that forks from a snapshot differ.'''
+        state = SnapshotUnpickler(file, self).load()
+        if state['version'] != __version__:
+            raise ValueError(
+                f'Snapshot was saved by version {state["version"]} of the simulator.'
+            )
+        self.logger.id = id
+        if write_log:
+            for line in state['log'].splitlines(keepends=True):
+                self.logger.write(line)
+        self.model = state['model']
+        if getattr(self.simu_args, 'common_random_numbers', False):
+            self.model.set_common_random_numbers(self.simu_args.seed, id)
+        else:
+            self.model.set_common_random_numbers(None, id)
+        self.population = state['population']
+        self.events = state['events']
+        self.trigger_events = state['trigger_events']
+        self.time = state['time']
+        self.snapshot_time = state['time']
+        self.ended = state.get('ended', False)
+        if restore_rng or (restore_rng is None and state['id'] == id):
+            np.random.set_state(state['np_random_state'])
+            random.setstate(state['random_state'])
+        else:
+            # random numbers drawn before the snapshot would be shared by forks
+            self.model.clear_buffers()
+
+    def save_snapshot(self, filename):
+        '''Save the state of the simulation to ``filename``.'''
+        filename = filename.format(id=self.logger.id)
+        if os.path.dirname(filename):
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename + '.tmp', 'wb') as snapshot:
+            self.dump_state(snapshot)
+        # a checkpoint is never left half written
+        os.replace(filename + '.tmp', filename)
+
+    def load_snapshot(self, filename, id):
+        '''Continue replicate ``id`` from a snapshot saved by ``save_snapshot``.
+        Plugins specified in ``simu_args.plugin`` replace plugins saved in the
+        snapshot, unless the replicate ended before the snapshot, in which
+        case it is not continued.'''
+        with open(filename, 'rb') as snapshot:
+            try:
+                self.restore_state(snapshot, id)
+            except ValueError as e:
+                raise ValueError(f'Failed to load snapshot {filename}: {e}') from e
+
+        if self.simu_args.plugin and not self.ended:
+            self.replace_plugins()
+
+    def replace_plugins(self):
+        '''Remove plugin events from pending events and schedule plugins
+        specified in ``simu_args.plugin`` from ``self.time``.'''
+        for time in list(self.events.keys()):
+            for evt in self.events[time]:
+                if isinstance(evt, PlugInEvent):
+                    self.population.pop_pending(evt)
+            self.events[time] = [
+                x for x in self.events[time] if not isinstance(x, PlugInEvent)
+            ]
+            if not self.events[time]:
+                self.events.pop(time)
+
+        init_events, self.trigger_events = self.get_plugin_events()
+        for evt in init_events:
+            if evt.time < self.time:
+                if evt.args.interval is not None:
+                    # continue at the first interval after the snapshot
+                    evt.time += math.ceil(
+                        (self.time - evt.time) / evt.args.interval) * evt.args.interval
+                    if evt.args.end is not None and evt.time > evt.args.end:
+                        continue
+                elif evt.args.start is None and not evt.args.at:
+                    # plugins applied once at the beginning are applied at the
+                    # time of the snapshot
+                    evt.time = self.time
+                else:
+                    continue
+            self.events[evt.time].append(evt)
+            self.population.add_pending(evt)
+
+    def seeding_plugins_remain(self):
+        '''Return True if a plugin that seeds infections is pending or can be
+        triggered by events.'''
+        return any(
+            x.plugin.seeds_infections
+            for evts in self.events.values()
+            for x in evts
+            if isinstance(x, PlugInEvent)) or any(
+                x.plugin.seeds_infections
+                for evts in self.trigger_events.values()
+                for x in evts)
+
+    def get_counters(self, names):
+        '''Return values of population counters ``names`` used by conditions
+        of --stop-if. Counters are kept by the population and derived from
+        counts of pending events, which are updated as events are processed.'''
+        population = self.population
+        counters = {}
+        if 'n_popsize' in names:
+            counters['n_popsize'] = len(population)
+        if 'n_infected' in names:
+            counters['n_infected'] = population.n_infections
+        if 'n_quarantined' in names:
+            counters['n_quarantined'] = population.n_quarantined
+        if names & {'n_active', 'n_infectors', 'extinct'}:
+            pending, n_infectors = population.remaining_events()
+            # every infected individual has a pending RECOVER event
+            counters['n_active'] = pending.get(EventType.RECOVER.name, 0)
+            counters['n_infectors'] = n_infectors
+            if 'extinct' in names:
+                counters['extinct'] = counters['n_active'] == 0 and not pending.get(
+                    EventType.INFECTION.name, 0) and not self.seeding_plugins_remain()
+        return counters
+
+    def count_time_series(self):
+        '''Return numbers of active infections, cumulative infections,
+        individuals in quarantine and cumulative removals of each group of
+        the time series.'''
+        population = self.population
+        n_active, n_quarantined = population.count_by_group()
+        return [[
+            n_active[x],
+            population.group_infections[x],
+            n_quarantined[x],
+            population.group_removals[x],
+        ] for x in self.time_series.groups]
+
+    def run(self, until=None):
+        '''Process events until the end of simulation, or until ``until()``
+        returns True after events at a time point are processed, in which case
+        True is returned and the simulation can be continued by calling ``run``
+        again. A replicate that ends before --snapshot-at is saved to the
+        snapshot as ended so that it is continued unchanged.'''
+        snapshot_at = getattr(self.simu_args, 'snapshot_at', None)
+        checkpoint_interval = getattr(self.simu_args, 'checkpoint_interval', None)
+        snapshot_file = getattr(self.simu_args, 'snapshot_file', None)
+        if snapshot_at is not None and self.snapshot_time is not None and self.snapshot_time >= snapshot_at:
+            snapshot_at = None
+        last_checkpoint = wall_time.time()
+        branching_threshold = getattr(self.simu_args, 'branching_threshold', None)
+        stop_time, stop_conditions = parse_stop_if(self.simu_args.stop_if)
+        stop_names = {x.variable for x in stop_conditions}
+
+        population = self.population
+        events = self.events
+        trigger_events = self.trigger_events
+        time_series = self.time_series
+        if self.ended:
+            return False
+        while events:
             # find the latest event
             time = 0.00 if not events else min(events.keys())
 
-            if self.simu_args.stop_if is not None:
-                st = float(self.simu_args.stop_if[0][2:])
-                if time > st:
-                    time = st
-                    break
+            if snapshot_at is not None and time > snapshot_at:
+                self.time = snapshot_at
+                self.save_snapshot(snapshot_file)
+                self.snapshot_time = snapshot_at
+                snapshot_at = None
+
+            if stop_time is not None and time > stop_time:
+                self.time = stop_time
+                break
+
+            if time_series is not None:
+                # time points before the events are in the current state
+                time_series.advance(time, self.count_time_series)
 
             new_events = []
             aborted = False
@@ -139,11 +387,16 @@ class Simulator(object):
                     evt = cur_events.pop(0)
                 except:
                     break
+                if not population.pop_pending(evt):
+                    # cancelled by the removal of its target
+                    continue
                 if evt.action == EventType.ABORT:
                     self.logger.write(
                         f'{time:.2f}\t{EventType.ABORT.name}\t{evt.target}\tpopsize={len(population)}\n'
                     )
                     aborted = True
+                    for x in cur_events:
+                        population.pop_pending(x)
                     break
                 res = evt.apply(population)
                 if evt.action in trigger_events:
@@ -152,6 +405,7 @@ class Simulator(object):
                         res.append(x)
 
                 for x in res:
+                    population.add_pending(x)
                     if x.time == time:
                         if x.priority:
                             cur_events.insert(0, x)
@@ -161,6 +415,7 @@ class Simulator(object):
                         new_events.append(x)
 
             events.pop(time)
+            self.time = time
             # if there is no other events, and all new ones are plugin generated
             # (through --interval, it is time to stop
             all_plugin = not events
@@ -170,26 +425,40 @@ class Simulator(object):
                 if isinstance(evt, Event):
                     all_plugin = False
 
-            if not events or aborted or (all_plugin and
-                                         self.simu_args.stop_if is None):
+            if getattr(population, 'lazy', False) and population.n_infections > branching_threshold * len(population):
+                # creating individuals on demand no longer saves much work
+                population.materialize()
+
+            if stop_conditions and not aborted:
+                counters = self.get_counters(stop_names)
+                if any(x(counters) for x in stop_conditions):
+                    break
+
+            if until is not None and not aborted and until():
+                return True
+
+            if not events or aborted or (all_plugin and stop_time is None):
                 break
             # if self.simu_args.handle_symptomatic and all(
             #         x.infected for x in population.values()):
             #     break
-        remaining_events = defaultdict(int)
-        infected_by = set()
-        for time, events_at_time in events.items():
-            for event in events_at_time:
-                if event.action.name in ('SHOW_SYMPTOM', 'RECOVER', 'REMOVAL') and event.target.id not in population:
-                    continue
-                if event.action.name == 'INFECTION':
-                    if event.kwargs['by'].id in population:
-                        infected_by.add(event.kwargs['by'])
-                    else:
-                        continue
-                remaining_events[event.action.name] += 1
-        if infected_by:
-            remaining_events['INFECTION'] = f"{remaining_events['INFECTION']} (by {len(infected_by)} infectors)"
+            if checkpoint_interval is not None and wall_time.time(
+            ) - last_checkpoint > checkpoint_interval:
+                self.save_snapshot(snapshot_file)
+                last_checkpoint = wall_time.time()
+        self.ended = True
+        if snapshot_at is not None:
+            # the replicate ended before the time of the snapshot
+            self.save_snapshot(snapshot_file)
+        return False
+
+    def end(self, **kwargs):
+        '''Write END record with a summary of remaining events and additional
+        statistics in ``kwargs``.'''
+        population = self.population
+        remaining_events, n_infectors = population.remaining_events()
+        if n_infectors > 0:
+            remaining_events['INFECTION'] = f"{remaining_events['INFECTION']} (by {n_infectors} infectors)"
         remaining_events = ','.join(f'{x}:{y}' for x,y in remaining_events.items())
         res = {
             'popsize': len(population),
@@ -199,9 +468,35 @@ class Simulator(object):
         if remaining_events:
             res['remaining_events'] = remaining_events
         if self.simu_args.stop_if:
-            res['stop_if'] = ''.join(self.simu_args.stop_if)
+            res['stop_if'] = ' '.join(self.simu_args.stop_if)
+        res.update(kwargs)
         params = ','.join([f'{x}={y}' for x, y in res.items()])
 
         self.logger.write(
-            f'{time:.2f}\t{EventType.END.name}\t{len(population)}\t{params}\n'
+            f'{self.time:.2f}\t{EventType.END.name}\t{len(population)}\t{params}\n'
         )
+
+    def simulate(self, id):
+        snapshot = getattr(self.simu_args, 'load_snapshot', None)
+        if snapshot is not None:
+            snapshot = snapshot.format(id=id)
+            if not os.path.isfile(snapshot) and '{id}' in self.simu_args.load_snapshot:
+                # no checkpoint for this replicate
+                snapshot = None
+        if snapshot is None:
+            self.start(id)
+        else:
+            self.load_snapshot(snapshot, id)
+        if getattr(self.simu_args, 'splitting_levels', None):
+            from .splitting import run_with_splitting
+            self.end(n_reached=run_with_splitting(self))
+        else:
+            self.run()
+            self.end()
+        if self.time_series is not None:
+            self.time_series.finish(self.count_time_series)
+        if getattr(self.simu_args, 'checkpoint_interval', None) is not None:
+            # checkpoint of completed replicate is no longer needed
+            checkpoint = self.simu_args.snapshot_file.format(id=id)
+            if os.path.isfile(checkpoint):
+                os.remove(checkpoint)
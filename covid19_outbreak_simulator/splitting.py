@@ -0,0 +1,78 @@
+"""Multilevel splitting for the estimation of probabilities of large outbreaks."""
+import argparse
+import math
+from io import BytesIO, StringIO
+
+from .logindex import open_log
+
+
+def run_with_splitting(simulator):
+    '''Continue the replicate of ``simulator`` to the end. Each time the
+    cumulative number of infections reaches one of ``splitting_levels`` before
+    the last one, ``splitting_factor - 1`` clones are simulated from the state
+    of the replicate without output. Return the number of paths, including the
+    replicate itself, that reach the last level.'''
+    # clones do not save snapshots or checkpoints of the replicate
+    clone_args = argparse.Namespace(**vars(simulator.simu_args))
+    clone_args.snapshot_at = None
+    clone_args.checkpoint_interval = None
+    return _split(simulator, simulator.simu_args.splitting_levels,
+                  simulator.simu_args.splitting_factor, clone_args, True)
+
+
+def _split(simulator, levels, factor, clone_args, complete):
+    from .simulator import Simulator
+
+    if simulator.population.n_infections < levels[0] and not simulator.run(
+            until=lambda: simulator.population.n_infections >= levels[0]):
+        return 0
+    if len(levels) == 1:
+        if complete:
+            # continue the replicate to the end for its output
+            simulator.run()
+        return 1
+
+    state = BytesIO()
+    simulator.dump_state(state)
+    n_reached = _split(simulator, levels[1:], factor, clone_args, complete)
+    for i in range(factor - 1):
+        clone = Simulator(
+            params=simulator.params,
+            logger=StringIO(),
+            simu_args=clone_args,
+            cmd=simulator.cmd)
+        state.seek(0)
+        clone.restore_state(
+            state, simulator.logger.id, write_log=False, restore_rng=False)
+        n_reached += _split(clone, levels[1:], factor, clone_args, False)
+    return n_reached
+
+
+def splitting_estimate(logfile, levels, factor):
+    '''Return the estimated probability of reaching ``levels[-1]`` infections,
+    its standard error, and the number of replicates from ``n_reached`` of the
+    END records in ``logfile``. Each replicate contributes
+    n_reached / factor^(len(levels) - 1), which is an unbiased estimate of the
+    probability, so the estimates of independent replicates are averaged.'''
+    weight = factor**(len(levels) - 1)
+    estimates = []
+    with open_log(logfile) as log:
+        for line in log:
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) != 5 or fields[2] != 'END':
+                continue
+            params = dict(
+                x.split('=', 1) for x in fields[4].split(',') if '=' in x)
+            if 'n_reached' not in params:
+                raise ValueError(
+                    f'END record of replicate {fields[0]} does not contain n_reached: {line.strip()}'
+                )
+            estimates.append(int(params['n_reached']) / weight)
+    if not estimates:
+        raise ValueError(f'No END record is found in {logfile}')
+    N = len(estimates)
+    p = sum(estimates) / N
+    if N == 1:
+        return p, float('nan'), N
+    var = sum((x - p)**2 for x in estimates) / (N - 1)
+    return p, math.sqrt(var / N), N
@@ -0,0 +1,431 @@
+"""Summary statistics of replicates from logfiles of the simulator."""
+import mmap
+import multiprocessing
+import os
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+from .logindex import LogIndex, compression, decompress
+
+# logfiles are split at boundaries of replicates into chunks of about this
+# many bytes, which are parsed in parallel
+CHUNK_SIZE = 32 * 1024 * 1024
+
+# events that are counted for each replicate
+COUNTED_EVENTS = ('INFECTION', 'INFECTION_FAILED', 'INFECTION_AVOIDED',
+                  'INFECTION_IGNORED', 'SHOW_SYMPTOM', 'REMOVAL', 'QUARANTINE',
+                  'REINTEGRATION', 'ABORT')
+
+# statistics of each replicate, with times of the first events or nan if
+# the events did not happen
+REPLICATE_DTYPE = np.dtype([('id', np.int64), ('time', float),
+                            ('popsize', np.int64)] +
+                           [(f'n_{x.lower()}', np.int64) for x in COUNTED_EVENTS] +
+                           [('n_asym_infection', np.int64),
+                            ('n_presym_infection', np.int64),
+                            ('n_sym_infection', np.int64),
+                            ('n_infected_by_seed', np.int64),
+                            ('first_infected_by_seed', float),
+                            ('seed_show_symptom', float),
+                            ('first_infection', float),
+                            ('first_symptom', float),
+                            ('second_symptom', float),
+                            ('third_symptom', float)])
+
+
+def _column(arr, begin, end):
+    '''Return bytes of ``arr`` from ``begin`` to ``end`` of each row as an
+    array of byte strings.'''
+    width = max(1, int((end - begin).max())) if len(begin) else 1
+    idx = begin[:, None] + np.arange(width)
+    outside = idx >= end[:, None]
+    np.minimum(idx, len(arr) - 1, out=idx)
+    values = arr[idx]
+    values[outside] = 0
+    return values.view(f'S{width}').ravel()
+
+
+class _Params(object):
+    '''Values of keys in the params columns from ``begin`` to ``end`` of
+    records, which are sorted by position.'''
+
+    def __init__(self, arr, commas, begin, end):
+        self.arr = arr
+        self.commas = commas
+        self.begin = begin
+        self.end = end
+        # keys start at the beginning of params and after commas
+        first = np.searchsorted(commas, begin)
+        count = np.searchsorted(commas, end) - first
+        row = np.repeat(np.arange(len(begin)), count)
+        idx = np.arange(len(row)) - np.repeat(np.cumsum(count) - count, count)
+        self.key_pos = np.concatenate([begin, commas[first[row] + idx] + 1])
+        self.key_row = np.concatenate([np.arange(len(begin)), row])
+
+    def values(self, key):
+        '''Return values of ``key`` as byte strings, which are empty if the
+        key does not exist.'''
+        match = np.flatnonzero(
+            self.key_pos + len(key) <= self.end[self.key_row])
+        for i, c in enumerate(key):
+            match = match[self.arr[self.key_pos[match] + i] == c]
+        vbegin = self.end.copy()
+        vbegin[self.key_row[match]] = self.key_pos[match] + len(key)
+        vend = np.minimum(self.commas[np.searchsorted(self.commas, vbegin)],
+                          self.end)
+        return _column(self.arr, vbegin, vend)
+
+
+def _as_float(values, default=np.nan):
+    res = np.full(len(values), default, dtype=float)
+    exist = values != b''
+    res[exist] = values[exist].astype(float)
+    return res
+
+
+def _select(arr, begin, length, value):
+    '''Return indexes of fields starting at ``begin`` with ``length`` that
+    equal to ``value``.'''
+    sel = np.flatnonzero(length == len(value))
+    for i, c in enumerate(value):
+        sel = sel[arr[begin[sel] + i] == c]
+    return sel
+
+
+def _group_min(groups, values, size):
+    res = np.full(size, np.inf)
+    np.minimum.at(res, groups, values)
+    res[np.isinf(res)] = np.nan
+    return res
+
+
+def _tokenize(data):
+    '''Return bytes of ``data`` as an array, and start and end positions of
+    the five fields of its records as arrays of shape (5, n).'''
+    arr = np.frombuffer(data, dtype=np.uint8)
+    eol = np.flatnonzero(arr == ord('\n'))
+    tabs = np.flatnonzero(arr == ord('\t'))
+    begin = np.concatenate([[0], eol[:-1] + 1]).astype(
+        eol.dtype) if len(eol) else eol
+    if len(tabs) != 4 * len(eol) or (len(eol) and (
+            np.any(tabs[3::4] > eol) or np.any(tabs[4::4] < eol[:-1]))):
+        raise ValueError('Records with other than five tab-separated fields')
+    tabs = tabs.reshape(-1, 4)
+    # skip headers, which can appear in logfiles of resumed simulations
+    records = arr[begin] != ord('i')
+    starts = np.vstack([begin, tabs.T + 1])[:, records]
+    ends = np.vstack([tabs.T, eol])[:, records]
+    return arr, starts, ends
+
+
+def _replicates(rep_ids):
+    '''Return IDs of replicates and the index of the replicate of each
+    record.'''
+    if not len(rep_ids):
+        return rep_ids, rep_ids
+    # records of a replicate are written together
+    first = np.concatenate([[True], rep_ids[1:] != rep_ids[:-1]])
+    ids = rep_ids[first]
+    if len(np.unique(ids)) == len(ids):
+        return ids, np.cumsum(first) - 1
+    return np.unique(rep_ids, return_inverse=True)
+
+
+def _summarize_chunk(task):
+    '''Return statistics of replicates and reported statistics of plugins as
+    a dictionary of ``(stat, time): [(id, value), ...]`` from bytes
+    ``start`` to ``end`` of ``logfile``.'''
+    logfile, start, end = task
+    with open(logfile, 'rb') as log, mmap.mmap(
+            log.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+    if compression(logfile) is not None:
+        data = decompress(logfile, data)
+    if not data.endswith(b'\n'):
+        data += b'\n'
+    arr, starts, ends = _tokenize(data)
+    commas = np.concatenate([np.flatnonzero(arr == ord(',')), [len(arr)]])
+    ev_length = ends[2] - starts[2]
+
+    ids, rep = _replicates(
+        _column(arr, starts[0], ends[0]).astype(np.int64))
+
+    res = np.zeros(len(ids), dtype=REPLICATE_DTYPE)
+    res['id'] = ids
+    res['popsize'] = -1
+    for field in ('time', 'first_infected_by_seed', 'seed_show_symptom',
+                  'first_infection', 'first_symptom', 'second_symptom',
+                  'third_symptom'):
+        res[field] = np.nan
+
+    selected = {
+        x: _select(arr, starts[2], ev_length, x.encode())
+        for x in COUNTED_EVENTS + ('END', 'PLUGIN')
+    }
+
+    def records(name):
+        sel = selected[name]
+        return (sel, rep[sel],
+                _column(arr, starts[1, sel], ends[1, sel]).astype(float),
+                _column(arr, starts[3, sel], ends[3, sel]))
+
+    sel, end_rep, end_time, popsize = records('END')
+    res['time'][end_rep] = end_time
+    res['popsize'][end_rep] = popsize.astype(np.int64)
+
+    for name in COUNTED_EVENTS:
+        sel = selected[name]
+        if name == 'INFECTION_AVOIDED':
+            # infections avoided by a carrier are recorded once
+            weights = _as_float(
+                _Params(arr, commas, starts[4, sel],
+                        ends[4, sel]).values(b'n_avoided='),
+                default=1)
+        else:
+            weights = None
+        res[f'n_{name.lower()}'] = np.bincount(
+            rep[sel], weights=weights, minlength=len(ids))
+
+    # INFECTION records of infectees, with infectors in "by"
+    inf, inf_rep, inf_time, infectee = records('INFECTION')
+    symp, symp_rep, symp_time, symptomatic = records('SHOW_SYMPTOM')
+    params = _Params(arr, commas, starts[4, inf], ends[4, inf])
+    by = params.values(b'by=')
+    seed = by == b'.'
+    # individuals are identified by replicate and code of ID
+    names = np.concatenate([infectee, by, symptomatic])
+    if names.dtype.itemsize <= 8:
+        # short IDs are sorted faster as integers
+        names = names.astype('S8').view(np.uint64)
+    names, codes = np.unique(names, return_inverse=True)
+    codes = codes + len(names) * np.concatenate([inf_rep, inf_rep, symp_rep])
+    infector = codes[len(inf):2 * len(inf)]
+    symp_ind = codes[2 * len(inf):]
+    infectee = codes[:len(inf)]
+
+    # the latest infection of the infector before the infection
+    cents = np.round((inf_time - inf_time.min()) * 100).astype(
+        np.int64) if len(inf) else np.zeros(0, dtype=np.int64)
+    scale = int(cents.max()) + 1 if len(inf) else 1
+    order = np.argsort(infectee * scale + cents, kind='stable')
+    idx = np.searchsorted((infectee * scale + cents)[order],
+                          infector * scale + cents,
+                          side='right') - 1
+    source = order[np.maximum(idx, 0)]
+    known = ~seed & (idx >= 0) & (infectee[source] == infector)
+
+    asym = params.values(b'r_asym=') != b''
+    symp_at = inf_time - _as_float(params.values(b'leadtime='),
+                                   default=0) + _as_float(
+                                       params.values(b'incu='))
+    by_asym = known & asym[source]
+    by_presym = known & ~asym[source] & (inf_time < symp_at[source])
+    by_sym = known & ~asym[source] & (inf_time >= symp_at[source])
+    for field, sel in (('n_asym_infection', by_asym),
+                       ('n_presym_infection', by_presym),
+                       ('n_sym_infection', by_sym)):
+        res[field] = np.bincount(inf_rep[sel], minlength=len(ids))
+
+    by_seed = ~seed & np.isin(infector, infectee[seed])
+    res['n_infected_by_seed'] = np.bincount(
+        inf_rep[by_seed], minlength=len(ids))
+    res['first_infected_by_seed'] = _group_min(inf_rep[by_seed],
+                                               inf_time[by_seed], len(ids))
+    res['first_infection'] = _group_min(inf_rep[~seed], inf_time[~seed],
+                                        len(ids))
+
+    seed_symp = np.isin(symp_ind, infectee[seed])
+    res['seed_show_symptom'] = _group_min(symp_rep[seed_symp],
+                                          symp_time[seed_symp], len(ids))
+    # rank of symptomatic cases in each replicate
+    order = np.lexsort((symp_time, symp_rep))
+    ranks = np.arange(len(symp)) - np.searchsorted(symp_rep[order],
+                                                   symp_rep[order])
+    for rank, field in enumerate(
+        ('first_symptom', 'second_symptom', 'third_symptom')):
+        sel = order[ranks == rank]
+        res[field][symp_rep[sel]] = symp_time[sel]
+
+    # statistics reported by plugins, prefixed by plugin name except for stat
+    plugin_stats = defaultdict(list)
+    plugin = selected['PLUGIN']
+    for id, t, params in zip(
+            ids[rep[plugin]], _column(arr, starts[1, plugin],
+                                      ends[1, plugin]),
+            _column(arr, starts[4, plugin], ends[4, plugin])):
+        params = dict(
+            x.split('=', 1) for x in params.decode().split(',') if '=' in x)
+        name = params.pop('name', '')
+        prefix = '' if name in ('', 'stat') else f'{name}_'
+        for key, value in params.items():
+            plugin_stats[(prefix + key, t.decode())].append((id, value))
+    return res, plugin_stats
+
+
+def split_logfile(logfile, chunk_size=CHUNK_SIZE):
+    '''Return ``(start, end)`` of chunks of about ``chunk_size`` bytes of
+    ``logfile`` that do not split records of a replicate. Compressed logfiles
+    are split at boundaries of compressed blocks.'''
+    if os.path.getsize(logfile) == 0:
+        return []
+    if compression(logfile) is not None:
+        index = LogIndex.load(logfile)
+        bounds = [0]
+        for block in np.unique(index.entries['block']).tolist():
+            if block - bounds[-1] >= chunk_size:
+                bounds.append(block)
+        bounds.append(index.end)
+        return list(zip(bounds[:-1], bounds[1:]))
+    with open(logfile, 'rb') as log, mmap.mmap(
+            log.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        bounds = [0]
+        while bounds[-1] + chunk_size < size:
+            pos = mm.find(b'\n', bounds[-1] + chunk_size) + 1
+            if pos == 0:
+                break
+            last = mm.rfind(b'\n', 0, pos - 1) + 1
+            rep = mm[last:mm.find(b'\t', last) + 1]
+            # move to the first record of the next replicate
+            while pos < size and mm[pos:pos + len(rep)] == rep:
+                pos = mm.find(b'\n', pos) + 1
+                if pos == 0:
+                    pos = size
+            if pos >= size:
+                break
+            bounds.append(pos)
+        bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _day(times):
+    # days < 1 are rounded to 1
+    return np.maximum(1, np.ceil(times)).astype(int)
+
+
+def _count_values(summary, name, values):
+    for value, count in zip(*np.unique(values, return_counts=True)):
+        summary[f'{name}_{value}'] = int(count)
+
+
+def summarize_replicates(replicates, plugin_stats, logfile=None):
+    '''Return a dictionary of summary statistics from statistics of
+    replicates and statistics reported by plugins.'''
+    summary = {}
+    if logfile is not None:
+        summary['logfile'] = logfile
+    ended = ~np.isnan(replicates['time'])
+    summary['n_simulation'] = int(ended.sum())
+    for name in COUNTED_EVENTS:
+        summary[f'total_{name.lower()}'] = int(
+            replicates[f'n_{name.lower()}'].sum())
+    for name in ('asym', 'presym', 'sym'):
+        summary[f'total_{name}_infection'] = int(
+            replicates[f'n_{name}_infection'].sum())
+
+    _count_values(summary, 'n_remaining_popsize',
+                  replicates['popsize'][ended])
+
+    first_symptom = replicates['first_symptom']
+    outbreak = ~np.isnan(first_symptom)
+    summary['n_no_outbreak'] = int((~outbreak).sum())
+    _count_values(summary, 'n_outbreak_duration',
+                  _day(replicates['time'][outbreak & ended]))
+
+    n_by_seed = replicates['n_infected_by_seed']
+    summary['n_no_infected_by_seed'] = int((n_by_seed == 0).sum())
+    _count_values(summary, 'n_num_infected_by_seed', n_by_seed[n_by_seed > 0])
+    first_by_seed = replicates['first_infected_by_seed']
+    _count_values(summary, 'n_first_infected_by_seed_on_day',
+                  _day(first_by_seed[~np.isnan(first_by_seed)]))
+
+    seed_symptom = replicates['seed_show_symptom']
+    summary['n_seed_show_no_symptom'] = int(np.isnan(seed_symptom).sum())
+    _count_values(summary, 'n_seed_show_symptom_on_day',
+                  _day(seed_symptom[~np.isnan(seed_symptom)]))
+
+    first_infection = replicates['first_infection']
+    summary['n_no_first_infection'] = int(np.isnan(first_infection).sum())
+    _count_values(summary, 'n_first_infection_on_day',
+                  _day(first_infection[~np.isnan(first_infection)]))
+
+    # days of the second and third symptoms are counted from the previous one
+    previous = np.zeros(len(replicates))
+    for name in ('first', 'second', 'third'):
+        times = replicates[f'{name}_symptom']
+        sel = ~np.isnan(times)
+        summary[f'n_{name}_symptom'] = int(sel.sum())
+        _count_values(summary, f'n_{name}_symptom_on_day',
+                      _day(times[sel] - previous[sel]))
+        previous = times
+
+    # values of all replicates and averages over replicates with the
+    # statistics and over all replicates
+    for key, time in sorted(
+            plugin_stats.keys(), key=lambda x: (x[0], float(x[1]))):
+        values = plugin_stats[(key, time)]
+        summary[f'{key}_{time}'] = ', '.join(f'{x}:{y}' for x, y in values)
+        try:
+            total = sum(float(y) for x, y in values)
+        except ValueError:
+            continue
+        summary[f'avg_{key}_{time}'] = (
+            f'{total / len(values):.4f}, '
+            f'{total / max(1, summary["n_simulation"]):.4f}')
+    return summary
+
+
+def write_replicates(replicates, filename):
+    '''Write statistics of replicates to tab-separated ``filename``, with NA
+    for events that did not happen.'''
+    with open(filename, 'w') as out:
+        out.write('\t'.join(REPLICATE_DTYPE.names) + '\n')
+        for rec in replicates:
+            out.write('\t'.join(
+                ('NA' if np.isnan(x) else f'{x:.2f}') if isinstance(
+                    x, np.floating) else str(x) for x in rec) + '\n')
+
+
+def summarize_simulations(logfile,
+                          summary_report=None,
+                          replicate_report=None,
+                          jobs=None,
+                          chunk_size=CHUNK_SIZE):
+    '''Summarize replicates in ``logfile`` and write the summary to
+    ``summary_report`` (standard output if unspecified) and statistics of
+    replicates to ``replicate_report``, if specified. The logfile is split
+    into chunks at boundaries of replicates, which are parsed by ``jobs``
+    processes. Return the summary as a dictionary and statistics of replicates
+    as a structured array.'''
+    chunks = [(logfile, x, y) for x, y in split_logfile(logfile, chunk_size)]
+    if not jobs:
+        jobs = multiprocessing.cpu_count()
+    if len(chunks) > 1 and jobs > 1:
+        with multiprocessing.Pool(min(jobs, len(chunks))) as pool:
+            results = pool.map(_summarize_chunk, chunks)
+    else:
+        results = [_summarize_chunk(x) for x in chunks]
+
+    replicates = np.concatenate([x[0] for x in results]) if results else np.zeros(
+        0, dtype=REPLICATE_DTYPE)
+    replicates = replicates[np.argsort(replicates['id'], kind='stable')]
+    plugin_stats = defaultdict(list)
+    for _, stats in results:
+        for key, values in stats.items():
+            plugin_stats[key].extend(values)
+    for values in plugin_stats.values():
+        values.sort(key=lambda x: x[0])
+
+    summary = summarize_replicates(replicates, plugin_stats, logfile)
+    if summary_report is None:
+        for key, value in summary.items():
+            sys.stdout.write(f'{key}\t{value}\n')
+    else:
+        with open(summary_report, 'w') as out:
+            for key, value in summary.items():
+                out.write(f'{key}\t{value}\n')
+    if replicate_report is not None:
+        write_replicates(replicates, replicate_report)
+    return summary, replicates
@@ -0,0 +1,702 @@
+"""Time-stepped simulation of large populations with tau-leaping."""
+import subprocess
+from datetime import datetime
+
+import numpy as np
+
+from .event import EventType
+from .model import Model
+from .population import parse_vicinity
+from .simulator import load_plugins
+from .timeseries import TimeSeries
+from .utils import (as_float, parse_handle_symptomatic_options,
+                    parse_param_with_multiplier, parse_stop_if)
+
+# plugins that are simulated by the tau-leaping engine itself
+SUPPORTED_PLUGINS = ('stat', 'init', 'community_infection', 'vaccinate')
+
+
+class TauLeapingSimulator(object):
+    '''Simulator that advances the population in steps of ``--interval`` days.
+
+    Individuals are stored as arrays. In each step, the transmission
+    probabilities of each infector over the step are summed from the
+    transmissibility curves of the model, the number of infection attempts is
+    drawn from a Poisson distribution, and the attempts are distributed to
+    target groups according to ``--vicinity`` and to random individuals that
+    are not removed or quarantined. Only START, END and records of plugins
+    stat, init, community_infection and vaccinate are written.'''
+
+    def __init__(self, params, logger, simu_args, cmd):
+        self.logger = logger
+        self.simu_args = simu_args
+        self.params = params
+        self.model = None
+        self.cmd = cmd
+        self.time_series = None
+
+    def start(self, id):
+        '''Create population and initial infections of replicate ``id``.'''
+        self.model = Model(self.params)
+        self.model.draw_prop_asym_carriers()
+        self.logger.id = id
+        self.time = 0.00
+
+        self.group_names = []
+        sizes = []
+        for ps in self.simu_args.popsize:
+            name, sz = ps.split('=', 1) if '=' in ps else ('', ps)
+            try:
+                sizes.append(int(sz))
+            except Exception as e:
+                raise ValueError(
+                    f'Named population size should be name=int: {ps} provided'
+                ) from e
+            self.group_names.append(name)
+        self.group_total = np.array(sizes, dtype=int)
+        self.group_start = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(int)
+        self.n_present = self.group_total.copy()
+        N = int(self.group_total.sum())
+
+        self.group_of = np.repeat(np.arange(len(sizes)), sizes)
+        # index of groups in params.group_params
+        self.group_index = np.array([
+            self.params.group_params.index.get(x, 0) for x in self.group_names
+        ])
+        self.susceptibility = self.params.group_params.susceptibility[
+            self.group_index]
+        self.vicinity = parse_vicinity(self.simu_args.vicinity,
+                                       self.group_names)
+
+        self.removed = np.zeros(N, dtype=bool)
+        self.vaccinated = np.zeros(N, dtype=bool)
+        self.infected = np.full(N, np.nan)
+        self.recovered = np.full(N, np.nan)
+        self.immunity = np.zeros((N, 2))
+        self.infectivity = np.ones((N, 2))
+        # quarantined from q_from till q_till
+        self.q_from = np.full(N, np.inf)
+        self.q_till = np.full(N, -np.inf)
+        self.q_idx = np.zeros(0, dtype=int)
+
+        self.handle_symptomatic = {}
+        for name in self.group_names:
+            for vaccinated in (True, False):
+                hs = parse_handle_symptomatic_options(
+                    self.simu_args.handle_symptomatic, name, vaccinated)
+                if hs['reaction'] not in ('remove', 'keep', 'quarantine'):
+                    raise ValueError(
+                        f'--handle-symptomatic {hs["reaction"]} is not supported by the tau-leaping engine.'
+                    )
+                if hs.get('tracing', None) is not None:
+                    raise ValueError(
+                        'Contact tracing is not supported by the tau-leaping engine.'
+                    )
+                self.handle_symptomatic[(name, vaccinated)] = hs
+
+        # transmissibility curves of active infections are stored as
+        # cumulative sums in a flat buffer
+        self.curves = np.zeros(1024)
+        self.curves_used = 0
+        self.active = {
+            x: np.zeros(0, dtype=int if x in ('ind', 'offset', 'length', 'next') else float)
+            for x in ('ind', 'tinf', 'offset', 'length', 'next', 'spacing',
+                      'recover', 'removal')
+        }
+        self.n_infections = 0
+        if getattr(self.simu_args, 'time_series', None):
+            self.time_series = TimeSeries(self.group_names,
+                                          self.simu_args.time_series_interval,
+                                          self.simu_args.time_series_end)
+
+        # pending plugin calls as [time, before_core, plugin, args]
+        self.plugin_calls = []
+        # plugins that seed infections, which prevent --stop-if extinct
+        self.seeding_plugins = set()
+        if self.simu_args.plugin:
+            for plugin, args in load_plugins(self.simu_args.plugin, simulator=self):
+                if str(plugin) not in SUPPORTED_PLUGINS:
+                    raise ValueError(
+                        f'Plugin {plugin} is not supported by the tau-leaping engine.'
+                    )
+                if args.trigger_by or getattr(args, 'target', None):
+                    raise ValueError(
+                        'Options --trigger-by and --target of plugins are not supported by the tau-leaping engine.'
+                    )
+                if plugin.seeds_infections:
+                    self.seeding_plugins.add(str(plugin))
+                for evt in plugin.get_plugin_events(args):
+                    self.plugin_calls.append(
+                        [evt.time, evt.priority, str(plugin), args])
+
+        start_params = {
+            'id': self.logger.id,
+            'time': datetime.now().strftime("%m/%d/%Y-%H:%M:%S")
+        }
+        if self.simu_args.verbosity > 1:
+            start_params['args'] = subprocess.list2cmdline(self.cmd)
+        start_params = ','.join([f'{x}={y}' for x, y in start_params.items()])
+
+        self.logger.write(
+            f'0.00\t{EventType.START.name}\t.\t{start_params}\n')
+
+        infectors = [] if self.simu_args.infectors is None else self.simu_args.infectors
+        targets = []
+        for infector in infectors:
+            idx = self.index_of(infector)
+            if idx is None:
+                raise ValueError(f'Invalid ID for carrier {infector}')
+            targets.append(idx)
+        if targets:
+            self.infect(
+                np.array(targets), 0.0, leadtime=self.simu_args.leadtime)
+
+    def id_of(self, idx):
+        grp = self.group_of[idx]
+        name = self.group_names[grp]
+        k = idx - self.group_start[grp]
+        return f'{name}_{k}' if name else str(k)
+
+    def index_of(self, ID):
+        '''Return index of individual ``ID``, or None if it does not exist.'''
+        name, k = ID.rsplit('_', 1) if '_' in ID else ('', ID)
+        if name not in self.group_names or not k.isdigit():
+            return None
+        grp = self.group_names.index(name)
+        if int(k) >= self.group_total[grp]:
+            return None
+        idx = self.group_start[grp] + int(k)
+        return None if self.removed[idx] else idx
+
+    def is_quarantined(self, idx, time):
+        return (self.q_from[idx] <= time) & (time < self.q_till[idx])
+
+    def add_curves(self, curves):
+        '''Append cumulative transmission probabilities to the buffer and
+        return their offsets.'''
+        size = sum(len(x) for x in curves)
+        if self.curves_used + size > len(self.curves):
+            # copy curves of active infections to a new buffer
+            live = int((self.active['length'] + 1).sum())
+            buf = np.zeros(max(1024, 2 * (live + size)))
+            offset = 0
+            new_offsets = np.zeros(len(self.active['ind']), dtype=int)
+            for i, (off, length) in enumerate(
+                    zip(self.active['offset'], self.active['length'])):
+                buf[offset:offset + length + 1] = self.curves[off:off + length + 1]
+                new_offsets[i] = offset
+                offset += length + 1
+            self.active['offset'] = new_offsets
+            self.curves = buf
+            self.curves_used = offset
+        offsets = []
+        for curve in curves:
+            self.curves[self.curves_used:self.curves_used + len(curve)] = curve
+            offsets.append(self.curves_used)
+            self.curves_used += len(curve)
+        return offsets
+
+    def infect(self, targets, time, counts=None, leadtime=None):
+        '''Infect ``targets`` by ``counts`` infection attempts at ``time``,
+        which can be an array of times of each target.'''
+        if counts is None:
+            counts = np.ones(len(targets), dtype=int)
+        time = np.broadcast_to(np.asarray(time, dtype=float), targets.shape)
+        # individuals during infection are not infected again
+        keep = ~self.removed[targets] & ~(~np.isnan(self.infected[targets]) &
+                                          np.isnan(self.recovered[targets]))
+        targets, counts, time = targets[keep], counts[keep], time[keep]
+
+        s = np.minimum(1, self.susceptibility[self.group_of[targets]])
+        pa = self.model.params.prop_asym_carriers
+        q_asym = s * pa * (1 - self.immunity[targets, 1])
+        q_sym = s * (1 - pa) * (1 - self.immunity[targets, 0])
+        q = q_asym + q_sym
+        success = np.random.uniform(0, 1, len(targets)) < 1 - (1 - q)**counts
+        targets, time, q, q_asym = targets[success], time[success], q[
+            success], q_asym[success]
+        asymptomatic = np.random.uniform(0, 1, len(targets)) * q < q_asym
+        if not len(targets):
+            return
+
+        new = {x: [] for x in self.active}
+        curves = []
+        quarantined = []
+        for symptomatic in (True, False):
+            sel = asymptomatic != symptomatic
+            if sel.any():
+                self._infect_cases(targets[sel], time[sel], symptomatic,
+                                   leadtime, new, curves, quarantined)
+        self.q_idx = np.concatenate(
+            [self.q_idx, np.array(quarantined, dtype=int)])
+
+        offsets = self.add_curves(curves)
+        new['offset'] = offsets
+        for key in self.active:
+            self.active[key] = np.concatenate(
+                [self.active[key],
+                 np.array(new[key], dtype=self.active[key].dtype)])
+        self.n_infections += len(targets)
+
+    def _infect_cases(self, targets, time, symptomatic, leadtime, new, curves,
+                      quarantined):
+        n = len(targets)
+        group = self.group_index[self.group_of[targets]]
+        if symptomatic:
+            r0 = self.model.draw_random_r0(symptomatic=True, size=n)
+            incu = self.model.draw_random_incubation_period(group=group, size=n)
+            r0 = r0 * self.infectivity[targets, 0] * self.params.group_params.lookup(
+                'symptomatic_r0_multiplier', group)
+        else:
+            r0 = self.model.draw_random_r0(symptomatic=False, size=n)
+            incu = np.full(n, -1.0)
+            r0 = r0 * self.infectivity[targets, 1] * self.params.group_params.lookup(
+                'asymptomatic_r0_multiplier', group)
+        duration = self.model.draw_infection_params(
+            symptomatic=symptomatic, size=n)['duration']
+
+        for ind, t, r, ip, dur in zip(targets, time, r0, incu, duration):
+            vaccinated = bool(self.vaccinated[ind])
+            if symptomatic:
+                x, y = self.model.get_symptomatic_transmission_probability(
+                    ip, r, {'duration': dur, 'vaccinated': vaccinated})
+            else:
+                x, y = self.model.get_asymptomatic_transmission_probability(
+                    r, {'duration': dur, 'vaccinated': vaccinated})
+            end = x[-1] if len(x) else 0.0
+
+            if leadtime is None:
+                lead = 0.0
+            elif leadtime == 'any' or (leadtime == 'asymptomatic' and
+                                       not symptomatic):
+                lead = np.random.uniform(0, end)
+            elif leadtime == 'asymptomatic':
+                lead = np.random.uniform(0, ip)
+            else:
+                lead = min(
+                    as_float(
+                        leadtime,
+                        '--leadtime can only be any, asymptomatic, or a fixed number'
+                    ), end)
+            tinf = t - lead
+
+            self.infected[ind] = tinf
+            self.recovered[ind] = np.nan
+            removal = np.inf
+            if symptomatic:
+                symp_time = tinf + ip
+                hs = self.handle_symptomatic[(
+                    self.group_names[self.group_of[ind]], vaccinated)]
+                proportion = hs.get('proportion', 1)
+                if hs['reaction'] == 'quarantine':
+                    if proportion == 1 or np.random.uniform(0, 1) <= proportion:
+                        self.q_from[ind] = max(symp_time, t)
+                        self.q_till[ind] = symp_time + hs.get('duration', 14)
+                        quarantined.append(ind)
+                elif symp_time >= t and (
+                    (hs['reaction'] == 'keep' and
+                     np.random.uniform(0, 1) > proportion) or
+                    (hs['reaction'] == 'remove' and
+                     (proportion == 1 or np.random.uniform(0, 1) <= proportion))):
+                    removal = symp_time
+
+            new['ind'].append(ind)
+            new['tinf'].append(tinf)
+            new['length'].append(len(y))
+            new['spacing'].append(x[1] - x[0] if len(x) > 1 else 1.0)
+            # grid points before lead time are ignored
+            new['next'].append(int(np.searchsorted(x, lead)))
+            new['recover'].append(tinf + end)
+            new['removal'].append(removal)
+            curves.append(np.concatenate([[0.0], np.cumsum(y)]))
+
+    def _grid_index(self, time):
+        '''Number of grid points of active infections before ``time``.'''
+        act = self.active
+        idx = np.ceil((time - act['tinf']) / act['spacing'])
+        return np.clip(idx, 0, act['length']).astype(int)
+
+    def eligible_counts(self, time):
+        '''Number of individuals in each group that are not removed or
+        quarantined at ``time``.'''
+        self.q_idx = self.q_idx[self.q_till[self.q_idx] > time]
+        quarantined = self.q_idx[self.is_quarantined(self.q_idx, time) &
+                                 ~self.removed[self.q_idx]]
+        return self.n_present - np.bincount(
+            self.group_of[quarantined], minlength=len(self.group_names))
+
+    def select(self, grp, size, time, n_eligible):
+        '''Select ``size`` random eligible individuals from group ``grp``.'''
+        start, total = self.group_start[grp], self.group_total[grp]
+        if n_eligible < 0.1 * total:
+            idx = start + np.flatnonzero(
+                ~self.removed[start:start + total] &
+                ~self.is_quarantined(np.arange(start, start + total), time))
+            return np.random.choice(idx, size)
+        # rejection sampling
+        res = np.zeros(0, dtype=int)
+        while len(res) < size:
+            cand = start + np.random.randint(0, total, 2 * (size - len(res)))
+            cand = cand[~self.removed[cand] & ~self.is_quarantined(cand, time)]
+            res = np.concatenate([res, cand[:size - len(res)]])
+        return res
+
+    def transmit(self, time, next_time):
+        '''Simulate infections by active infections from ``time`` to
+        ``next_time``.'''
+        act = self.active
+        if not len(act['ind']):
+            return
+        lo = act['next']
+        hi = np.minimum(
+            self._grid_index(next_time), self._grid_index(act['removal']))
+        hi = np.maximum(hi, lo)
+        pressure = self.curves[act['offset'] + hi] - self.curves[act['offset'] + lo]
+        # no infection during quarantine
+        q_lo = np.maximum(lo, self._grid_index(self.q_from[act['ind']]))
+        q_hi = np.minimum(hi, self._grid_index(self.q_till[act['ind']]))
+        blocked = q_hi > q_lo
+        pressure[blocked] -= self.curves[act['offset'][blocked] + q_hi[blocked]] - \
+            self.curves[act['offset'][blocked] + q_lo[blocked]]
+        act['next'] = hi
+
+        n_attempts = np.random.poisson(np.maximum(pressure, 0))
+        if not n_attempts.sum():
+            return
+        by_group = np.bincount(
+            self.group_of[act['ind']],
+            weights=n_attempts,
+            minlength=len(self.group_names)).astype(int)
+        n_eligible = self.eligible_counts(time)
+
+        n_to_group = np.zeros(len(self.group_names), dtype=int)
+        for grp, n in enumerate(by_group):
+            if n == 0:
+                continue
+            if self.group_names[grp] in self.vicinity:
+                freq = self.vicinity[self.group_names[grp]]
+                weights = np.array([
+                    freq.get(x, self.n_present[i])
+                    for i, x in enumerate(self.group_names)
+                ], dtype=float)
+            else:
+                weights = n_eligible.astype(float)
+            if weights.sum() == 0:
+                continue
+            n_to_group += np.random.multinomial(n, weights / weights.sum())
+
+        targets = []
+        for grp, n in enumerate(n_to_group):
+            if n > 0 and n_eligible[grp] > 0:
+                targets.append(self.select(grp, n, time, n_eligible[grp]))
+        if not targets:
+            return
+        targets = np.concatenate(targets)
+        times = time + np.random.uniform(0, next_time - time, len(targets))
+        # an individual infected by multiple attempts is infected at the first one
+        targets, inverse, counts = np.unique(
+            targets, return_inverse=True, return_counts=True)
+        first_time = np.full(len(targets), np.inf)
+        np.minimum.at(first_time, inverse, times)
+        self.infect(targets, first_time, counts=counts)
+
+    def progress(self, next_time):
+        '''Remove or recover active infections before ``next_time``.'''
+        act = self.active
+        removed = act['removal'] < next_time
+        recovered = ~removed & (act['recover'] < next_time)
+        if removed.any():
+            ind = act['ind'][removed]
+            self.removed[ind] = True
+            self.n_present -= np.bincount(
+                self.group_of[ind], minlength=len(self.group_names))
+            self.time = max(self.time, act['removal'][removed].max())
+        if recovered.any():
+            ind = act['ind'][recovered]
+            self.recovered[ind] = act['recover'][recovered]
+            self.immunity[ind] = self.params.immunity_of_recovered
+            self.infectivity[ind] = self.params.infectivity_of_recovered
+            self.time = max(self.time, act['recover'][recovered].max())
+        done = removed | recovered
+        if done.any():
+            for key in act:
+                act[key] = act[key][~done]
+
+    def apply_plugins(self, next_time, before_core):
+        calls = sorted(
+            [x for x in self.plugin_calls if x[0] < next_time and x[1] == before_core],
+            key=lambda x: x[0])
+        while calls:
+            call = calls.pop(0)
+            self.plugin_calls.remove(call)
+            time, _, name, args = call
+            getattr(self, f'apply_{name}')(time, args)
+            self.time = max(self.time, time)
+            # schedule the next call
+            if args.interval is not None and (args.end is None or
+                                              time + args.interval <= args.end):
+                call = [time + args.interval, False, name, args]
+                self.plugin_calls.append(call)
+                if call[0] < next_time and not before_core:
+                    calls.append(call)
+
+    def get_counters(self, names, time):
+        '''Return values of counters ``names`` used by conditions of --stop-if.
+        All active infections are counted as infectors.'''
+        counters = {
+            'n_popsize': int(self.n_present.sum()),
+            'n_infected': self.n_infections,
+            'n_active': len(self.active['ind']),
+            'n_infectors': len(self.active['ind']),
+        }
+        if 'n_quarantined' in names:
+            counters['n_quarantined'] = int(
+                np.count_nonzero(
+                    self.is_quarantined(self.q_idx, time) &
+                    ~self.removed[self.q_idx]))
+        if 'extinct' in names:
+            counters['extinct'] = counters['n_active'] == 0 and not any(
+                x[2] in self.seeding_plugins for x in self.plugin_calls)
+        return counters
+
+    def count_time_series(self, time):
+        '''Return numbers of active infections, cumulative infections,
+        individuals in quarantine and cumulative removals of each group at
+        ``time``.'''
+        n_groups = len(self.group_names)
+        infected = ~np.isnan(self.infected)
+        active = infected & np.isnan(self.recovered) & ~self.removed
+        quarantined = self.q_idx[self.is_quarantined(self.q_idx, time) &
+                                 ~self.removed[self.q_idx]]
+        return np.stack([
+            np.bincount(self.group_of[active], minlength=n_groups),
+            np.bincount(self.group_of[infected], minlength=n_groups),
+            np.bincount(self.group_of[quarantined], minlength=n_groups),
+            np.bincount(self.group_of[self.removed], minlength=n_groups),
+        ], axis=1)
+
+    def run(self):
+        '''Simulate until there is no active infection, till the time
+        specified by --stop-if, or until other conditions of --stop-if are met.'''
+        interval = self.params.simulation_interval
+        stop_time, stop_conditions = parse_stop_if(self.simu_args.stop_if)
+        stop_names = {x.variable for x in stop_conditions}
+        step = 0
+        while True:
+            if not len(self.active['ind']):
+                if not self.plugin_calls:
+                    break
+                # jump to the next plugin call
+                step = max(step,
+                           int(min(x[0] for x in self.plugin_calls) / interval))
+            time = step * interval
+            next_time = (step + 1) * interval
+            if stop_time is not None and time > stop_time:
+                self.time = stop_time
+                break
+
+            if self.time_series is not None:
+                # time points till the start of the step are in the current state
+                self.time_series.advance(
+                    time, lambda: self.count_time_series(time), inclusive=True)
+
+            self.apply_plugins(next_time, before_core=True)
+            self.transmit(time, next_time)
+            self.progress(next_time)
+            self.apply_plugins(next_time, before_core=False)
+
+            if stop_conditions:
+                counters = self.get_counters(stop_names, next_time)
+                if any(x(counters) for x in stop_conditions):
+                    break
+
+            if not len(self.active['ind']) and (stop_time is None or
+                                                not self.plugin_calls):
+                break
+            step += 1
+
+    def end(self):
+        '''Write END record.'''
+        popsize = int(self.n_present.sum())
+        res = {
+            'popsize': popsize,
+            'prop_asym': f'{self.model.params.prop_asym_carriers:.3f}',
+            'time': datetime.now().strftime("%m/%d/%Y-%H:%M:%S"),
+        }
+        if self.simu_args.stop_if:
+            res['stop_if'] = ' '.join(self.simu_args.stop_if)
+        params = ','.join([f'{x}={y}' for x, y in res.items()])
+
+        self.logger.write(
+            f'{self.time:.2f}\t{EventType.END.name}\t{popsize}\t{params}\n')
+
+    def simulate(self, id):
+        self.start(id)
+        self.run()
+        self.end()
+        if self.time_series is not None:
+            self.time_series.finish(lambda: self.count_time_series(self.time))
+
+    #
+    # plugins
+    #
+    def apply_stat(self, time, args):
+        present = ~self.removed
+        infected = present & ~np.isnan(self.infected)
+        recovered = present & ~np.isnan(self.recovered)
+        n_groups = len(self.group_names)
+        n_infected = np.bincount(self.group_of[infected], minlength=n_groups)
+        n_recovered = np.bincount(self.group_of[recovered], minlength=n_groups)
+
+        res = {}
+        res['n_recovered'] = int(n_recovered.sum())
+        res['n_infected'] = int(n_infected.sum())
+        res['n_active'] = res['n_infected'] - res['n_recovered']
+        res['n_popsize'] = int(self.n_present.sum())
+        res['incidence_rate'] = '0' if res[
+            'n_popsize'] == 0 else '{:.5f}'.format(res['n_active'] /
+                                                    res['n_popsize'])
+        res['seroprevalence'] = '0' if res[
+            'n_popsize'] == 0 else '{:.5f}'.format(res['n_infected'] /
+                                                    res['n_popsize'])
+        for grp, group in sorted(
+                enumerate(self.group_names), key=lambda x: x[1]):
+            if group == '':
+                continue
+            res[f'n_{group}_recovered'] = int(n_recovered[grp])
+            res[f'n_{group}_infected'] = int(n_infected[grp])
+            res[f'n_{group}_active'] = int(n_infected[grp] - n_recovered[grp])
+            res[f'n_{group}_popsize'] = int(self.n_present[grp])
+            res[f'{group}_incidence_rate'] = 0 if self.n_present[
+                grp] == 0 else '{:.3f}'.format(
+                    res[f'n_{group}_active'] / self.n_present[grp])
+            res[f'{group}_seroprevalence'] = 0 if self.n_present[
+                grp] == 0 else '{:.3f}'.format(
+                    res[f'n_{group}_infected'] / self.n_present[grp])
+        param = ','.join(f'{k}={v}' for k, v in res.items())
+        if args.verbosity > 0:
+            self.logger.write(
+                f'{time:.2f}\t{EventType.PLUGIN.name}\t.\tname=stat,{param}\n')
+
+    def _present(self, grp):
+        start = self.group_start[grp]
+        return start + np.flatnonzero(
+            ~self.removed[start:start + self.group_total[grp]])
+
+    def apply_init(self, time, args):
+        ir = parse_param_with_multiplier(
+            args.incidence_rate, subpops=self.group_names)
+        isp = parse_param_with_multiplier(
+            args.seroprevalence, subpops=self.group_names)
+
+        infected = []
+        n_isp = 0
+        for grp, name in enumerate(self.group_names):
+            idx = self._present(grp)
+            sz = len(idx)
+            pop_ir = ir.get(name if name in ir else '', 0.0)
+            pop_isp = isp.get(name if name in isp else '', 0.0)
+            if args.as_proportion:
+                sp_ir = int(sz * pop_ir)
+                sp_isp = min(int(sz * pop_isp), sz - sp_ir)
+                idx = np.random.permutation(idx)
+                infected.append(idx[:sp_ir])
+                seropositive = idx[sp_ir:sp_ir + sp_isp]
+            else:
+                pop_isp = min(pop_isp, 1 - pop_ir)
+                rng = np.random.uniform(0, 1, sz)
+                infected.append(idx[rng < pop_ir])
+                seropositive = idx[(rng >= pop_ir) & (rng < pop_ir + pop_isp)]
+            n_isp += len(seropositive)
+            self.infected[seropositive] = time - 10.0
+            self.recovered[seropositive] = time - 2.0
+            self.immunity[seropositive] = self.params.immunity_of_recovered
+            self.infectivity[seropositive] = self.params.infectivity_of_recovered
+        infected = np.concatenate(infected)
+
+        infected_list = f',infected={",".join(self.id_of(x) for x in infected)}' if len(
+            infected) and args.verbosity > 1 else ''
+        if args.verbosity > 0:
+            self.logger.write(
+                f'{time:.2f}\t{EventType.PLUGIN.name}\t.\tname=init,n_initialized={int(self.n_present.sum())},n_recovered={n_isp},n_infected={len(infected)}{infected_list}\n'
+            )
+        self.infect(infected, time, leadtime=args.leadtime)
+
+    def apply_community_infection(self, time, args):
+        if len(args.probability) == 1:
+            probability = parse_param_with_multiplier(
+                args.probability[0], subpops=self.group_names)
+        else:
+            if not args.at:
+                raise ValueError(
+                    'Parameter --at is expected when multiple probability values are specified.'
+                )
+            if time not in args.at:
+                raise ValueError(f'{time} is not in the list of --at {args.at}')
+            idx = args.at.index(time)
+            if len(args.probability) < idx + 1:
+                raise ValueError(
+                    f'No value of --probability corresponding to time {time}')
+            probability = parse_param_with_multiplier(
+                args.probability[idx], subpops=self.group_names)
+
+        for subpop, prob in probability.items():
+            if prob == 0.0:
+                continue
+            if subpop:
+                grp = self.group_names.index(subpop)
+                start, end = self.group_start[grp], self.group_start[grp] + self.group_total[grp]
+            else:
+                start, end = 0, len(self.removed)
+            idx = np.arange(start, end)
+            idx = idx[~self.removed[idx] & ~self.is_quarantined(idx, time)]
+            targets = idx[np.random.uniform(0, 1, len(idx)) <
+                          prob * self.susceptibility[self.group_of[idx]]]
+
+            ID_list = f',infected={",".join(self.id_of(x) for x in targets)}' if len(
+                targets) and args.verbosity > 1 else ''
+            if args.verbosity > 0:
+                self.logger.write(
+                    f'{time:.2f}\t{EventType.PLUGIN.name}\t.\tname=community_infection,subpop={subpop if subpop else "all"},n_qualified={len(idx)},n_infected={len(targets)}{ID_list}\n'
+                )
+            self.infect(targets, time)
+
+    def apply_vaccinate(self, time, args):
+        if args.IDs:
+            if args.proportion:
+                raise ValueError(
+                    'Proportion is now allowed if specific IDs to quarantine is specified.'
+                )
+            targets = [self.index_of(x) for x in args.IDs]
+            if any(x is None for x in targets):
+                raise ValueError('Invalid or non-existant ID to quarantine.')
+            targets = np.array(targets, dtype=int)
+        else:
+            proportions = parse_param_with_multiplier(
+                args.proportion, subpops=self.group_names)
+            targets = []
+            for grp, name in enumerate(self.group_names):
+                prop = proportions.get(name if name in proportions else '', 1.0)
+                if prop < 0 or prop > 1:
+                    raise ValueError(f'Disallowed proportion {prop}')
+                idx = self._present(grp)
+                sz = len(idx)
+                idx = idx[~self.vaccinated[idx]]
+                if prop < 1:
+                    idx = np.random.permutation(idx)[:int(sz * prop)]
+                targets.append(idx)
+            targets = np.concatenate(targets)
+
+        immunity = args.immunity * 2 if len(args.immunity) == 1 else args.immunity
+        infectivity = args.infectivity * 2 if len(
+            args.infectivity) == 1 else args.infectivity
+        self.vaccinated[targets] = True
+        self.immunity[targets] = np.maximum(self.immunity[targets], immunity)
+        self.infectivity[targets] = np.minimum(self.infectivity[targets],
+                                               infectivity)
+
+        vaccinated_list = f',vaccinated={",".join(self.id_of(x) for x in targets)}' if args.verbosity > 1 else ''
+        if args.verbosity > 0:
+            self.logger.write(
+                f'{time:.2f}\t{EventType.PLUGIN.name}\t.\tname=vaccine,proportion={args.proportion},immunity={",".join([str(x) for x in args.immunity])},infectivity={",".join([str(x) for x in args.infectivity])},n_vaccinated={len(targets)}{vaccinated_list}\n'
+            )
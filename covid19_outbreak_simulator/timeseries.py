@@ -0,0 +1,181 @@
+"""Time series of replicates and their quantile bands across replicates."""
+import math
+
+import numpy as np
+
+# statistics of each series, namely infected individuals who have not
+# recovered, cumulative number of infections, individuals in quarantine
+# and cumulative number of removed individuals
+STATS = ('active', 'infected', 'quarantined', 'removed')
+
+
+def group_names(popsize):
+    '''Return names of groups of option --popsize, with '' for unnamed
+    population.'''
+    return [ps.split('=', 1)[0] if '=' in ps else '' for ps in popsize]
+
+
+def series_names(groups):
+    '''Return names of series of the entire population and of named groups
+    ``groups``, such as ``n_active`` and ``n_nurse_active``.'''
+    return [f'n_{x}' for x in STATS
+           ] + [f'n_{group}_{x}' for group in groups if group for x in STATS]
+
+
+def time_points(interval, end):
+    '''Return time points ``0, interval, ...`` till ``end``.'''
+    return np.arange(int(math.floor(end / interval + 1e-6)) + 1) * interval
+
+
+class TimeSeries(object):
+    '''Values of series of a replicate at time points ``0, interval, ...``
+    till ``end``, stored in a preallocated array ``values`` with a row for
+    each series. Values of a time point are the state of the population after
+    all events at or before the time point.'''
+
+    def __init__(self, groups, interval, end):
+        self.groups = groups
+        self.times = time_points(interval, end)
+        self.values = np.zeros((len(series_names(groups)), len(self.times)),
+                               dtype=np.int32)
+        self.named = [i for i, x in enumerate(groups) if x]
+        # number of time points that have been recorded
+        self.recorded = 0
+
+    def advance(self, time, counts, inclusive=False):
+        '''Record time points before (or at if ``inclusive``) ``time`` with
+        ``counts()``, which returns an array with a row of statistics ``STATS``
+        for each group, and is called only if there are time points to record.'''
+        n = np.searchsorted(
+            self.times, time, side='right' if inclusive else 'left')
+        if n <= self.recorded:
+            return
+        counts = np.asarray(counts())
+        self.values[:, self.recorded:n] = np.concatenate(
+            [counts.sum(axis=0), counts[self.named].ravel()])[:, None]
+        self.recorded = n
+
+    def finish(self, counts):
+        '''Record remaining time points with the final state of the replicate.'''
+        self.advance(np.inf, counts)
+
+
+class TDigest(object):
+    '''Merging t-digests of ``n`` variables that are updated together.
+    Observations are buffered and merged with existing centroids of all
+    variables at once. Centroids are limited by the k1 scale function of
+    t-digest with ``compression``, so that centroids are small near both
+    tails and quantiles are accurate for the tails.'''
+
+    def __init__(self, n, compression=200, buffer_size=256):
+        self.compression = compression
+        self.n_buckets = int(math.ceil(compression / 2)) + 1
+        self.means = np.zeros((n, 0))
+        self.weights = np.zeros((n, 0))
+        self.buffer = np.empty((buffer_size, n))
+        self.buffered = 0
+        self.count = 0
+        self.sum = np.zeros(n)
+        self.min = np.full(n, np.inf)
+        self.max = np.full(n, -np.inf)
+
+    def add(self, values):
+        '''Add an observation of all variables.'''
+        self.buffer[self.buffered] = np.ravel(values)
+        self.buffered += 1
+        self.count += 1
+        if self.buffered == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        '''Merge buffered observations into centroids.'''
+        if not self.buffered:
+            return
+        values = self.buffer[:self.buffered].T
+        self.sum += values.sum(axis=1)
+        np.minimum(self.min, values.min(axis=1), out=self.min)
+        np.maximum(self.max, values.max(axis=1), out=self.max)
+        self._compress(
+            np.hstack([self.means, values]),
+            np.hstack([self.weights, np.ones(values.shape)]))
+        self.buffered = 0
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, axis=1, kind='stable')
+        means = np.take_along_axis(means, order, axis=1)
+        weights = np.take_along_axis(weights, order, axis=1)
+        cumsum = np.cumsum(weights, axis=1)
+        q = (cumsum - weights / 2) / cumsum[:, -1:]
+        # centroids are merged by their positions on the k1 scale
+        k = self.compression / (2 * math.pi) * np.arcsin(
+            np.clip(2 * q - 1, -1, 1)) + self.compression / 4
+        bucket = np.minimum(k.astype(int), self.n_buckets - 1)
+        bucket += np.arange(len(means))[:, None] * self.n_buckets
+        size = len(means) * self.n_buckets
+        self.weights = np.bincount(
+            bucket.ravel(), weights.ravel(), minlength=size).reshape(
+                len(means), self.n_buckets)
+        total = np.bincount(
+            bucket.ravel(), (weights * means).ravel(),
+            minlength=size).reshape(len(means), self.n_buckets)
+        self.means = np.divide(
+            total,
+            self.weights,
+            out=np.zeros_like(total),
+            where=self.weights > 0)
+
+    def mean(self):
+        self.flush()
+        return self.sum / self.count if self.count else np.full(
+            len(self.sum), np.nan)
+
+    def quantile(self, q):
+        '''Return an array with quantiles ``q`` of each variable in a row.'''
+        self.flush()
+        q = np.asarray(q, dtype=float)
+        res = np.full((len(self.means), len(q)), np.nan)
+        if not self.count:
+            return res
+        centers = np.cumsum(self.weights, axis=1) - self.weights / 2
+        for i in range(len(self.means)):
+            used = self.weights[i] > 0
+            res[i] = np.interp(
+                q * self.count,
+                np.concatenate([[0], centers[i][used], [self.count]]),
+                np.concatenate([[self.min[i]], self.means[i][used],
+                                [self.max[i]]]))
+        return res
+
+
+class TimeSeriesSummary(object):
+    '''Quantile bands of time series ``names`` at time points ``times``
+    across replicates, which are summarized with t-digests as replicates are
+    added so that time series of replicates are not stored.'''
+
+    def __init__(self, names, times, compression=200):
+        self.names = names
+        self.times = times
+        self.digest = TDigest(len(names) * len(times), compression)
+
+    def add(self, values):
+        '''Add ``values`` of a replicate with a row for each series.'''
+        self.digest.add(values)
+
+    def write(self, filename, quantiles):
+        '''Write the number of replicates, mean, minimum, ``quantiles`` and
+        maximum of each series at each time point to ``filename``.'''
+        mean = self.digest.mean().reshape(len(self.names), len(self.times))
+        bands = self.digest.quantile(quantiles).reshape(
+            len(self.names), len(self.times), len(quantiles))
+        low = self.digest.min.reshape(len(self.names), len(self.times))
+        high = self.digest.max.reshape(len(self.names), len(self.times))
+        with open(filename, 'w') as output:
+            output.write('\t'.join(['series', 'time', 'n', 'mean', 'min'] +
+                                   [f'q{x * 100:g}' for x in quantiles] +
+                                   ['max']) + '\n')
+            for i, name in enumerate(self.names):
+                for j, time in enumerate(self.times):
+                    values = [mean[i, j], low[i, j]] + list(
+                        bands[i, j]) + [high[i, j]]
+                    output.write(f'{name}\t{time:.2f}\t{self.digest.count}\t' +
+                                 '\t'.join(f'{x:.6g}' for x in values) + '\n')
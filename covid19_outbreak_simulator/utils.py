@@ -1,6 +1,10 @@
-import copy
+import operator
 import random
 from fnmatch import fnmatch
+from functools import lru_cache
+from types import MappingProxyType
+
+import numpy as np
 
 
 def as_float(val, msg=''):
@@ -67,86 +71,252 @@ def parse_param_with_multiplier(args, subpops=None, default=0, default_base=1):
     return res
 
 
-def parse_target_param(status):
-    if status is None:
-        return lambda ind: True
-    if isinstance(status, list):
-        if len(status) == 1:
-            return parse_target_param(status[0])
-        else:
-            raise ValueError('parse_target_param currently only support a single value.')
+# columns of individual status used by --target expressions
+TARGET_COLUMNS = {
+    'infected': ('infected', 'recovered'),
+    'uninfected': ('infected',),
+    'recovered': ('recovered',),
+    'quarantined': ('quarantined',),
+    'unquarantined': ('quarantined',),
+    'vaccinated': ('vaccinated',),
+    'unvaccinated': ('vaccinated',),
+    'monitored': ('monitored',),
+    'all': (),
+}
+
 
+def _parse_target_expr(status):
     if '&' in status:
         if status.count('&') > 1:
             raise ValueError(f'Currently only 1 & condition is allowed.')
         sts = status.split('&')
-        return lambda ind: parse_target_param(sts[0])(ind) and parse_target_param(sts[1])(ind)
+        return ('&', _parse_target_expr(sts[0]), _parse_target_expr(sts[1]))
     if '|' in status:
         if status.count('|') > 1:
             raise ValueError(f'Currently only 1 & condition is allowed.')
         sts = status.split('|')
-        return lambda ind: parse_target_param(sts[0])(ind) or parse_target_param(sts[1])(ind)
+        return ('|', _parse_target_expr(sts[0]), _parse_target_expr(sts[1]))
     if status.startswith('!'):
-        return lambda ind: not parse_target_param(status[1:])(ind)
-
-    if status == 'infected':
-        return lambda ind: isinstance(ind.infected, float) and not isinstance(
-            ind.recovered, float)
-    elif status == 'uninfected':
-        return lambda ind: not isinstance(ind.infected, float)
-    elif status == 'recovered':
-        return lambda ind: isinstance(ind.recovered, float)
-    elif status == 'quarantined':
-        return lambda ind: isinstance(ind.quarantined, float)
-    elif status == 'unquarantined':
-        return lambda ind: not isinstance(ind.quarantined, float)
-    elif status == 'vaccinated':
-        return lambda ind: isinstance(ind.vaccinated, float)
-    elif status == 'unvaccinated':
-        return lambda ind: not isinstance(ind.vaccinated, float)
-    elif status == 'monitored':
-        return lambda ind: hasattr(ind, 'monitored') and isinstance(ind.monitored, float)
-    elif status == 'all':
-        return lambda ind: True
-    else:
+        return ('!', _parse_target_expr(status[1:]))
+    if status not in TARGET_COLUMNS:
         raise ValueError(f'Unexpected conditions {status}')
+    return (status,)
+
+
+class Target(object):
+    '''A compiled --target expression that can be evaluated for an individual
+    or, with ``mask``, for columns of status returned by ``status_columns``.'''
+
+    def __init__(self, status):
+        self.status = status
+        self.expr = ('all',) if status is None else _parse_target_expr(status)
+        self.columns = set()
+        self._collect_columns(self.expr)
+
+    def _collect_columns(self, expr):
+        if expr[0] in ('&', '|', '!'):
+            for sub in expr[1:]:
+                self._collect_columns(sub)
+        else:
+            self.columns.update(TARGET_COLUMNS[expr[0]])
+
+    def __call__(self, ind):
+        return self._match(self.expr, ind)
+
+    def _match(self, expr, ind):
+        op = expr[0]
+        if op == '&':
+            return self._match(expr[1], ind) and self._match(expr[2], ind)
+        elif op == '|':
+            return self._match(expr[1], ind) or self._match(expr[2], ind)
+        elif op == '!':
+            return not self._match(expr[1], ind)
+        elif op == 'infected':
+            return isinstance(ind.infected, float) and not isinstance(
+                ind.recovered, float)
+        elif op == 'uninfected':
+            return not isinstance(ind.infected, float)
+        elif op == 'recovered':
+            return isinstance(ind.recovered, float)
+        elif op == 'quarantined':
+            return isinstance(ind.quarantined, float)
+        elif op == 'unquarantined':
+            return not isinstance(ind.quarantined, float)
+        elif op == 'vaccinated':
+            return isinstance(ind.vaccinated, float)
+        elif op == 'unvaccinated':
+            return not isinstance(ind.vaccinated, float)
+        elif op == 'monitored':
+            return isinstance(getattr(ind, 'monitored', None), float)
+        return True
+
+    def mask(self, columns, size=None):
+        '''Return a boolean array of individuals that match the expression,
+        where ``columns`` are arrays with ``nan`` for unset status.'''
+        if size is None:
+            size = len(next(iter(columns.values()))) if columns else 0
+        return self._mask(self.expr, columns, size)
+
+    def _mask(self, expr, columns, size):
+        op = expr[0]
+        if op == '&':
+            return self._mask(expr[1], columns, size) & self._mask(
+                expr[2], columns, size)
+        elif op == '|':
+            return self._mask(expr[1], columns, size) | self._mask(
+                expr[2], columns, size)
+        elif op == '!':
+            return ~self._mask(expr[1], columns, size)
+        elif op == 'infected':
+            return ~np.isnan(columns['infected']) & np.isnan(
+                columns['recovered'])
+        elif op in ('uninfected', 'unquarantined', 'unvaccinated'):
+            return np.isnan(columns[op[2:]])
+        elif op in ('recovered', 'quarantined', 'vaccinated', 'monitored'):
+            return ~np.isnan(columns[op])
+        return np.ones(size, dtype=bool)
+
+
+def parse_target_param(status):
+    if isinstance(status, list):
+        if len(status) == 1:
+            return parse_target_param(status[0])
+        else:
+            raise ValueError('parse_target_param currently only support a single value.')
+    return _compile_target(status)
+
+
+@lru_cache(maxsize=None)
+def _compile_target(status):
+    return Target(status)
+
+
+def status_columns(population, IDs, columns):
+    '''Return arrays of status ``columns`` of individuals ``IDs``, with the
+    time of the status or ``nan`` if the status is not set.'''
+    if not columns:
+        return {}
+    inds = [population[x] for x in IDs]
+    return {
+        name: np.fromiter((x if isinstance(x, float) else np.nan
+                           for x in (getattr(ind, name, None) for ind in inds)),
+                          dtype=float,
+                          count=len(inds)) for name in columns
+    }
 
 
 def select_individuals(population, IDs, targets, max_count=None):
     if max_count == 0:
         return []
-    from_IDs = copy.deepcopy(IDs)
-    random.shuffle(from_IDs)
-
-    def add_ind(match_cond, limit=None):
-        nonlocal from_IDs
-        res = []
-        count = 0
-        for ID in from_IDs:
-            if match_cond(population[ID]):
-                res.append(ID)
-                count += 1
-                if limit is not None and count == limit:
-                    break
-        from_IDs = list(set(from_IDs) - set(res))
-        return res
+    IDs = list(IDs)
+    targets = [parse_target_param(x) for x in targets or ['all']]
+    columns = status_columns(population, IDs,
+                             set().union(*[x.columns for x in targets]))
+    available = np.ones(len(IDs), dtype=bool)
 
     selected = []
-    for target in targets or ['all']:
-        is_target = parse_target_param(target)
-        selected.extend(
-            add_ind(
-                is_target,
-                None if max_count is None else max_count - len(selected)))
+    for target in targets:
+        idx = np.flatnonzero(target.mask(columns, len(IDs)) & available)
+        # matching individuals are selected in random order, and randomly
+        # if there are more than needed
+        size = len(idx) if max_count is None else min(
+            len(idx), max_count - len(selected))
+        idx = idx[random.sample(range(len(idx)), size)]
+        available[idx] = False
+        selected.extend(IDs[x] for x in idx)
         if max_count is not None and len(selected) == max_count:
             break
     return selected
 
 
+# counters of the population that can be used in conditions of --stop-if
+STOP_VARIABLES = ('t', 'n_popsize', 'n_infected', 'n_active', 'n_infectors',
+                  'n_quarantined')
+
+# two-character operators are matched first
+STOP_OPERATORS = {
+    '>=': operator.ge,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '<': operator.lt,
+}
+
+
+class StopCondition(object):
+    '''A condition ``VAR OP VALUE`` of option --stop-if on time ``t`` or a
+    counter of the population, or ``extinct``, which holds when there is no
+    active or pending infection and no plugin that seeds infections remains.'''
+
+    def __init__(self, cond):
+        self.cond = cond
+        if cond == 'extinct':
+            self.variable = 'extinct'
+            self.op = None
+            self.value = True
+            return
+        for op in STOP_OPERATORS:
+            if op in cond:
+                var, value = cond.split(op, 1)
+                break
+        else:
+            raise ValueError(
+                f'Invalid stop condition "{cond}": VAR OP VALUE or extinct expected.'
+            )
+        self.variable = var.strip()
+        if self.variable not in STOP_VARIABLES:
+            raise ValueError(
+                f'Invalid stop condition "{cond}": variable should be one of {", ".join(STOP_VARIABLES)}.'
+            )
+        if self.variable == 't' and op != '>':
+            raise ValueError(
+                f'Invalid stop condition "{cond}": only t>TIME is supported for time.'
+            )
+        self.op = STOP_OPERATORS[op]
+        self.value = as_float(value, f'stop condition "{cond}"')
+
+    def __call__(self, counters):
+        if self.op is None:
+            return counters[self.variable]
+        return self.op(counters[self.variable], self.value)
+
+    def __str__(self):
+        return self.cond
+
+
+def parse_stop_if(stop_if):
+    '''Return the time after which the simulation stops (None if unspecified)
+    and other conditions of option --stop-if, which are evaluated after each
+    time step.'''
+    if not stop_if:
+        return None, []
+    conds = [StopCondition(x) for x in stop_if]
+    stop_times = [x.value for x in conds if x.variable == 't']
+    return min(stop_times) if stop_times else None, [
+        x for x in conds if x.variable != 't'
+    ]
+
+
 def parse_handle_symptomatic_options(handle_symptomatic_arg,
      group, vaccinated):
+    '''Return the read-only policy for an individual of ``group`` from
+    options ``handle_symptomatic_arg``. Policies are compiled once per
+    distinct options, group and vaccination status so that changing the
+    options (e.g. with plugin setparam) yields a new policy.'''
     if isinstance(handle_symptomatic_arg, list):
-        assert isinstance(handle_symptomatic_arg[0], list)
+        handle_symptomatic_arg = tuple(
+            tuple(x) if isinstance(x, list) else x
+            for x in handle_symptomatic_arg)
+    return _compile_handle_symptomatic_options(handle_symptomatic_arg, group,
+                                               vaccinated is True)
+
+
+@lru_cache(maxsize=None)
+def _compile_handle_symptomatic_options(handle_symptomatic_arg, group,
+                                        vaccinated):
+    if isinstance(handle_symptomatic_arg, tuple):
+        assert isinstance(handle_symptomatic_arg[0], tuple)
         if len(handle_symptomatic_arg) == 1:
             handle_symptomatic_arg = handle_symptomatic_arg[0]
         elif len(handle_symptomatic_arg) == 2:
@@ -204,8 +374,8 @@ def parse_handle_symptomatic_options(handle_symptomatic_arg,
                     else:
                         raise ValueError(f'Parameter infected can only be True or False. {v} specified')
                 elif k == 'ct_groups':
-                    handle_symptomatic[k] = v.split(',')
+                    handle_symptomatic[k] = tuple(v.split(','))
         else:
             handle_symptomatic['proportion'] = 1
 
-    return handle_symptomatic
+    return MappingProxyType(handle_symptomatic)
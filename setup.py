@@ -7,7 +7,7 @@ from setuptools import setup, find_packages
 with open('README.md') as readme_file:
     readme = readme_file.read()
 
-requirements = ['tqdm', 'numpy', 'scipy']
+requirements = ['tqdm', 'numpy']
 
 setup_requirements = [
     'pytest-runner',
@@ -17,6 +17,7 @@ setup_requirements = [
 
 test_requirements = [
     'pytest>=3',
+    'scipy',
 ]
 
 def read(rel_path):
@@ -53,6 +54,7 @@ setup(
         ],
     },
     install_requires=requirements,
+    extras_require={'zstd': ['zstandard']},
     long_description=readme,
     long_description_content_type="text/markdown",
     include_package_data=True,
@@ -25,8 +25,9 @@ def logger():
 
 @pytest.fixture
 def clear_log():
-    if os.path.isfile('simulation.log'):
-        os.remove('simulation.log')
+    for filename in ('simulation.log', 'simulation.log.idx'):
+        if os.path.isfile(filename):
+            os.remove(filename)
 
 @pytest.fixture
 def simulator(params, logger):
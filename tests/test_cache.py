@@ -0,0 +1,103 @@
+import gzip
+import os
+import time
+
+import pytest
+
+from covid19_outbreak_simulator.cache import ResultCache, cache_key, parse_size
+from covid19_outbreak_simulator.cli import parse_args
+from covid19_outbreak_simulator.model import Params
+
+
+def test_parse_size():
+    assert parse_size("100") == 100
+    assert parse_size("2K") == 2048
+    assert parse_size("1.5m") == 1.5 * 1024 * 1024
+    with pytest.raises(ValueError):
+        parse_size("many")
+
+
+def test_cache_key():
+    args = parse_args(["--seed", "1", "--repeats", "10", "--logfile", "a.log"])
+    key = cache_key(args, Params(args))
+    # number of replicates, logfile etc do not change the key
+    args = parse_args(["--seed", "1", "--repeats", "20", "-j", "2"])
+    assert cache_key(args, Params(args)) == key
+
+    for cmd in (["--seed", "2"], ["--seed", "1", "--popsize", "100"],
+                ["--seed", "1", "--plugin", "stat"]):
+        args = parse_args(cmd)
+        assert cache_key(args, Params(args)) != key
+
+
+def test_cache_key_snapshot(tmp_path):
+    snapshot = str(tmp_path / "snapshot_{id}.pkl")
+    with open(snapshot.format(id=1), "wb") as pkl:
+        pkl.write(b"old")
+    args = parse_args(["--seed", "1", "--load-snapshot", snapshot])
+    key = cache_key(args, Params(args))
+    assert cache_key(args, Params(args)) == key
+    # snapshot regenerated at the same path
+    with open(snapshot.format(id=1), "wb") as pkl:
+        pkl.write(b"new")
+    assert cache_key(args, Params(args)) != key
+
+
+def write_log(filename, n):
+    with open(filename, "w") as log:
+        log.write("id\ttime\tevent\ttarget\tparams\n")
+        for i in range(1, n + 1):
+            log.write(f"{i}\t0.00\tSTART\t.\tid={i}\n")
+            log.write(f"{i}\t0.00\tEND\t64\tpopsize=64\n")
+
+
+def test_result_cache(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    write_log(tmp_path / "a.log", 5)
+    assert cache.lookup("a") == 0
+    cache.store("a", tmp_path / "a.log", 5)
+    assert cache.lookup("a") == 5
+
+    assert cache.retrieve("a", tmp_path / "b.log", 3) == 3
+    with open(tmp_path / "b.log") as log:
+        assert len(log.readlines()) == 7
+    assert cache.retrieve("a", tmp_path / "c.log", 10) == 5
+
+    # fewer replicates do not overwrite existing entry
+    write_log(tmp_path / "a.log", 2)
+    cache.store("a", tmp_path / "a.log", 2)
+    assert cache.lookup("a") == 5
+
+
+def test_result_cache_eviction(tmp_path):
+    write_log(tmp_path / "a.log", 10)
+    size = os.path.getsize(tmp_path / "a.log")
+    cache = ResultCache(str(tmp_path / "cache"), max_size=int(size * 2.5))
+    cache.store("a", tmp_path / "a.log", 10)
+    time.sleep(0.01)
+    cache.store("b", tmp_path / "a.log", 10)
+    time.sleep(0.01)
+    # a is used more recently than b
+    cache.lookup("a")
+    time.sleep(0.01)
+    cache.store("c", tmp_path / "a.log", 10)
+    assert cache.lookup("a") == 10
+    assert cache.lookup("b") == 0
+    assert cache.lookup("c") == 10
+
+
+def test_result_cache_compression(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    write_log(tmp_path / "a.log", 5)
+    cache.store("a", str(tmp_path / "a.log"), 5)
+    # replicates are compressed for compressed logfiles
+    assert cache.retrieve("a", str(tmp_path / "b.log.gz"), 10) == 5
+    with gzip.open(tmp_path / "b.log.gz", "rt") as log:
+        assert len(log.readlines()) == 11
+
+    # compressed logfiles are cached compressed
+    cache.store("b", str(tmp_path / "b.log.gz"), 5)
+    assert os.path.isfile(tmp_path / "cache" / "b.log.gz")
+    assert cache.retrieve("b", str(tmp_path / "c.log"), 3) == 3
+    with open(tmp_path / "c.log") as log:
+        assert len(log.readlines()) == 7
@@ -0,0 +1,68 @@
+import multiprocessing
+import time
+
+import pytest
+
+from covid19_outbreak_simulator.coordinator import (AUTHKEY_ENV, Coordinator,
+                                                    connect, get_authkey,
+                                                    parse_address, start_server)
+
+
+def test_parse_address():
+    assert parse_address("localhost:8000") == ("localhost", 8000)
+    assert parse_address("/tmp/coordinator.sock") == "/tmp/coordinator.sock"
+
+
+def test_coordinator_steal_and_reclaim():
+    coordinator = Coordinator(list(range(1, 5)), cmd=[])
+    coordinator.register("A")
+
+    lease_a, ids = coordinator.get_chunk("A")
+    assert ids == [1, 2]
+    _, ids = coordinator.get_chunk("B")
+    assert ids == [3]
+    lease_b, ids = coordinator.get_chunk("B")
+    assert ids == [4]
+    # no pending IDs, so C steals the unstarted half of the largest lease
+    _, ids = coordinator.get_chunk("C")
+    assert ids == [2]
+    assert coordinator.submit(lease_a, 1, "", "END") == []
+
+    # lease of B expires and its replicate is handed out again
+    coordinator.leases[lease_b].deadline = time.time() - 1
+    lease_d, ids = coordinator.get_chunk("D")
+    assert ids == [4]
+    # late result is accepted only once
+    coordinator.submit(lease_b, 4, "", "END")
+    coordinator.submit(lease_d, 4, "", "END")
+    assert coordinator.results.qsize() == 2
+
+
+def test_get_authkey(monkeypatch, capsys):
+    monkeypatch.delenv(AUTHKEY_ENV, raising=False)
+    assert get_authkey("secret") == "secret"
+    # workers require a key
+    with pytest.raises(ValueError):
+        get_authkey(None)
+    # coordinator generates and prints a random key
+    authkey = get_authkey(None, generate=True)
+    assert len(authkey) == 32
+    assert authkey in capsys.readouterr().out
+    assert get_authkey(None, generate=True) != authkey
+
+    monkeypatch.setenv(AUTHKEY_ENV, "from-env")
+    assert get_authkey(None) == "from-env"
+    assert get_authkey("secret") == "secret"
+
+
+def test_wrong_authkey(tmp_path):
+    address = str(tmp_path / "coordinator.sock")
+    server = start_server(Coordinator([1], cmd=["--repeats", "1"]), address,
+                          "secret")
+    try:
+        with pytest.raises(multiprocessing.AuthenticationError):
+            connect(address, "wrong")
+        coordinator = connect(address, "secret").get_coordinator()
+        assert coordinator.get_cmd() == ["--repeats", "1"]
+    finally:
+        server.stop_event.set()
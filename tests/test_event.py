@@ -1,6 +1,37 @@
-from covid19_outbreak_simulator.event import Event, EventType
+from enum import Enum
+
+import pytest
+
+from covid19_outbreak_simulator.event import (Event, EventType, InfectionEvent,
+                                              register_event)
 
 
 def test_event_infection(simulator):
     event = Event(
         0, EventType.INFECTION, target=None, by=None, logger=simulator.logger)
+    assert isinstance(event, InfectionEvent)
+    assert event.by is None and event.kwargs == {}
+    with pytest.raises(ValueError):
+        Event(0, EventType.INFECTION, logger=simulator.logger)
+
+
+class CustomEventType(Enum):
+    CUSTOM = 1
+
+
+@register_event(CustomEventType.CUSTOM)
+class CustomEvent(Event):
+
+    def apply(self, population):
+        self.logger.write(f'{self.time:.2f}\t{self.action.name}\t.\tvalue={self.kwargs["value"]}\n')
+        return []
+
+
+def test_register_event(simulator, logger):
+    event = Event(1, CustomEventType.CUSTOM, logger=logger, value=5)
+    assert isinstance(event, CustomEvent)
+    assert event.apply(None) == []
+    with pytest.raises(ValueError):
+        register_event(CustomEventType.CUSTOM)(InfectionEvent)
+    with pytest.raises(RuntimeError):
+        Event(1, EventType.STAT, logger=logger).apply(None)
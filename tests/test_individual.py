@@ -177,3 +177,40 @@ def test_vaccination(individual_factory, immunity, infectivity):
     else:
         assert N_infected < N * (1 - immunity + 0.1)
         assert N_infected > N * (1 - immunity - 0.1)
+
+
+def test_individual_slots(default_model, logger):
+    import pickle
+    from covid19_outbreak_simulator.event import Event
+
+    ind = Individual('group1_0', 1.2, default_model, logger)
+    assert not hasattr(ind, '__dict__')
+    assert not hasattr(ind, 'monitored')
+    ind.monitor(till=3.0)
+    assert ind.monitored == 3.0
+    ind.reintegrate(time=3.0)
+    assert not hasattr(ind, 'monitored')
+
+    evt = Event(1.0, EventType.RECOVER, target=ind, logger=None)
+    assert not hasattr(evt, '__dict__')
+    ind.logger = None
+    ind.model = None
+    evt = pickle.loads(pickle.dumps(evt))
+    assert evt.time == 1.0 and evt.target.id == 'group1_0'
+    assert evt.kwargs == {}
+
+
+def test_aggregated_infection_avoided(default_model, logger):
+    default_model.draw_prop_asym_carriers()
+    n_avoided = 0
+    for i in range(20):
+        ind = Individual(f'group1_{i}', 1.0, default_model, logger)
+        ind.quarantined = 100.0
+        res = ind.symptomatic_infect(0.0, by=None, handle_symptomatic=[['keep']])
+        avoided = [x for x in res if x.action == EventType.INFECTION_AVOIDED]
+        assert len(avoided) <= 1
+        assert not any(x.action == EventType.INFECTION for x in res)
+        if avoided:
+            assert avoided[0].time <= avoided[0].till
+            n_avoided += avoided[0].count
+    assert n_avoided > 0
@@ -0,0 +1,160 @@
+import gzip
+import os
+
+from covid19_outbreak_simulator.cli import main
+from covid19_outbreak_simulator.logindex import (LOG_HEADER, LogIndex,
+                                                 LogWriter, index_file,
+                                                 read_replicate)
+from covid19_outbreak_simulator.summary import summarize_simulations
+
+
+def replicate(id, status="END"):
+    return f"{id}\t0.00\tSTART\t.\tid={id}\n{id}\t1.00\t{status}\t64\tpopsize=64\n"
+
+
+def test_log_writer(tmp_path):
+    logfile = str(tmp_path / "a.log")
+    with LogWriter(logfile) as writer:
+        for i in (1, 2, 3):
+            writer.write(i, replicate(i), "END")
+        writer.write(4, replicate(4, "ERROR"), "ERROR")
+    index = LogIndex.load(logfile)
+    assert list(index.entries["id"]) == [1, 2, 3, 4]
+    assert index.completed() == {1, 2, 3}
+    assert index.end == os.path.getsize(logfile)
+    assert read_replicate(logfile, 2) == replicate(2)
+
+    # index is rebuilt from logfile
+    os.remove(index_file(logfile))
+    rebuilt = LogIndex.load(logfile)
+    assert rebuilt.entries.tobytes() == index.entries.tobytes()
+
+
+def test_log_index_recovery(tmp_path):
+    logfile = str(tmp_path / "a.log")
+    with LogWriter(logfile) as writer:
+        for i in (1, 2):
+            writer.write(i, replicate(i), "END")
+    # replicates written without index entries and partially written records
+    with open(logfile, "a") as log:
+        log.write(replicate(3) + replicate(4)[:20])
+    index = LogIndex.load(logfile)
+    assert index.completed() == {1, 2, 3}
+    assert index.read(3) == replicate(3)
+
+    # replicates with errors are removed from resumed logfile
+    with LogWriter(logfile, index) as writer:
+        writer.write(5, replicate(5, "ERROR"), "ERROR")
+    with LogWriter(logfile, LogIndex.load(logfile)) as writer:
+        writer.write(4, replicate(4), "END")
+    with open(logfile) as log:
+        assert log.read().count("START") == 4
+    assert LogIndex.load(logfile).completed() == {1, 2, 3, 4}
+
+
+def test_resume_missing_replicates(tmp_path):
+    logfile = str(tmp_path / "a.log")
+    args = [
+        "--popsize", "200", "--seed", "1", "--infectors", "1", "--logfile",
+        logfile
+    ]
+    main(args + ["--repeats", "5"])
+    index = LogIndex.load(logfile)
+    # remove replicates 2 and 5
+    with open(logfile) as log:
+        header = log.readline()
+    replicates = [index.read(i) for i in (1, 3, 4)]
+    with open(logfile, "w") as log:
+        log.write(header + "".join(replicates))
+    os.remove(index_file(logfile))
+
+    main(args + ["--repeats", "5", "--resume"])
+    index = LogIndex.load(logfile)
+    assert index.completed() == {1, 2, 3, 4, 5}
+    assert list(index.entries["id"]) == [1, 3, 4, 2, 5]
+
+
+def test_compressed_log(tmp_path):
+    logfile = str(tmp_path / "a.log.gz")
+    with LogWriter(logfile, block_size=100) as writer:
+        for i in (1, 2, 3, 4):
+            writer.write(i, replicate(i), "END")
+    with gzip.open(logfile, "rt") as log:
+        assert log.read() == LOG_HEADER.decode() + "".join(
+            replicate(i) for i in (1, 2, 3, 4))
+    index = LogIndex.load(logfile)
+    assert index.completed() == {1, 2, 3, 4}
+    # replicates are compressed in blocks
+    assert len(set(index.entries["block"])) == 2
+    assert read_replicate(logfile, 3) == replicate(3)
+
+    # blocks without index entries are recovered and incomplete blocks are
+    # removed before appending
+    os.remove(index_file(logfile))
+    with open(logfile, "ab") as log:
+        log.write(gzip.compress(replicate(5).encode()))
+        log.write(gzip.compress(replicate(6).encode())[:20])
+    index = LogIndex.load(logfile)
+    assert index.completed() == {1, 2, 3, 4, 5}
+    with LogWriter(logfile, index) as writer:
+        writer.write(6, replicate(6), "END")
+    index = LogIndex.load(logfile)
+    assert index.completed() == {1, 2, 3, 4, 5, 6}
+    assert index.read(6) == replicate(6)
+    with gzip.open(logfile, "rt") as log:
+        assert log.read().count("START") == 6
+
+
+def test_compressed_simulation(tmp_path):
+    args = ["--popsize", "200", "--seed", "1", "--infectors", "1"]
+    main(args + ["--repeats", "5", "--logfile", str(tmp_path / "a.log")])
+    main(args + ["--repeats", "5", "--logfile", str(tmp_path / "a.log.gz")])
+    plain = LogIndex.load(str(tmp_path / "a.log"))
+    compressed = LogIndex.load(str(tmp_path / "a.log.gz"))
+    assert compressed.completed() == {1, 2, 3, 4, 5}
+    for i in range(1, 6):
+        # records other than START and END, which have time of simulation,
+        # are the same
+        assert plain.read(i).splitlines()[1:-1] == compressed.read(
+            i).splitlines()[1:-1]
+    summary, _ = summarize_simulations(str(tmp_path / "a.log.gz"))
+    assert summary["n_simulation"] == 5
+
+
+def test_worker_shards(tmp_path):
+    logfile = str(tmp_path / "a.log.gz")
+    main([
+        "--popsize", "200", "--seed", "1", "--infectors", "1", "--repeats",
+        "10", "-j", "3", "--logfile", logfile
+    ])
+    # replicates written to shards by workers are merged in order of IDs
+    assert sorted(os.listdir(tmp_path)) == ["a.log.gz", "a.log.gz.idx"]
+    index = LogIndex.load(logfile)
+    assert list(index.entries["id"]) == list(range(1, 11))
+    with gzip.open(logfile, "rt") as log:
+        ids = [x.split("\t", 1)[0] for x in log.read().splitlines()[1:]]
+    assert ids == sorted(ids, key=int)
+
+
+def test_log_writer_copy(tmp_path):
+    content = [replicate(i).encode() for i in (1, 2)]
+    for logfile, compress in ((str(tmp_path / "a.log"), lambda x: x),
+                              (str(tmp_path / "a.log.gz"), gzip.compress)):
+        # replicates written by workers to a shard
+        blocks = [compress(x) for x in content]
+        with open(tmp_path / "shard", "wb") as shard:
+            shard.write(b"".join(blocks))
+        with open(tmp_path / "shard", "rb") as shard:
+            with LogWriter(logfile) as writer:
+                writer.copy(2, shard.fileno(), len(blocks[0]), len(blocks[1]),
+                            len(content[1]), "END")
+                writer.copy(1, shard.fileno(), 0, len(blocks[0]),
+                            len(content[0]), "END")
+        # replicates are appended when the logfile is resumed
+        with LogWriter(logfile, LogIndex.load(logfile)) as writer:
+            writer.write(3, replicate(3), "END")
+        index = LogIndex.load(logfile)
+        assert list(index.entries["id"]) == [2, 1, 3]
+        assert [index.read(i) for i in (1, 2, 3)] == [
+            replicate(i) for i in (1, 2, 3)
+        ]
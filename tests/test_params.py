@@ -6,6 +6,8 @@ import math
 from scipy.stats import norm
 import numpy as np
 from covid19_outbreak_simulator.utils import parse_param_with_multiplier
+from covid19_outbreak_simulator.model import Params
+from covid19_outbreak_simulator.cli import parse_args
 
 def test_multiplier():
     res = parse_param_with_multiplier(['2', 'A=1.2', 'B=0.8'], subpops=['A', 'B'])
@@ -207,3 +209,66 @@ def test_get_piecewise_asymptomatic_transmission_probability(default_model):
         r.append(sum(infected))
     #
     assert math.fabs(sum(r) / N) - R0 < 0.05
+
+
+def test_common_random_numbers(default_model):
+    assert default_model.get_rng("infection", "A_1") is np.random
+
+    default_model.set_common_random_numbers(1, 2)
+    r0 = default_model.draw_random_r0(
+        symptomatic=True, rng=default_model.get_rng("infection", "A_1"))
+    assert r0 == default_model.draw_random_r0(
+        symptomatic=True, rng=default_model.get_rng("infection", "A_1"))
+    assert r0 != default_model.draw_random_r0(
+        symptomatic=True, rng=default_model.get_rng("infection", "A_1", 1))
+
+    # keys of IDs do not depend on other IDs
+    rank = default_model.rank_ids(["A_1", "A_2", "A_3"],
+                                  default_model.get_rng("selection", "A_0"))
+    assert list(rank[1:]) == list(
+        default_model.rank_ids(["A_2", "A_3"],
+                               default_model.get_rng("selection", "A_0")))
+
+
+def test_invalid_quantile(params):
+    params.set('symptomatic_r0', prop='loc', value=2.1)
+    with pytest.raises(ValueError):
+        params.set('symptomatic_r0', prop='quantile_2.5', value=2.5)
+
+
+def test_group_params():
+    params = Params(
+        parse_args([
+            '--popsize', 'A=100', 'B=200', '--symptomatic-r0', 'A=1.5',
+            '--incubation-period', 'B=1.2', '--susceptibility', 'A=0.8'
+        ]))
+    gp = params.group_params
+    assert gp.names == ['', 'A', 'B']
+    assert list(gp.symptomatic_r0_multiplier) == [1, 1.5, 1]
+    assert list(gp.incubation_period_multiplier) == [1, 1, 1.2]
+    assert gp.lookup('susceptibility', 'A') == 0.8
+    assert list(gp.lookup('susceptibility', np.array([2, 1, 1]))) == [1, 0.8, 0.8]
+    # unknown groups use parameters of group ""
+    assert gp.lookup('susceptibility', 'C') == 1
+    # recompiled after parameters change
+    params.set('symptomatic_r0', 'multiplier_B', 3.0)
+    assert list(params.group_params.symptomatic_r0_multiplier) == [1, 1.5, 3]
+    assert 'group_params' not in str(params)
+
+
+def test_buffered_draws(default_model):
+    np.random.seed(1)
+    default_model.draw_prop_asym_carriers()
+    ip = [default_model.draw_random_incubation_period() for i in range(10000)]
+    np.random.seed(1)
+    ip_direct = np.random.lognormal(
+        default_model.params.incubation_period_mean,
+        default_model.params.incubation_period_sigma, 10000)
+    assert math.fabs(np.mean(ip) - np.mean(ip_direct)) < 0.15
+    assert math.fabs(np.std(ip) - np.std(ip_direct)) < 0.15
+    assert default_model._normal
+    default_model.clear_buffers()
+    assert not default_model._normal
+    # draws from other random streams are not buffered
+    rng = np.random.default_rng(1)
+    assert default_model.draw_uniform(rng=rng) == np.random.default_rng(1).uniform(0, 1)
@@ -1,6 +1,8 @@
 import pytest
 from itertools import product
 from covid19_outbreak_simulator.simulator import Population
+from covid19_outbreak_simulator.population import LazyPopulation
+from covid19_outbreak_simulator.event import Event, EventType
 
 
 def test_population(population_factory):
@@ -133,3 +135,59 @@ def test_get_items(population_factory):
 
     assert len(list(pop.items(group='A'))) == 100
     assert len(list(pop.items())) == 300
+
+
+def test_lazy_population(default_model, logger):
+    pop = LazyPopulation(popsize=['A=100', 'B=300'], model=default_model,
+        logger=logger, vicinity=None)
+    assert len(pop) == 400
+    assert 'A_99' in pop and 'A_100' not in pop and 'C_1' not in pop
+    assert not pop._individuals
+
+    ind = pop['B_10']
+    assert ind.group == 'B'
+    assert pop['B_10'] is ind
+    pop.remove(ind)
+    assert 'B_10' not in pop
+    assert len(pop) == 399
+    assert pop.group_sizes['B'] == 299
+
+    cnt = {'A': 0, 'B': 0}
+    for i in range(1000):
+        selected = pop.select(infector='B_20')
+        assert selected.id not in ('B_10', 'B_20')
+        cnt[selected.group] += 1
+    assert 0.15 < cnt['A'] / 1000 < 0.35
+    assert pop.lazy
+
+    # accessing all individuals creates the rest of the population
+    assert len(pop.individuals) == 399
+    assert not pop.lazy
+    assert 'B_10' not in pop
+
+    with pytest.raises(ValueError):
+        LazyPopulation(popsize=['A=100', 'B=300'], model=default_model,
+            logger=logger, vicinity=['A-A=0'])
+
+
+def test_cancel_events(population_factory, logger):
+    pop = population_factory(popsize=['10'])
+    ind, other = pop['0'], pop['1']
+    events = [
+        Event(1, EventType.RECOVER, target=ind, logger=logger),
+        Event(2, EventType.SHOW_SYMPTOM, target=ind, logger=logger),
+        Event(3, EventType.INFECTION, target=None, by=ind, logger=logger),
+        Event(3, EventType.INFECTION, target=None, by=other, logger=logger),
+    ]
+    for evt in events:
+        pop.add_pending(evt)
+    assert pop.remaining_events() == ({'RECOVER': 1, 'SHOW_SYMPTOM': 1, 'INFECTION': 2}, 2)
+    assert pop.pop_pending(events[0])
+    pop.remove(ind)
+    assert events[1].cancelled and not events[2].cancelled
+    assert pop.remaining_events() == ({'INFECTION': 1}, 1)
+    # cancelled events are skipped, infections by removed individuals are
+    # processed without being counted again
+    assert not pop.pop_pending(events[1])
+    assert pop.pop_pending(events[2])
+    assert pop.remaining_events() == ({'INFECTION': 1}, 1)
@@ -1,4 +1,8 @@
+import multiprocessing
 import os
+import subprocess
+import sys
+import time
 import pytest
 import numpy as np
 
@@ -387,6 +391,90 @@ def test_main_stop_if():
 def test_main_stop_if_error():
     with pytest.raises(Exception):
         main(["--jobs", "1", "--repeats", "100", "--stop-if", "st>1"])
+    with pytest.raises(ValueError):
+        main(["--jobs", "1", "--repeats", "1", "--stop-if", "t<1"])
+    with pytest.raises(ValueError):
+        main(["--jobs", "1", "--repeats", "1", "--stop-if", "n_active>x"])
+
+
+def test_main_stop_if_counters(clear_log):
+    main([
+        "--jobs", "1", "--repeats", "5", "--seed", "1", "--infectors", "1",
+        "2", "3", "--handle-symptomatic", "quarantine?duration=14",
+        "--stop-if", "n_quarantined>3"
+    ])
+    events = read_events("simulation.log")
+    n_stopped = 0
+    for id in range(1, 6):
+        records = [x for x in events if x[0] == str(id)]
+        assert records[-1][2] == "END"
+        end = float(records[-1][1])
+        # quarantined individuals are released after 14 days
+        quarantined = [
+            x for x in records
+            if x[2] == "QUARANTINE" and float(x[1]) > end - 14
+        ]
+        if len(quarantined) > 3:
+            # stops right after the fourth individual is quarantined
+            assert len(quarantined) == 4
+            assert quarantined[-1][1] == records[-1][1]
+            n_stopped += 1
+    assert n_stopped > 0
+
+
+@pytest.mark.parametrize("options", [
+    ["--handle-symptomatic", "quarantine?duration=7&test_before_release=true"],
+    ["--handle-symptomatic", "replace?duration=5", "--plugin", "quarantine",
+     "--interval", "3", "--count", "5", "--duration", "4"],
+    ["--leadtime", "any", "--handle-symptomatic", "quarantine?duration=7",
+     "--plugin", "remove", "--interval", "2", "--count", "2",
+     "--target", "quarantined"],
+])
+def test_quarantined_counter(logger, options):
+    from covid19_outbreak_simulator.simulator import Simulator
+
+    args = parse_args([
+        "--popsize", "100", "--infectors", "1", "2", "3", "--stop-if", "t>40"
+    ] + options)
+    for id in range(1, 6):
+        np.random.seed(id)
+        simu = Simulator(
+            params=Params(args), logger=logger, simu_args=args, cmd=[])
+        simu.start(id)
+
+        def check():
+            # the counter matches quarantined individuals in the population
+            assert simu.population.n_quarantined == sum(
+                isinstance(x.quarantined, float)
+                for x in simu.population.values())
+            return False
+
+        simu.run(until=check)
+
+
+def test_main_stop_if_extinct(clear_log):
+    cmd = [
+        "--jobs", "1", "--repeats", "5", "--seed", "1", "--infectors", "1",
+        "--handle-symptomatic", "remove", "--track-events", "INFECTION",
+        "RECOVER", "REMOVAL"
+    ]
+    plugin = ["--plugin", "stat", "--interval", "1"]
+    main(cmd + ["--stop-if", "t>100"] + plugin)
+    events = read_events("simulation.log")
+    main(cmd + ["--stop-if", "t>100", "extinct"] + plugin)
+    extinct = read_events("simulation.log")
+    # stopping early does not change the outbreak
+    assert [x for x in events if x[2] != "END"
+           ] == [x for x in extinct if x[2] != "END"]
+    for id in range(1, 6):
+        records = [x for x in extinct if x[0] == str(id)]
+        assert records[-1][2] == "END"
+        if float(records[-1][1]) < 100:
+            # stops right after the last infected individual recovers or is removed
+            assert records[-1][1] == records[-2][1]
+            assert records[-2][2] in ("RECOVER", "REMOVAL")
+    assert any(x[2] == "END" and float(x[1]) < 100 for x in extinct)
+
 
 
 def test_symptomatic_transmissibility_model(clear_log):
@@ -461,3 +549,206 @@ def test_asymptomatic_transmissibility_model(clear_log):
         "0.5",
         "1.147",
     ])
+
+
+def test_main_coordinator(tmp_path, monkeypatch):
+    address = str(tmp_path / "coordinator.sock")
+    logfile = str(tmp_path / "simulation.log")
+    # workers read the key from environment
+    monkeypatch.setenv("OUTBREAK_SIMULATOR_AUTHKEY", "secret")
+    coordinator = multiprocessing.Process(
+        target=main,
+        args=([
+            "--coordinator", address, "--authkey=secret", "--repeats", "20",
+            "--chunk-size", "3", "--stop-if", "t>5", "--logfile", logfile,
+            "--verbosity", "2"
+        ],))
+    coordinator.start()
+    while not os.path.isfile(address):
+        time.sleep(0.1)
+    # the key is not written to the lock file
+    with open(logfile + ".lock") as lock:
+        assert "secret" not in lock.read()
+
+    workers = [
+        multiprocessing.Process(
+            target=main, args=(["--worker", address, "-j", "2"],))
+        for i in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    coordinator.join()
+    assert coordinator.exitcode == 0
+
+    with open(logfile) as log:
+        content = log.read()
+    # nor sent to workers and written to the log
+    assert "secret" not in content
+    records = [x.split("\t") for x in content.splitlines()[1:]]
+    assert [int(x[0]) for x in records if x[2] == "START"] == list(range(1, 21))
+    assert [int(x[0]) for x in records if x[2] == "END"] == list(range(1, 21))
+    assert "args=" in [x for x in records if x[2] == "START"][0][4]
+
+
+def read_events(logfile):
+    # events without time stamps in params
+    with open(logfile) as log:
+        return [x.split("\t")[:4] for x in log.read().splitlines()[1:]]
+
+
+def test_main_seed(clear_log):
+    main(["--repeats", "6", "--infectors", "1", "--seed", "10", "-j", "1"])
+    events = read_events("simulation.log")
+    main(["--repeats", "6", "--infectors", "1", "--seed", "10", "-j", "3"])
+    assert read_events("simulation.log") == events
+
+
+def test_main_cache(clear_log, tmp_path):
+    cmd = [
+        "--infectors", "1", "--seed", "10", "--cache-dir",
+        str(tmp_path / "cache")
+    ]
+    main(cmd + ["--repeats", "4"])
+    events = read_events("simulation.log")
+    # partial hit simulates replicates 5 and 6
+    main(cmd + ["--repeats", "6"])
+    assert read_events("simulation.log")[:len(events)] == events
+    events = read_events("simulation.log")
+    os.remove("simulation.log")
+    main(cmd + ["--repeats", "6"])
+    assert read_events("simulation.log") == events
+
+
+def test_main_cache_summary_report(clear_log, tmp_path):
+    cmd = [
+        "--seed", "1", "--repeats", "5", "-j", "1", "--cache-dir",
+        str(tmp_path / "cache")
+    ]
+    main(cmd + ["--summary-report", str(tmp_path / "sum1.txt")])
+    # full hit writes the summary report of retrieved replicates
+    main(cmd + ["--summary-report", str(tmp_path / "sum2.txt")])
+    with open(tmp_path / "sum1.txt") as sum1, open(tmp_path / "sum2.txt") as sum2:
+        assert sum1.read() == sum2.read()
+
+
+def test_main_snapshot(clear_log, tmp_path):
+    snapshot = str(tmp_path / "snapshot_{id}.pkl")
+    cmd = ["--infectors", "1", "--seed", "10", "--repeats", "2", "-j", "1"]
+    main(cmd + ["--snapshot-at", "5", "--snapshot-file", snapshot])
+    events = read_events("simulation.log")
+    assert os.path.isfile(snapshot.format(id=1))
+    assert os.path.isfile(snapshot.format(id=2))
+
+    # continue from the snapshots
+    main(cmd + ["--load-snapshot", snapshot])
+    assert read_events("simulation.log") == events
+
+    # fork from the snapshot of replicate 2 with a different plugin
+    main([
+        "--seed", "10", "--repeats", "3", "-j", "1", "--track-events",
+        "PLUGIN", "--load-snapshot",
+        snapshot.format(id=2), "--stop-if", "t>30", "--plugin", "stat",
+        "--interval", "10"
+    ])
+    records = read_events("simulation.log")
+    assert [x[1] for x in records if x[2] == "PLUGIN"] == ["10.00", "20.00", "30.00"] * 3
+
+    with pytest.raises(ValueError):
+        main(cmd + ["--snapshot-at", "5", "--snapshot-file", "snapshot.pkl"])
+
+
+def test_main_snapshot_cache(clear_log, tmp_path):
+    snapshot = str(tmp_path / "snapshot_{id}.pkl")
+    cmd = ["--infectors", "1", "--repeats", "2", "-j", "1"]
+    load = cmd + [
+        "--seed", "20", "--load-snapshot", snapshot, "--cache-dir",
+        str(tmp_path / "cache")
+    ]
+    main(cmd + ["--seed", "10", "--snapshot-at", "5", "--snapshot-file", snapshot])
+    main(load)
+    events = read_events("simulation.log")
+
+    # replicates continued from a regenerated snapshot are not retrieved
+    # from cache
+    main(cmd + ["--seed", "11", "--snapshot-at", "5", "--snapshot-file", snapshot])
+    main(load)
+    regenerated = read_events("simulation.log")
+    assert regenerated != events
+    os.remove("simulation.log")
+    main(load[:-2])
+    assert read_events("simulation.log") == regenerated
+
+
+def test_main_snapshot_ended(clear_log, tmp_path):
+    snapshot = str(tmp_path / "snapshot_{id}.pkl")
+    cmd = [
+        "--infectors", "1", "--seed", "10", "--repeats", "4", "-j", "1",
+        "--stop-if", "t>20"
+    ]
+    # all replicates end before the time of the snapshot
+    main(cmd + ["--snapshot-at", "50", "--snapshot-file", snapshot])
+    events = read_events("simulation.log")
+    for id in range(1, 5):
+        assert os.path.isfile(snapshot.format(id=id))
+
+    # ended replicates are not continued with new plugins
+    main(cmd + [
+        "--load-snapshot", snapshot, "--plugin", "insert", "10", "--at", "30"
+    ])
+    assert read_events("simulation.log") == events
+
+
+def test_main_checkpoint(clear_log, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint_{id}.pkl")
+    main([
+        "--infectors", "1", "--repeats", "2", "--checkpoint-interval", "0",
+        "--snapshot-file", checkpoint
+    ])
+    # checkpoints are removed after replicates are completed
+    assert not os.listdir(tmp_path)
+
+
+def test_main_common_random_numbers(clear_log):
+    with pytest.raises(ValueError):
+        main(["--repeats", "2", "--common-random-numbers"])
+
+    cmd = [
+        "--infectors", "1", "--seed", "10", "--repeats", "4", "--popsize",
+        "200", "--common-random-numbers"
+    ]
+    main(cmd + ["--handle-symptomatic", "keep"])
+    keep = read_events("simulation.log")
+    main(cmd + ["--handle-symptomatic", "remove?proportion=0.5"])
+    remove = read_events("simulation.log")
+    assert keep != remove
+    # the initial infections are identical in both scenarios
+    with open("simulation.log") as log:
+        first_remove = [x.split("\t")[4] for x in log if "\tINFECTION\t1\t" in x]
+
+    main(cmd + ["--handle-symptomatic", "keep"])
+    assert read_events("simulation.log") == keep
+    with open("simulation.log") as log:
+        first_keep = [x.split("\t")[4] for x in log if "\tINFECTION\t1\t" in x]
+    assert first_keep == first_remove
+
+
+def test_main_branching(clear_log):
+    main(["--repeats", "4", "--infectors", "1", "--seed", "3", "--popsize", "2000",
+          "--engine", "branching", "--branching-threshold", "0.01",
+          "--plugin", "stat", "--at", "10"])
+    events = read_events("simulation.log")
+    assert len([x for x in events if x[2] == "END"]) == 4
+    with pytest.raises(ValueError):
+        main(["--engine", "branching", "--vicinity", "A-A=0", "--popsize", "A=10"])
+
+
+def test_cli_imports():
+    # modules that are only needed by some commands are imported on demand
+    out = subprocess.run([
+        sys.executable, "-c",
+        "import sys, covid19_outbreak_simulator.cli; "
+        "print([x for x in ('scipy', 'pandas', 'yaml', 'tqdm') if x in sys.modules])"
+    ], capture_output=True, text=True)
+    assert out.stdout.strip() == "[]"
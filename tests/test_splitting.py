@@ -0,0 +1,70 @@
+import math
+
+import pytest
+
+from covid19_outbreak_simulator.cli import main
+from covid19_outbreak_simulator.splitting import splitting_estimate
+
+
+def write_log(filename, n_reached):
+    with open(filename, "w") as log:
+        log.write("id\ttime\tevent\ttarget\tparams\n")
+        for i, n in enumerate(n_reached):
+            log.write(f"{i + 1}\t0.00\tSTART\t.\tid={i + 1}\n")
+            log.write(
+                f"{i + 1}\t5.00\tEND\t64\tpopsize=64,remaining_events=INFECTION:2,RECOVER:1,n_reached={n}\n"
+            )
+
+
+def test_splitting_estimate(tmp_path):
+    write_log(tmp_path / "a.log", [0, 4, 0, 8])
+    p, se, n = splitting_estimate(tmp_path / "a.log", [2, 5, 10], 2)
+    assert n == 4
+    assert p == pytest.approx(0.75)
+    assert se == pytest.approx(math.sqrt(((0.75**2 * 2 + 0.25**2 + 1.25**2) / 3) / 4))
+
+    with open(tmp_path / "b.log", "w") as log:
+        log.write("1\t5.00\tEND\t64\tpopsize=64\n")
+    with pytest.raises(ValueError):
+        splitting_estimate(tmp_path / "b.log", [2, 5], 2)
+
+
+def test_splitting_without_clones(tmp_path):
+    # without clones, n_reached is whether the replicate reaches the last level
+    logfile = str(tmp_path / "split.log")
+    main([
+        "--infectors", "1", "--seed", "1", "--repeats", "20",
+        "--splitting-levels", "2", "5", "--splitting-factor", "1",
+        "--logfile", logfile
+    ])
+    n_infections = {}
+    n_reached = {}
+    with open(logfile) as log:
+        for line in log.readlines()[1:]:
+            fields = line.split("\t")
+            if fields[2] == "INFECTION":
+                n_infections[fields[0]] = n_infections.get(fields[0], 0) + 1
+            elif fields[2] == "END":
+                n_reached[fields[0]] = int(fields[4].rsplit("n_reached=", 1)[1])
+    assert n_reached == {
+        x: int(n_infections.get(x, 0) >= 5) for x in n_reached
+    }
+
+
+def test_splitting(tmp_path, capsys):
+    logfile = str(tmp_path / "split.log")
+    main([
+        "--infectors", "1", "--seed", "1", "--repeats", "10",
+        "--splitting-levels", "2", "5", "--splitting-factor", "3",
+        "--logfile", logfile
+    ])
+    assert "Estimated probability of reaching 5 infections" in capsys.readouterr().out
+    with open(logfile) as log:
+        n_reached = [
+            int(x.rsplit("n_reached=", 1)[1]) for x in log if "\tEND\t" in x
+        ]
+    assert len(n_reached) == 10
+    assert all(0 <= x <= 3 for x in n_reached)
+
+    with pytest.raises(ValueError):
+        main(["--splitting-levels", "5", "2"])
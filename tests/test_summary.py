@@ -0,0 +1,58 @@
+import numpy as np
+
+from covid19_outbreak_simulator.cli import main
+from covid19_outbreak_simulator.summary import (split_logfile,
+                                                summarize_simulations)
+
+
+def read_summary(filename):
+    with open(filename) as summary:
+        return dict(x.split("\t", 1) for x in summary.read().splitlines())
+
+
+def test_summarize_simulations(tmp_path):
+    logfile = str(tmp_path / "simulation.log")
+    main([
+        "--popsize", "A=500", "B=500", "--repeats", "10", "--seed", "1",
+        "--infectors", "A_1", "--handle-symptomatic", "quarantine?duration=7",
+        "--logfile", logfile, "--summary-report",
+        str(tmp_path / "summary.txt"), "--plugin", "stat", "--interval", "5"
+    ])
+    with open(logfile) as log:
+        records = [x.split("\t") for x in log.read().splitlines()[1:]]
+
+    summary = read_summary(str(tmp_path / "summary.txt"))
+    assert summary["n_simulation"] == "10"
+    assert int(summary["total_infection"]) == len(
+        [x for x in records if x[2] == "INFECTION"])
+    # records of carriers in quarantine count multiple avoided infections
+    assert int(summary["total_infection_avoided"]) == sum(
+        int(dict(y.split("=") for y in x[4].split(",")).get("n_avoided", 1))
+        for x in records
+        if x[2] == "INFECTION_AVOIDED")
+    # infections other than the seeds are attributed to their infectors
+    assert sum(
+        int(summary[f"total_{x}_infection"])
+        for x in ("asym", "presym", "sym")) == int(
+            summary["total_infection"]) - 10
+    assert sum(
+        int(y)
+        for x, y in summary.items()
+        if x.startswith("n_remaining_popsize_")) == 10
+
+    # chunks parsed in parallel give the same summary
+    assert len(split_logfile(logfile, 1000)) > 1
+    parallel, replicates = summarize_simulations(
+        logfile, str(tmp_path / "parallel.txt"), jobs=2, chunk_size=1000)
+    assert read_summary(str(tmp_path / "parallel.txt")) == summary
+    assert list(replicates["id"]) == list(range(1, 11))
+    for rep in replicates:
+        rep_records = [x for x in records if x[0] == str(rep["id"])]
+        assert rep["n_infection"] == len(
+            [x for x in rep_records if x[2] == "INFECTION"])
+        assert rep["time"] == float(rep_records[-1][1])
+        symptoms = [float(x[1]) for x in rep_records if x[2] == "SHOW_SYMPTOM"]
+        if symptoms:
+            assert rep["first_symptom"] == symptoms[0]
+        else:
+            assert np.isnan(rep["first_symptom"])
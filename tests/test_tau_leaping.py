@@ -0,0 +1,90 @@
+import pytest
+
+from covid19_outbreak_simulator.cli import main
+
+
+def read_records(logfile, event):
+    with open(logfile) as log:
+        return [
+            x.split("\t") for x in log.read().splitlines()[1:]
+            if x.split("\t")[2] == event
+        ]
+
+
+def stat_of(record):
+    return dict(x.split("=", 1) for x in record[4].split(","))
+
+
+def test_tau_leaping(tmp_path):
+    logfile = str(tmp_path / "tau.log")
+    main([
+        "--popsize", "A=2000", "B=1000", "--repeats", "3", "--seed", "1",
+        "--engine", "tau-leaping", "--logfile", logfile,
+        "--track-events", "PLUGIN",
+        "--plugin", "init", "--incidence-rate", "0.01",
+        "--plugin", "stat", "--interval", "5"
+    ])
+    ends = read_records(logfile, "END")
+    assert len(ends) == 3
+    stats = read_records(logfile, "PLUGIN")
+    stats = [stat_of(x) for x in stats if x[4].startswith("name=stat")]
+    assert stats
+    for stat in stats:
+        assert int(stat["n_infected"]) == int(stat["n_A_infected"]) + int(
+            stat["n_B_infected"])
+        assert int(stat["n_popsize"]) <= 3000
+    # the outbreak spreads beyond the initial infections
+    assert max(int(x["n_infected"]) for x in stats) > 100
+    # removed symptomatic cases are not in the population
+    assert all(int(x[3]) < 3000 for x in ends)
+
+
+def test_tau_leaping_seed(tmp_path):
+    args = [
+        "--popsize", "2000", "--repeats", "4", "--seed", "5",
+        "--engine", "tau-leaping", "--infectors", "1", "2",
+        "--track-events", "PLUGIN", "--plugin", "stat", "--interval", "2"
+    ]
+    main(["-j", "1", "--logfile", str(tmp_path / "a.log")] + args)
+    main(["-j", "2", "--logfile", str(tmp_path / "b.log")] + args)
+    assert [x[:4] for x in read_records(str(tmp_path / "a.log"), "PLUGIN")] == [
+        x[:4] for x in read_records(str(tmp_path / "b.log"), "PLUGIN")
+    ]
+
+
+def test_tau_leaping_stop_if(tmp_path):
+    logfile = str(tmp_path / "tau.log")
+    main([
+        "--popsize", "1000", "--repeats", "2", "--engine", "tau-leaping",
+        "--stop-if", "t>3", "--logfile", logfile,
+        "--plugin", "community_infection", "--probability", "0.001",
+        "--interval", "1"
+    ])
+    assert all(x[1] == "3.00" for x in read_records(logfile, "END"))
+
+
+def test_tau_leaping_stop_if_extinct(tmp_path):
+    logfile = str(tmp_path / "tau.log")
+    main([
+        "--popsize", "1000", "--repeats", "3", "--seed", "1",
+        "--engine", "tau-leaping", "--stop-if", "t>200", "extinct",
+        "--logfile", logfile, "--infectors", "1",
+        "--plugin", "stat", "--interval", "1"
+    ])
+    ends = read_records(logfile, "END")
+    assert all(float(x[1]) < 200 for x in ends)
+    assert all("stop_if=t>200 extinct" in x[4] for x in ends)
+
+
+def test_tau_leaping_unsupported(tmp_path):
+    logfile = str(tmp_path / "tau.log")
+    with pytest.raises(ValueError):
+        main([
+            "--engine", "tau-leaping", "--common-random-numbers", "--seed", "1",
+            "--logfile", logfile
+        ])
+    with pytest.raises(ValueError):
+        main([
+            "--engine", "tau-leaping", "--infectors", "1", "--logfile",
+            logfile, "--plugin", "quarantine", "1"
+        ])
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from covid19_outbreak_simulator.cli import main
+from covid19_outbreak_simulator.timeseries import TDigest, TimeSeries
+
+
+def read_series(filename):
+    with open(filename) as ts:
+        header = ts.readline().rstrip("\n").split("\t")
+        return [dict(zip(header, x.split("\t"))) for x in ts.read().splitlines()]
+
+
+def test_tdigest():
+    rng = np.random.RandomState(1)
+    data = rng.lognormal(0, 1, size=(20000, 3))
+    digest = TDigest(3)
+    for row in data:
+        digest.add(row)
+    qs = [0.025, 0.25, 0.5, 0.75, 0.975]
+    assert np.allclose(
+        digest.quantile(qs), np.quantile(data, qs, axis=0).T, rtol=0.02)
+    assert np.allclose(digest.mean(), data.mean(axis=0))
+    assert np.array_equal(digest.min, data.min(axis=0))
+    assert np.array_equal(digest.max, data.max(axis=0))
+
+
+def test_time_series():
+    series = TimeSeries(["", "A"], 1, 3)
+    series.advance(0.5, lambda: [[1, 1, 0, 0], [2, 2, 0, 0]])
+    # no time point between 0.5 and 1
+    series.advance(1, lambda: 1 / 0)
+    series.advance(2.5, lambda: [[0, 3, 1, 0], [1, 3, 0, 1]])
+    series.finish(lambda: [[0, 3, 0, 1], [0, 4, 0, 2]])
+    assert series.values[:4].T.tolist() == [[3, 3, 0, 0], [1, 6, 1, 1],
+                                            [1, 6, 1, 1], [0, 7, 0, 3]]
+    assert series.values[4:].T.tolist() == [[2, 2, 0, 0], [1, 3, 0, 1],
+                                            [1, 3, 0, 1], [0, 4, 0, 2]]
+
+
+@pytest.mark.parametrize("engine", ["event", "tau-leaping"])
+def test_time_series_summary(tmp_path, engine):
+    main([
+        "--popsize", "A=50", "B=30", "--infectors", "A_0", "--repeats", "20",
+        "--engine", engine, "--stop-if", "t>20", "--logfile",
+        str(tmp_path / "a.log"), "--time-series",
+        str(tmp_path / "ts.txt")
+    ])
+    rows = read_series(str(tmp_path / "ts.txt"))
+    assert len(rows) == 12 * 21
+    assert all(int(x["n"]) == 20 for x in rows)
+    for row in rows:
+        values = [float(row[x]) for x in ("min", "q2.5", "q25", "q50", "q75", "q97.5", "max")]
+        assert values == sorted(values)
+    infected = [float(x["mean"]) for x in rows if x["series"] == "n_infected"]
+    assert infected[0] == 1 and infected == sorted(infected)
+    # the seed is in group A
+    assert [x["max"] for x in rows if x["series"] == "n_A_active"][0] == "1"
+    assert [x["max"] for x in rows if x["series"] == "n_B_active"][0] == "0"
+
+
+def test_time_series_options(tmp_path):
+    args = ["--repeats", "2", "--logfile", str(tmp_path / "a.log"),
+            "--time-series", str(tmp_path / "ts.txt")]
+    with pytest.raises(ValueError):
+        main(args)
+    with pytest.raises(ValueError):
+        main(args + ["--time-series-end", "10", "--resume"])
+    main(args + ["--time-series-end", "10", "--time-series-interval", "2"])
+    assert len(read_series(str(tmp_path / "ts.txt"))) == 4 * 6
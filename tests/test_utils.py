@@ -3,7 +3,10 @@ from itertools import product
 from covid19_outbreak_simulator.population import Individual
 from covid19_outbreak_simulator.event import EventType
 
-from covid19_outbreak_simulator.utils import parse_target_param
+from covid19_outbreak_simulator.utils import (parse_handle_symptomatic_options,
+                                             parse_target_param,
+                                             select_individuals,
+                                             status_columns)
 
 
 @pytest.mark.parametrize(
@@ -92,3 +95,48 @@ def test_individual_negative_status(default_model, logger, cond):
         pass
 
     assert not parse_target_param(cond)(ind), f"negative assert {cond} failed"
+
+
+def test_handle_symptomatic_policy():
+    opts = [["A=quarantine?duration=7&ct_groups=A,B", "remove?proportion=0.5"]]
+    policy = parse_handle_symptomatic_options(opts, "A", False)
+    assert policy["reaction"] == "quarantine"
+    assert policy["duration"] == 7
+    assert "B" in policy["ct_groups"]
+    assert parse_handle_symptomatic_options(opts, "A", False) is policy
+    assert parse_handle_symptomatic_options(opts, "B", False)["proportion"] == 0.5
+    with pytest.raises(TypeError):
+        policy["reaction"] = "keep"
+    # policies follow changed options
+    opts = [["keep"], ["remove"]]
+    assert parse_handle_symptomatic_options(opts, "A", True)["reaction"] == "keep"
+    assert parse_handle_symptomatic_options(opts, "A", False)["reaction"] == "remove"
+    assert parse_handle_symptomatic_options(None, "A", False)["reaction"] == "remove"
+    with pytest.raises(ValueError):
+        parse_handle_symptomatic_options([["remove?proportion=2"]], "A", False)
+
+
+def test_target_mask(default_model, logger):
+    population = {}
+    for i, (inf, rec, q, vac) in enumerate(product([False, 1.0], [False, 2.0],
+                                                   [False, 3.0], [False, 4.0])):
+        ind = Individual(f"group1_{i}", 1.2, default_model, logger)
+        ind.infected, ind.recovered, ind.quarantined, ind.vaccinated = inf, rec, q, vac
+        population[ind.id] = ind
+    IDs = list(population.keys())
+    for cond in ["infected&!quarantined|vaccinated", "!infected", "recovered|quarantined", "all"]:
+        target = parse_target_param([cond])
+        assert target is parse_target_param(cond)
+        mask = target.mask(status_columns(population, IDs, target.columns), len(IDs))
+        assert list(mask) == [target(population[x]) for x in IDs]
+    #
+    selected = select_individuals(population, IDs, ["infected", "vaccinated"], 5)
+    assert len(selected) == 5 and len(set(selected)) == 5
+    assert all(parse_target_param("infected|vaccinated")(population[x]) for x in selected)
+    assert len(select_individuals(population, IDs, ["infected", "vaccinated"])) == 10
+    # individuals are selected in random order
+    orders = [select_individuals(population, IDs, ["all"]) for i in range(5)]
+    assert all(sorted(x) == sorted(IDs) for x in orders)
+    assert any(x != IDs for x in orders)
+    with pytest.raises(ValueError):
+        parse_target_param("infectious")